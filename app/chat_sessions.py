@@ -0,0 +1,329 @@
+"""
+Server-side AI chat sessions
+
+A session keeps the message history and deal context of one conversation, so
+clients post only each new message and, when the deal changes, a context diff
+instead of resending the whole conversation every turn.
+
+Every session is written through to a directory shared by the API's worker
+processes (one JSON file per session), so a turn can land on any worker. Each
+worker also keeps recently used sessions in a bounded LRU, and rereads a
+session from disk only when its file changed since, i.e. when another worker
+took a turn. Sessions have a sliding TTL; expired files are swept
+periodically.
+
+A session keeps at most CHAT_SESSION_MAX_MESSAGES messages; older ones are
+dropped as new ones arrive, so a long conversation neither grows its prompt
+nor its session file without bound.
+
+Turns of one session are serialized within a worker: a turn holds the
+session's turn lock from reading the history until its reply is recorded, so
+concurrent posts to the same session queue up instead of interleaving their
+messages. Across workers the last write wins, so clients should still wait
+for one reply before sending the next message.
+
+Settings come from the environment:
+
+- CHAT_SESSION_MAX_ENTRIES: sessions kept in memory (default 1024)
+- CHAT_SESSION_TTL_SECONDS: how long an unused session is kept (default 3600)
+- CHAT_SESSION_MAX_MESSAGES: messages kept per session, oldest dropped first
+  (default 50)
+- CHAT_SESSION_DIR: the shared directory sessions are written to (default
+  "chat_sessions"; empty to keep sessions in this process's memory only,
+  which requires a single worker or sticky sessions)
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# (inode, modification time) of a session file, which changes with every write
+Stamp = Tuple[int, int]
+
+
+def merge_context(context: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Apply a context diff as a JSON merge patch (RFC 7386)
+
+    Keys in the diff replace those in the context, nested objects are merged
+    and a null value removes the key.
+    """
+    merged = dict(context)
+    for key, value in diff.items():
+        if value is None:
+            merged.pop(key, None)
+        elif isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_context(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class ChatSession:
+    """Message history and deal context of one conversation"""
+
+    def __init__(
+        self,
+        context: Dict[str, Any],
+        messages: Optional[List[Dict[str, str]]] = None,
+        id: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        max_messages: Optional[int] = None
+    ):
+        self.id = id or str(uuid.uuid4())
+        self.context = context
+        self.messages = list(messages or [])
+        self.created_at = created_at or datetime.now()
+        self.expires_at = 0.0
+        self.max_messages = max_messages
+        self._trim()
+
+    def add_message(self, role: str, content: str) -> None:
+        self.messages.append({"role": role, "content": content})
+        self._trim()
+
+    def _trim(self) -> None:
+        if self.max_messages is not None and len(self.messages) > self.max_messages:
+            del self.messages[:-self.max_messages]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "context": self.context,
+            "messages": self.messages,
+            "created_at": self.created_at.isoformat(),
+            "expires_at": self.expires_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_messages: Optional[int] = None) -> "ChatSession":
+        session = cls(data["context"], data["messages"], data["id"], datetime.fromisoformat(data["created_at"]), max_messages)
+        session.expires_at = data["expires_at"]
+        return session
+
+
+class ChatSessionStore:
+    """Thread-safe chat session store: an in-memory LRU written through to a shared directory"""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600,
+        session_dir: Optional[str] = None,
+        max_messages: Optional[int] = 50
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.session_dir = session_dir
+        self.max_messages = max_messages
+
+        # Least recently used first, each with the stamp of its file when it was last read or written
+        self._sessions: "OrderedDict[str, Tuple[ChatSession, Optional[Stamp]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Dropped once no turn holds or waits for them
+        self._turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._next_sweep = time.time() + ttl_seconds
+
+        self.writes = 0
+        self.loads = 0
+        self.expirations = 0
+
+    def create(self, context: Dict[str, Any], messages: Optional[List[Dict[str, str]]] = None) -> ChatSession:
+        """Start a session"""
+        session = ChatSession(context, messages, max_messages=self.max_messages)
+        with self._lock:
+            self._store(session)
+            if time.time() >= self._next_sweep:
+                self._sweep()
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """Get a session and extend its TTL, or None if it is unknown or expired"""
+        with self._lock:
+            session, stamp = self._sessions.pop(session_id, (None, None))
+
+            path = self._path(session_id)
+            if self.session_dir and path is None:
+                return None
+            if path is not None:
+                current = self._stamp(path)
+                if current is None:
+                    # Deleted or swept by another worker
+                    return None
+                if session is None or current != stamp:
+                    session = self._load(path)
+
+            if session is None:
+                return None
+            if session.expires_at <= time.time():
+                self.expirations += 1
+                self._remove(session_id)
+                return None
+
+            self._store(session)
+            return session
+
+    def save(self, session: ChatSession) -> None:
+        """Write a changed session through to the shared directory and extend its TTL"""
+        with self._lock:
+            self._store(session)
+
+    def turn_lock(self, session_id: str) -> asyncio.Lock:
+        """Get the lock that serializes the turns of a session"""
+        with self._lock:
+            lock = self._turn_locks.get(session_id)
+            if lock is None:
+                lock = asyncio.Lock()
+                self._turn_locks[session_id] = lock
+            return lock
+
+    def delete(self, session_id: str) -> bool:
+        """End a session; returns whether it existed"""
+        with self._lock:
+            session, _ = self._sessions.pop(session_id, (None, None))
+            path = self._path(session_id)
+            if path is not None and self._stamp(path) is not None:
+                if session is None:
+                    session = self._load(path)
+                self._remove(session_id)
+            return session is not None and session.expires_at > time.time()
+
+    def purge_expired(self) -> int:
+        """Remove expired sessions from memory and disk; returns how many were removed"""
+        with self._lock:
+            now = time.time()
+            expired = [session_id for session_id, (session, _) in self._sessions.items() if session.expires_at <= now]
+            for session_id in expired:
+                del self._sessions[session_id]
+            # Sessions in memory are also on disk, so the sweep counts them unless there is no directory
+            removed = self._sweep()
+            if not self.session_dir:
+                removed += len(expired)
+                self.expirations += len(expired)
+            return removed
+
+    def clear(self) -> None:
+        """Remove every session, in memory and on disk"""
+        with self._lock:
+            self._sessions.clear()
+            for path in self._session_paths():
+                os.remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the store counters and current usage"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "stored": len(self._session_paths()),
+                "writes": self.writes,
+                "loads": self.loads,
+                "expirations": self.expirations,
+                "max_entries": self.max_entries,
+                "max_messages": self.max_messages,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+    def _store(self, session: ChatSession) -> None:
+        session.expires_at = time.time() + self.ttl_seconds
+        self._sessions.pop(session.id, None)
+        self._sessions[session.id] = (session, self._write(session))
+
+        # Evicted sessions stay on disk and are read back when used again
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def _path(self, session_id: str) -> Optional[str]:
+        if not self.session_dir:
+            return None
+        try:
+            # Only well-formed ids become file names, so an id can't point outside the session directory
+            return os.path.join(self.session_dir, f"{uuid.UUID(session_id)}.json")
+        except ValueError:
+            return None
+
+    def _session_paths(self) -> List[str]:
+        if not self.session_dir or not os.path.isdir(self.session_dir):
+            return []
+        return [os.path.join(self.session_dir, name) for name in os.listdir(self.session_dir) if name.endswith(".json")]
+
+    @staticmethod
+    def _stamp(path: str) -> Optional[Stamp]:
+        # Every write replaces the file, so its inode changes even within one mtime tick
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _write(self, session: ChatSession) -> Optional[Stamp]:
+        """Write a session to its file; returns the file's stamp"""
+        path = self._path(session.id)
+        if path is None:
+            return None
+
+        os.makedirs(self.session_dir, exist_ok=True)
+        # Per-process temp file, so workers writing the same session don't clobber each other's
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(session.to_dict(), f)
+        os.replace(temp_path, path)
+        self.writes += 1
+        return self._stamp(path)
+
+    def _load(self, path: str) -> Optional[ChatSession]:
+        """Read a session from its file"""
+        try:
+            with open(path) as f:
+                session = ChatSession.from_dict(json.load(f), self.max_messages)
+        except FileNotFoundError:
+            return None
+        self.loads += 1
+        return session
+
+    def _remove(self, session_id: str) -> None:
+        path = self._path(session_id)
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _sweep(self) -> int:
+        """Delete session files that expired"""
+        now = time.time()
+        self._next_sweep = now + self.ttl_seconds
+
+        removed = 0
+        for path in self._session_paths():
+            try:
+                with open(path) as f:
+                    expired = json.load(f)["expires_at"] <= now
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError):
+                expired = True
+            if expired:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+        self.expirations += removed
+        return removed
+
+
+def create_chat_session_store() -> ChatSessionStore:
+    """Create the chat session store configured by the environment"""
+    return ChatSessionStore(
+        max_entries=int(os.getenv("CHAT_SESSION_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv("CHAT_SESSION_TTL_SECONDS", "3600")),
+        session_dir=os.getenv("CHAT_SESSION_DIR", "chat_sessions") or None,
+        max_messages=int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "50"))
+    )
@@ -0,0 +1,177 @@
+"""
+Bulk import and export of deals
+
+Imports are parsed one batch of rows at a time, so an upload of any size is
+never loaded into memory at once:
+
+- CSV: pandas in chunks (every cell read as text and left to validation)
+- NDJSON: one JSON object per line
+- XLSX: openpyxl in read-only mode, first row is the header
+- Parquet: pyarrow record batches (pyarrow is optional and only needed here)
+
+Exports are generators over pages of deals, so memory stays flat however
+large the pipeline is.
+"""
+
+import csv
+import io
+import json
+import os
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import pandas as pd
+from openpyxl import load_workbook
+
+# Rows parsed, validated and inserted at a time
+IMPORT_BATCH_SIZE = 1000
+
+# Deals read from the store per page when exporting
+EXPORT_BATCH_SIZE = 500
+
+IMPORT_FORMATS = ("csv", "ndjson", "xlsx", "parquet")
+
+# File extensions recognized when no format is given
+FORMAT_EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".xlsx": "xlsx",
+    ".parquet": "parquet",
+}
+
+Row = Dict[str, Any]
+
+
+class DealImportFormatError(ValueError):
+    """Raised when an upload cannot be read in the requested format"""
+
+
+def detect_format(filename: Optional[str], format: Optional[str] = None) -> str:
+    """Get the import format from an explicit format or the file extension"""
+    if format:
+        if format not in IMPORT_FORMATS:
+            raise DealImportFormatError(f"Unsupported import format '{format}'; expected one of {', '.join(IMPORT_FORMATS)}")
+        return format
+
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise DealImportFormatError("Could not tell the import format from the file name; pass format explicitly")
+    return FORMAT_EXTENSIONS[extension]
+
+
+def _batched(rows: Iterable[Row], batch_size: int) -> Iterator[List[Row]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _present(row: Row) -> Row:
+    """Drop empty cells so model defaults apply to them"""
+    return {key: value for key, value in row.items() if value is not None and value == value and value != ""}
+
+
+def iter_csv_batches(file: IO[bytes], batch_size: int) -> Iterator[List[Row]]:
+    # Reading every cell as text keeps e.g. numeric user IDs as strings; validation converts numbers
+    for chunk in pd.read_csv(file, chunksize=batch_size, dtype=str):
+        yield [_present(row) for row in chunk.to_dict("records")]
+
+
+def iter_ndjson_batches(file: IO[bytes], batch_size: int) -> Iterator[List[Row]]:
+    def rows() -> Iterator[Row]:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise DealImportFormatError(f"Line {line_number}: invalid JSON ({e.msg})")
+            if not isinstance(row, dict):
+                raise DealImportFormatError(f"Line {line_number}: expected a JSON object")
+            yield _present(row)
+
+    return _batched(rows(), batch_size)
+
+
+def iter_xlsx_batches(file: IO[bytes], batch_size: int) -> Iterator[List[Row]]:
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else "" for cell in next(rows, ())]
+
+        def records() -> Iterator[Row]:
+            for values in rows:
+                # Cells are typed by Excel (a numeric user ID is a number), so hand them to validation as text
+                yield _present({
+                    name: value if value is None or isinstance(value, str) else str(value)
+                    for name, value in zip(header, values)
+                    if name
+                })
+
+        yield from _batched(records(), batch_size)
+    finally:
+        workbook.close()
+
+
+def iter_parquet_batches(file: IO[bytes], batch_size: int) -> Iterator[List[Row]]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise DealImportFormatError("Parquet import requires the pyarrow package")
+
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=batch_size):
+        yield [_present(row) for row in batch.to_pylist()]
+
+
+def iter_import_batches(file: IO[bytes], format: str, batch_size: Optional[int] = None) -> Iterator[List[Row]]:
+    """
+    Parse an upload into batches of row dicts
+
+    Raises:
+        DealImportFormatError: If the upload is not valid in the given format
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    readers = {
+        "csv": iter_csv_batches,
+        "ndjson": iter_ndjson_batches,
+        "xlsx": iter_xlsx_batches,
+        "parquet": iter_parquet_batches,
+    }
+    try:
+        yield from readers[format](file, batch_size)
+    except DealImportFormatError:
+        raise
+    except Exception as e:
+        raise DealImportFormatError(f"Could not read {format} upload: {e}")
+
+
+def iter_ndjson_export(pages: Iterable[List[bytes]]) -> Iterator[bytes]:
+    """Stream pages of serialized deals as NDJSON"""
+    for documents in pages:
+        if documents:
+            yield b"\n".join(documents) + b"\n"
+
+
+def iter_csv_export(pages: Iterable[List[bytes]], columns: Sequence[str]) -> Iterator[bytes]:
+    """Stream pages of serialized deals as CSV; nested values are written as JSON"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction="ignore")
+    writer.writeheader()
+
+    for documents in pages:
+        for document in documents:
+            deal = json.loads(document)
+            writer.writerow({
+                column: json.dumps(value) if isinstance(value, (dict, list)) else value
+                for column, value in deal.items()
+            })
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
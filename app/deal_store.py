@@ -0,0 +1,744 @@
+"""
+Deal storage backends for the CRE Platform API
+
+The API talks to a DealRepository instead of a module-level dict so that all
+workers share the same deals and nothing is lost on restart. Two backends are
+provided:
+
+- SQLiteDealRepository: embedded SQLite database in WAL mode with secondary
+  indexes on status, property_type and location, each paired with
+  updated_at for ordered listing (the default)
+- InMemoryDealRepository: process-local dict, useful for tests and demos
+
+The backend is chosen with the DEAL_STORE_BACKEND environment variable
+("sqlite" or "memory") and the SQLite file with DEAL_STORE_PATH.
+
+Both backends also maintain portfolio rollups (running sums and counts of
+per-deal metrics) in the same write as the deal itself, so portfolio
+summaries and deal counts are read in O(1) instead of walking every deal.
+
+Deals are listed in (updated_at, id) order and paginated with opaque
+cursors (keyset pagination), so deep pages are as cheap as the first and
+concurrent inserts do not shift pages. Every write bumps a store version
+that clients can use to revalidate cached lists.
+
+Each deal's JSON document is kept alongside it and rewritten in the same
+write, so reads that only return deals to a client (list_json, get_json)
+never parse or re-serialize them.
+
+Updates are applied as patches: only the changed fields are copied onto the
+stored deal, guarded by the deal's version number (optimistic concurrency),
+and a batch of patches is applied atomically.
+"""
+
+import base64
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+# Columns that are copied out of the deal document so they can be indexed
+INDEXED_FIELDS = ("status", "property_type", "location")
+
+# Rows fetched per round trip when iterating over every deal
+ITER_BATCH_SIZE = 1000
+
+# Dimensions portfolio rollups are grouped by, in addition to the "all" total
+ROLLUP_DIMENSIONS = ("status", "property_type", "location", "user_id")
+
+# Per-deal metrics summed in each rollup
+ROLLUP_METRICS = ("cap_rate", "development_margin", "exit_value", "project_cost")
+
+# Rollup columns: a deal count plus a sum and a count of valid values per metric
+ROLLUP_COLUMNS = ("deal_count",) + tuple(
+    f"{metric}_{suffix}" for metric in ROLLUP_METRICS for suffix in ("sum", "count")
+)
+
+# Callable returning the rollup metrics of a deal (None for values that cannot be computed)
+DealMetrics = Callable[[BaseModel], Dict[str, Optional[float]]]
+
+RollupKey = Tuple[str, str]
+
+# Position of a deal in list order: (updated_at timestamp, numeric id)
+DealCursor = Tuple[str, int]
+
+# A patch to one deal: (deal ID, changed fields, expected version or None)
+DealPatch = Tuple[str, Dict[str, Any], Optional[int]]
+
+
+class DealNotFoundError(LookupError):
+    """Raised when a patch targets a deal that does not exist"""
+
+    def __init__(self, deal_id: str):
+        super().__init__(f"Deal with ID {deal_id} not found")
+        self.deal_id = deal_id
+
+
+class DealVersionConflictError(Exception):
+    """Raised when a patch expects a different version than the stored deal has"""
+
+    def __init__(self, deal_id: str, expected_version: int, current_version: int):
+        super().__init__(
+            f"Deal with ID {deal_id} is at version {current_version}, not version {expected_version}"
+        )
+        self.deal_id = deal_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+def apply_patch(deal: Optional[BaseModel], patch: DealPatch) -> BaseModel:
+    """
+    Apply a patch to a deal, bumping its version
+
+    The changed fields must already be validated; the rest of the deal is
+    copied as is rather than re-validated.
+
+    Raises:
+        DealNotFoundError: If the deal does not exist
+        DealVersionConflictError: If the deal is not at the expected version
+    """
+    deal_id, changes, expected_version = patch
+    if deal is None:
+        raise DealNotFoundError(deal_id)
+    if expected_version is not None and expected_version != deal.version:
+        raise DealVersionConflictError(deal_id, expected_version, deal.version)
+
+    return deal.model_copy(update={**changes, "version": deal.version + 1})
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed-width ISO timestamps sort correctly as text
+    return value.isoformat(timespec="microseconds")
+
+
+def cursor_for(deal: BaseModel) -> DealCursor:
+    """Get the list position of a deal"""
+    return _timestamp(deal.updated_at), int(deal.id)
+
+
+def encode_cursor(cursor: DealCursor) -> str:
+    """Encode a list position as an opaque, URL-safe cursor"""
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> DealCursor:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        updated_at, deal_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        datetime.fromisoformat(updated_at)
+        return str(updated_at), int(deal_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def empty_rollup() -> Dict[str, float]:
+    """Create a rollup with no deals in it"""
+    return {column: 0 for column in ROLLUP_COLUMNS}
+
+
+def _rollup_keys(deal: BaseModel) -> List[RollupKey]:
+    """Get the rollups a deal contributes to"""
+    keys = [("all", "")]
+    for dimension in ROLLUP_DIMENSIONS:
+        value = getattr(deal, dimension, None)
+        if value is not None:
+            keys.append((dimension, str(value)))
+    return keys
+
+
+def _rollup_delta(metrics: Dict[str, Optional[float]], sign: int) -> Dict[str, float]:
+    """Get the change a deal makes to a rollup when added (sign=1) or removed (sign=-1)"""
+    delta = empty_rollup()
+    delta["deal_count"] = sign
+    for metric in ROLLUP_METRICS:
+        value = metrics.get(metric)
+        if value is not None and math.isfinite(value):
+            delta[f"{metric}_sum"] = sign * value
+            delta[f"{metric}_count"] = sign
+    return delta
+
+
+def _apply_delta(rollups: Dict[RollupKey, Dict[str, float]], keys: List[RollupKey], delta: Dict[str, float]) -> None:
+    for key in keys:
+        rollup = rollups.setdefault(key, empty_rollup())
+        for column, value in delta.items():
+            rollup[column] += value
+
+
+class DealRepository:
+    """Interface for deal storage backends"""
+
+    def __init__(self, model: Type[BaseModel], metrics: DealMetrics):
+        self.model = model
+        self.metrics = metrics
+
+    def add(self, deal_data: Dict[str, Any]) -> BaseModel:
+        """Assign an ID to the deal data, store it and return the deal"""
+        return self.add_many([deal_data])[0]
+
+    def add_many(self, deals_data: List[Dict[str, Any]]) -> List[BaseModel]:
+        """Store several deals in one write, assigning IDs in order"""
+        raise NotImplementedError
+
+    def get(self, deal_id: str) -> Optional[BaseModel]:
+        """Get a deal by ID, or None if it does not exist"""
+        raise NotImplementedError
+
+    def save(self, deal: BaseModel) -> None:
+        """Replace an existing deal"""
+        raise NotImplementedError
+
+    def patch(self, deal_id: str, changes: Dict[str, Any], expected_version: Optional[int] = None) -> BaseModel:
+        """Apply changed fields to a deal, optionally only if it is at the expected version"""
+        return self.patch_many([(deal_id, changes, expected_version)])[0]
+
+    def patch_many(self, patches: List[DealPatch]) -> List[BaseModel]:
+        """
+        Apply several patches atomically: either all of them or, if any fails, none
+
+        Raises:
+            DealNotFoundError: If a patched deal does not exist
+            DealVersionConflictError: If a patched deal is not at the expected version
+        """
+        raise NotImplementedError
+
+    def delete(self, deal_id: str) -> bool:
+        """Delete a deal, returning False if it did not exist"""
+        raise NotImplementedError
+
+    def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[BaseModel]:
+        """List deals in (updated_at, id) order with optional exact-match filters, starting after a cursor"""
+        raise NotImplementedError
+
+    def list_json(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[Tuple[DealCursor, bytes]]:
+        """List deals like list(), as (cursor, serialized JSON document) pairs"""
+        raise NotImplementedError
+
+    def get_json(self, deal_id: str) -> Optional[bytes]:
+        """Get the serialized JSON document of a deal, or None if it does not exist"""
+        raise NotImplementedError
+
+    def count(
+        self,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None
+    ) -> int:
+        """Count the deals matching the filters"""
+        filters = {"status": status, "property_type": property_type, "location": location}
+        filters = {field: value for field, value in filters.items() if value is not None}
+
+        # No filter or a single filter is answered by the running rollups
+        if not filters:
+            return int(self.get_rollup()["deal_count"])
+        if len(filters) == 1:
+            (dimension, key), = filters.items()
+            return int(self.get_rollup(dimension, key)["deal_count"])
+        return self._count_matching(filters)
+
+    def _count_matching(self, filters: Dict[str, str]) -> int:
+        """Count the deals matching several filters"""
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """Get the store version, which changes on every write"""
+        raise NotImplementedError
+
+    def iter_all(self) -> Iterator[BaseModel]:
+        """Iterate over every deal in creation order"""
+        raise NotImplementedError
+
+    def get_rollup(self, dimension: str = "all", key: str = "") -> Dict[str, float]:
+        """Get the running rollup for one group of deals"""
+        raise NotImplementedError
+
+    def get_rollups(self, dimension: str) -> Dict[str, Dict[str, float]]:
+        """Get the running rollups for every group of a dimension"""
+        raise NotImplementedError
+
+    def stored_rollups(self) -> Dict[RollupKey, Dict[str, float]]:
+        """Get every running rollup, keyed by (dimension, key)"""
+        raise NotImplementedError
+
+    def rebuild_rollups(self) -> None:
+        """Replace the running rollups with a full recompute"""
+        raise NotImplementedError
+
+    def recompute_rollups(self) -> Dict[RollupKey, Dict[str, float]]:
+        """Recompute every rollup from scratch by walking all deals"""
+        rollups: Dict[RollupKey, Dict[str, float]] = {}
+        for deal in self.iter_all():
+            _apply_delta(rollups, _rollup_keys(deal), _rollup_delta(self.metrics(deal), 1))
+        return rollups
+
+
+class InMemoryDealRepository(DealRepository):
+    """Process-local deal storage backed by a dict"""
+
+    def __init__(self, model: Type[BaseModel], metrics: DealMetrics):
+        super().__init__(model, metrics)
+        self._deals: Dict[str, BaseModel] = {}
+        # Serialized documents, replaced together with the deals
+        self._json: Dict[str, bytes] = {}
+        self._rollups: Dict[RollupKey, Dict[str, float]] = {}
+        self._counter = 0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def _track(self, deal: BaseModel, sign: int) -> None:
+        _apply_delta(self._rollups, _rollup_keys(deal), _rollup_delta(self.metrics(deal), sign))
+
+    def add_many(self, deals_data: List[Dict[str, Any]]) -> List[BaseModel]:
+        deals = []
+        with self._lock:
+            for deal_data in deals_data:
+                self._counter += 1
+                deal = self.model(id=str(self._counter), **deal_data)
+                self._deals[deal.id] = deal
+                self._json[deal.id] = deal.model_dump_json().encode()
+                self._track(deal, 1)
+                deals.append(deal)
+            self._version += 1
+        return deals
+
+    def get(self, deal_id: str) -> Optional[BaseModel]:
+        return self._deals.get(deal_id)
+
+    def save(self, deal: BaseModel) -> None:
+        with self._lock:
+            previous = self._deals.get(deal.id)
+            if previous is not None:
+                self._track(previous, -1)
+            self._deals[deal.id] = deal
+            self._json[deal.id] = deal.model_dump_json().encode()
+            self._track(deal, 1)
+            self._version += 1
+
+    def patch_many(self, patches: List[DealPatch]) -> List[BaseModel]:
+        with self._lock:
+            # Stage every patch first so a failure leaves the store untouched
+            staged: Dict[str, BaseModel] = {}
+            updated = []
+            for patch in patches:
+                deal_id = patch[0]
+                deal = apply_patch(staged.get(deal_id) or self._deals.get(deal_id), patch)
+                staged[deal_id] = deal
+                updated.append(deal)
+
+            for deal_id, deal in staged.items():
+                self._track(self._deals[deal_id], -1)
+                self._deals[deal_id] = deal
+                self._json[deal_id] = deal.model_dump_json().encode()
+                self._track(deal, 1)
+            self._version += 1
+
+        return updated
+
+    def delete(self, deal_id: str) -> bool:
+        with self._lock:
+            deal = self._deals.pop(deal_id, None)
+            if deal is None:
+                return False
+            del self._json[deal_id]
+            self._track(deal, -1)
+            self._version += 1
+        return True
+
+    def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[BaseModel]:
+        filters = {"status": status, "property_type": property_type, "location": location}
+        filters = {field: value for field, value in filters.items() if value is not None}
+
+        matching = (
+            deal for deal in list(self._deals.values())
+            if all(getattr(deal, field) == value for field, value in filters.items())
+            and (after is None or cursor_for(deal) > after)
+        )
+        return heapq.nsmallest(skip + limit, matching, key=cursor_for)[skip:]
+
+    def list_json(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[Tuple[DealCursor, bytes]]:
+        # Under the lock so no deal is paired with the document of another version
+        with self._lock:
+            deals = self.list(skip, limit, status, property_type, location, after)
+            return [(cursor_for(deal), self._json[deal.id]) for deal in deals]
+
+    def get_json(self, deal_id: str) -> Optional[bytes]:
+        return self._json.get(deal_id)
+
+    def _count_matching(self, filters: Dict[str, str]) -> int:
+        return sum(
+            all(getattr(deal, field) == value for field, value in filters.items())
+            for deal in list(self._deals.values())
+        )
+
+    def version(self) -> int:
+        return self._version
+
+    def iter_all(self) -> Iterator[BaseModel]:
+        return iter(list(self._deals.values()))
+
+    def get_rollup(self, dimension: str = "all", key: str = "") -> Dict[str, float]:
+        return dict(self._rollups.get((dimension, key)) or empty_rollup())
+
+    def get_rollups(self, dimension: str) -> Dict[str, Dict[str, float]]:
+        return {
+            key: dict(rollup)
+            for (rollup_dimension, key), rollup in list(self._rollups.items())
+            if rollup_dimension == dimension and rollup["deal_count"] > 0
+        }
+
+    def stored_rollups(self) -> Dict[RollupKey, Dict[str, float]]:
+        return {key: dict(rollup) for key, rollup in list(self._rollups.items()) if rollup["deal_count"] > 0}
+
+    def rebuild_rollups(self) -> None:
+        with self._lock:
+            self._rollups = self.recompute_rollups()
+
+
+class SQLiteDealRepository(DealRepository):
+    """Deal storage in an embedded SQLite database using write-ahead logging"""
+
+    def __init__(self, model: Type[BaseModel], metrics: DealMetrics, path: str):
+        super().__init__(model, metrics)
+        self.path = path
+        self._local = threading.local()
+        self._create_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get the connection for the current thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self) -> None:
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS deals (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                property_type TEXT NOT NULL,
+                location TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        # Filtered lists are ordered by (updated_at, id), so each filter index carries
+        # updated_at (the rowid id is implicit in every index)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_deals_updated_at ON deals (updated_at)")
+        for field in INDEXED_FIELDS:
+            conn.execute(f"DROP INDEX IF EXISTS ix_deals_{field}")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS ix_deals_{field}_updated_at ON deals ({field}, updated_at)")
+
+        conn.execute("CREATE TABLE IF NOT EXISTS deal_store_meta (name TEXT PRIMARY KEY, value)")
+        conn.execute("INSERT OR IGNORE INTO deal_store_meta (name, value) VALUES ('version', 0)")
+
+        columns = ", ".join(
+            f"{column} INTEGER NOT NULL DEFAULT 0" if column.endswith("count") else f"{column} REAL NOT NULL DEFAULT 0"
+            for column in ROLLUP_COLUMNS
+        )
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS deal_rollups (
+                dimension TEXT NOT NULL,
+                key TEXT NOT NULL,
+                {columns},
+                PRIMARY KEY (dimension, key)
+            )
+            """
+        )
+
+        # Databases created before rollups existed, or with other rollup dimensions,
+        # need them backfilled once
+        dimensions = ",".join(ROLLUP_DIMENSIONS)
+        stored = conn.execute("SELECT value FROM deal_store_meta WHERE name = 'rollup_dimensions'").fetchone()
+        if stored is None or stored[0] != dimensions:
+            if conn.execute("SELECT 1 FROM deals LIMIT 1").fetchone():
+                self.rebuild_rollups()
+            conn.execute(
+                "INSERT OR REPLACE INTO deal_store_meta (name, value) VALUES ('rollup_dimensions', ?)",
+                (dimensions,)
+            )
+
+    def _track(self, conn: sqlite3.Connection, deal: BaseModel, sign: int) -> None:
+        """Add (sign=1) or remove (sign=-1) a deal from its rollups inside the current transaction"""
+        deltas: Dict[RollupKey, Dict[str, float]] = {}
+        _apply_delta(deltas, _rollup_keys(deal), _rollup_delta(self.metrics(deal), sign))
+        self._apply_rollup_deltas(conn, deltas)
+
+    def _apply_rollup_deltas(self, conn: sqlite3.Connection, deltas: Dict[RollupKey, Dict[str, float]]) -> None:
+        """Add per-rollup changes to the stored rollups inside the current transaction"""
+        placeholders = ", ".join("?" for _ in ROLLUP_COLUMNS)
+        updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in ROLLUP_COLUMNS)
+        conn.executemany(
+            f"""
+            INSERT INTO deal_rollups (dimension, key, {", ".join(ROLLUP_COLUMNS)})
+            VALUES (?, ?, {placeholders})
+            ON CONFLICT (dimension, key) DO UPDATE SET {updates}
+            """,
+            [key + tuple(delta[column] for column in ROLLUP_COLUMNS) for key, delta in deltas.items()]
+        )
+
+    def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a write in its own transaction so deals and rollups change together"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(conn)
+            conn.execute("UPDATE deal_store_meta SET value = value + 1 WHERE name = 'version'")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _get(self, conn: sqlite3.Connection, deal_id: str) -> Optional[BaseModel]:
+        row = conn.execute("SELECT data FROM deals WHERE id = ?", (deal_id,)).fetchone()
+        return self._load(row[0]) if row else None
+
+    def _load(self, data: str) -> BaseModel:
+        return self.model.model_validate_json(data)
+
+    def add_many(self, deals_data: List[Dict[str, Any]]) -> List[BaseModel]:
+        def insert(conn: sqlite3.Connection) -> List[BaseModel]:
+            deals = []
+            # Rollup changes are summed per group and written once for the whole batch
+            deltas: Dict[RollupKey, Dict[str, float]] = {}
+            for deal_data in deals_data:
+                cursor = conn.execute(
+                    "INSERT INTO deals (status, property_type, location, updated_at, data) VALUES (?, ?, ?, ?, '')",
+                    (
+                        deal_data["status"],
+                        deal_data["property_type"],
+                        deal_data["location"],
+                        _timestamp(deal_data["updated_at"]),
+                    )
+                )
+                deal = self.model(id=str(cursor.lastrowid), **deal_data)
+                conn.execute("UPDATE deals SET data = ? WHERE id = ?", (deal.model_dump_json(), cursor.lastrowid))
+                _apply_delta(deltas, _rollup_keys(deal), _rollup_delta(self.metrics(deal), 1))
+                deals.append(deal)
+
+            self._apply_rollup_deltas(conn, deltas)
+            return deals
+
+        return self._write(insert)
+
+    def get(self, deal_id: str) -> Optional[BaseModel]:
+        return self._get(self._connect(), deal_id)
+
+    def _replace(self, conn: sqlite3.Connection, previous: BaseModel, deal: BaseModel) -> None:
+        """Replace a stored deal and move it between rollups inside the current transaction"""
+        conn.execute(
+            "UPDATE deals SET status = ?, property_type = ?, location = ?, updated_at = ?, data = ? WHERE id = ?",
+            (
+                deal.status,
+                deal.property_type,
+                deal.location,
+                _timestamp(deal.updated_at),
+                deal.model_dump_json(),
+                deal.id,
+            )
+        )
+        self._track(conn, previous, -1)
+        self._track(conn, deal, 1)
+
+    def save(self, deal: BaseModel) -> None:
+        def update(conn: sqlite3.Connection) -> None:
+            previous = self._get(conn, deal.id)
+            if previous is not None:
+                self._replace(conn, previous, deal)
+
+        self._write(update)
+
+    def patch_many(self, patches: List[DealPatch]) -> List[BaseModel]:
+        def update(conn: sqlite3.Connection) -> List[BaseModel]:
+            updated = []
+            for patch in patches:
+                # Read inside the transaction, so a deal patched twice sees its first patch
+                previous = self._get(conn, patch[0])
+                deal = apply_patch(previous, patch)
+                self._replace(conn, previous, deal)
+                updated.append(deal)
+            return updated
+
+        return self._write(update)
+
+    def delete(self, deal_id: str) -> bool:
+        def remove(conn: sqlite3.Connection) -> bool:
+            deal = self._get(conn, deal_id)
+            if deal is None:
+                return False
+            conn.execute("DELETE FROM deals WHERE id = ?", (deal_id,))
+            self._track(conn, deal, -1)
+            return True
+
+        return self._write(remove)
+
+    def list(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[BaseModel]:
+        rows = self._select_page(skip, limit, status, property_type, location, after)
+        return [self._load(row[2]) for row in rows]
+
+    def list_json(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        status: Optional[str] = None,
+        property_type: Optional[str] = None,
+        location: Optional[str] = None,
+        after: Optional[DealCursor] = None
+    ) -> List[Tuple[DealCursor, bytes]]:
+        rows = self._select_page(skip, limit, status, property_type, location, after)
+        return [((row[0], row[1]), row[2].encode()) for row in rows]
+
+    def _select_page(
+        self,
+        skip: int,
+        limit: int,
+        status: Optional[str],
+        property_type: Optional[str],
+        location: Optional[str],
+        after: Optional[DealCursor]
+    ) -> List[Tuple[str, int, str]]:
+        """Select (updated_at, id, data) rows of a page of deals"""
+        filters = {"status": status, "property_type": property_type, "location": location}
+        clauses = [f"{field} = ?" for field, value in filters.items() if value is not None]
+        params: List[Any] = [value for value in filters.values() if value is not None]
+
+        if after is not None:
+            # Seeks straight to the cursor through the (filter, updated_at) index
+            clauses.append("(updated_at, id) > (?, ?)")
+            params.extend(after)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._connect().execute(
+            f"SELECT updated_at, id, data FROM deals {where} ORDER BY updated_at, id LIMIT ? OFFSET ?",
+            params + [limit, skip]
+        ).fetchall()
+
+    def get_json(self, deal_id: str) -> Optional[bytes]:
+        row = self._connect().execute("SELECT data FROM deals WHERE id = ?", (deal_id,)).fetchone()
+        return row[0].encode() if row else None
+
+    def _count_matching(self, filters: Dict[str, str]) -> int:
+        where = " AND ".join(f"{field} = ?" for field in filters)
+        return self._connect().execute(f"SELECT COUNT(*) FROM deals WHERE {where}", list(filters.values())).fetchone()[0]
+
+    def version(self) -> int:
+        return self._connect().execute("SELECT value FROM deal_store_meta WHERE name = 'version'").fetchone()[0]
+
+    def iter_all(self) -> Iterator[BaseModel]:
+        conn = self._connect()
+        last_id = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, data FROM deals WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, ITER_BATCH_SIZE)
+            ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._load(row[1])
+            last_id = rows[-1][0]
+
+    def _rollup_from_row(self, row: Tuple) -> Dict[str, float]:
+        return dict(zip(ROLLUP_COLUMNS, row))
+
+    def get_rollup(self, dimension: str = "all", key: str = "") -> Dict[str, float]:
+        row = self._connect().execute(
+            f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM deal_rollups WHERE dimension = ? AND key = ?",
+            (dimension, key)
+        ).fetchone()
+        return self._rollup_from_row(row) if row else empty_rollup()
+
+    def get_rollups(self, dimension: str) -> Dict[str, Dict[str, float]]:
+        rows = self._connect().execute(
+            f"SELECT key, {', '.join(ROLLUP_COLUMNS)} FROM deal_rollups WHERE dimension = ? AND deal_count > 0",
+            (dimension,)
+        ).fetchall()
+        return {row[0]: self._rollup_from_row(row[1:]) for row in rows}
+
+    def stored_rollups(self) -> Dict[RollupKey, Dict[str, float]]:
+        rows = self._connect().execute(
+            f"SELECT dimension, key, {', '.join(ROLLUP_COLUMNS)} FROM deal_rollups WHERE deal_count > 0"
+        ).fetchall()
+        return {(row[0], row[1]): self._rollup_from_row(row[2:]) for row in rows}
+
+    def rebuild_rollups(self) -> None:
+        def rebuild(conn: sqlite3.Connection) -> None:
+            rollups = self.recompute_rollups()
+            conn.execute("DELETE FROM deal_rollups")
+            conn.executemany(
+                f"INSERT INTO deal_rollups (dimension, key, {', '.join(ROLLUP_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in ROLLUP_COLUMNS)})",
+                [key + tuple(rollup[column] for column in ROLLUP_COLUMNS) for key, rollup in rollups.items()]
+            )
+
+        self._write(rebuild)
+
+
+def create_deal_repository(model: Type[BaseModel], metrics: DealMetrics) -> DealRepository:
+    """Create the deal repository configured by the environment"""
+    backend = os.getenv("DEAL_STORE_BACKEND", "sqlite").lower()
+
+    if backend == "memory":
+        return InMemoryDealRepository(model, metrics)
+    if backend == "sqlite":
+        return SQLiteDealRepository(model, metrics, os.getenv("DEAL_STORE_PATH", "deals.db"))
+
+    raise ValueError(f"Unknown deal store backend: {backend}")
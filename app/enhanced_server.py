@@ -1,11 +1,44 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, HTTPException, Request, UploadFile
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any, Literal
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from pydantic_core import to_json
+from typing import IO, List, Dict, Optional, Any, Literal, AsyncIterator, Iterable, Iterator, NamedTuple, Tuple, Union
+import asyncio
+import base64
 import math
 import json
 import os
+from contextlib import aclosing
 from datetime import datetime
+from functools import lru_cache, partial
+
+import numpy as np
+
+from .chat_intents import IntentRouter
+from .chat_sessions import ChatSession, create_chat_session_store, merge_context
+from .deal_store import (
+    DealNotFoundError,
+    DealPatch,
+    DealVersionConflictError,
+    create_deal_repository,
+    decode_cursor,
+    empty_rollup,
+    encode_cursor,
+)
+from .result_cache import create_result_cache
+from .risk_rules import RiskFlag, create_risk_rule_engine
+from .sse import event_stream_response, split_sections
+from .text_lexicon import create_lexicon_engine
+from .underwriting import UNDERWRITING_INPUT_FIELDS, UnderwritingResult, underwrite, underwrite_columns, underwrite_guarded
+from .deal_io import EXPORT_BATCH_SIZE, DealImportFormatError, detect_format, iter_csv_export, iter_import_batches, iter_ndjson_export
+from .lease_clauses import analyze_lease_pieces, analyze_lease_text
+from .lease_ingest import iter_lease_paragraphs, save_upload
+from .llm_gateway import Generation, Messages, create_llm_gateway
+from .lease_jobs import LeaseBatchJob, create_lease_job_manager
+from .monte_carlo import DEFAULT_CORRELATION, DEFAULT_VOLATILITY, correlation_factor, get_executor, run_simulation, shutdown_executor, spawn_seeds
 
 app = FastAPI(title="CRE Platform API", description="Commercial Real Estate Platform API")
 
@@ -40,6 +73,23 @@ class TextAnalysisResponse(BaseModel):
     summary: str
     key_points: List[str]
     sentiment: str
+    keywords: Dict[str, int] = Field(default_factory=dict, description="Occurrences of CRE vocabulary by category")
+
+class TextAnalysisBatchRequest(BaseModel):
+    """Request model for batch text analysis"""
+    texts: List[str] = Field(..., min_length=1, description="The texts to analyze, e.g. market reports")
+
+class TextScoreResult(BaseModel):
+    """Model for the scores of one text in a batch"""
+    word_count: int = Field(..., description="Number of words in the text")
+    positive_count: int = Field(..., description="Occurrences of positive words")
+    negative_count: int = Field(..., description="Occurrences of negative words")
+    sentiment: str = Field(..., description="Positive, Negative or Neutral")
+    keywords: Dict[str, int] = Field(..., description="Occurrences of CRE vocabulary by category")
+
+class TextAnalysisBatchResponse(BaseModel):
+    """Response model for batch text analysis"""
+    results: List[TextScoreResult] = Field(..., description="Scores for each text, in request order")
 
 class InvestmentMemoRequest(BaseModel):
     """Request model for investment memo generation"""
@@ -97,15 +147,86 @@ class UnderwritingResponse(BaseModel):
     development_margin: float
     underwriting_summary: str
 
+class UnderwritingBatchRequest(BaseModel):
+    """Request model for columnar batch underwriting"""
+    project_name: Optional[List[Optional[str]]] = Field(None, description="The names of the projects (optional)")
+    acquisition_price: List[float] = Field(..., description="The acquisition prices of the properties")
+    construction_cost: List[float] = Field(..., description="The construction costs of the properties")
+    square_footage: List[float] = Field(..., description="The total square footage of the properties")
+    projected_rent_per_sf: List[float] = Field(..., description="The projected rents per square foot")
+    vacancy_rate: List[float] = Field(..., description="The vacancy rates as percentages")
+    operating_expenses_per_sf: List[float] = Field(..., description="The operating expenses per square foot")
+    exit_cap_rate: List[float] = Field(..., description="The exit capitalization rates as percentages")
+
+class SensitivityRange(BaseModel):
+    """Model for the values an underwriting input takes across a sensitivity grid"""
+    values: Optional[List[float]] = Field(None, description="Explicit values to evaluate")
+    start: Optional[float] = Field(None, description="First value of an evenly spaced range")
+    stop: Optional[float] = Field(None, description="Last value of an evenly spaced range (inclusive)")
+    steps: Optional[int] = Field(None, ge=1, description="Number of evenly spaced values from start to stop")
+
+class UnderwritingSensitivityRequest(BaseModel):
+    """Request model for an underwriting sensitivity grid"""
+    base: UnderwritingRequest = Field(..., description="The base case; inputs without a range keep these values")
+    ranges: Dict[str, SensitivityRange] = Field(..., min_length=1, description="Values to evaluate for each varied input, keyed by field name")
+    encoding: Literal["json", "base64"] = Field("json", description="Encoding of the result columns: JSON arrays, or base64 little-endian float64")
+
+class SensitivityAxis(BaseModel):
+    """Model for one axis of a sensitivity grid"""
+    field: str = Field(..., description="The varied input")
+    values: List[float] = Field(..., description="The values the input takes along this axis")
+
+class UnderwritingSensitivityResponse(BaseModel):
+    """Response model for an underwriting sensitivity grid"""
+    axes: List[SensitivityAxis] = Field(..., description="The grid axes, in request order")
+    shape: List[int] = Field(..., description="Number of values along each axis")
+    cells: int = Field(..., description="Total number of grid cells")
+    encoding: Literal["json", "base64"] = Field(..., description="Encoding of the result columns")
+    net_operating_income: Union[List[Optional[float]], str] = Field(..., description="NOI for every cell, row-major (last axis varies fastest)")
+    estimated_exit_value: Union[List[Optional[float]], str] = Field(..., description="Exit value for every cell, row-major")
+    development_margin: Union[List[Optional[float]], str] = Field(..., description="Development margin for every cell, row-major")
+
 class ReportRequest(UnderwritingRequest):
     """Request model for report generation"""
     company_name: Optional[str] = Field(None, description="The name of the company generating the report")
     analyst_name: Optional[str] = Field(None, description="The name of the analyst generating the report")
     report_title: Optional[str] = Field(None, description="Custom title for the report")
 
+class SimulationSettings(BaseModel):
+    """Settings for a Monte Carlo simulation of development margin"""
+    paths: int = Field(1_000_000, ge=1_000, le=5_000_000, description="Number of simulated paths")
+    seed: int = Field(0, ge=0, description="Seed of the random generator; the same seed reproduces the same result")
+    rent_volatility: float = Field(DEFAULT_VOLATILITY["projected_rent_per_sf"], ge=0, description="Volatility of rent per SF, relative to the base case")
+    vacancy_volatility: float = Field(DEFAULT_VOLATILITY["vacancy_rate"], ge=0, description="Standard deviation of the vacancy rate in percentage points")
+    opex_volatility: float = Field(DEFAULT_VOLATILITY["operating_expenses_per_sf"], ge=0, description="Volatility of operating expenses per SF, relative to the base case")
+    exit_cap_volatility: float = Field(DEFAULT_VOLATILITY["exit_cap_rate"], ge=0, description="Volatility of the exit cap rate, relative to the base case")
+    correlation: Optional[List[List[float]]] = Field(None, description="4x4 correlation matrix over rent, vacancy, opex and exit cap (defaults to a typical market correlation)")
+
+class SimulationResult(BaseModel):
+    """Distribution of development margin from a Monte Carlo simulation"""
+    paths: int = Field(..., description="Number of simulated paths")
+    seed: int = Field(..., description="Root seed of the simulation request")
+    spawn_key: List[int] = Field(default_factory=list, description="Spawn key of this deal's random stream; np.random.SeedSequence(seed, spawn_key=spawn_key) reproduces it (empty for a single deal)")
+    p5_margin: float = Field(..., description="5th percentile development margin")
+    p50_margin: float = Field(..., description="Median development margin")
+    p95_margin: float = Field(..., description="95th percentile development margin")
+    mean_margin: float = Field(..., description="Mean development margin")
+    probability_margin_below_10: float = Field(..., description="Probability that development margin is below 10%")
+    probability_margin_below_15: float = Field(..., description="Probability that development margin is below 15%")
+    dropped_paths: int = Field(0, description="Paths left out of the statistics because their margin was not finite")
+
 class RiskRequest(UnderwritingRequest):
     """Request model for risk score calculation"""
-    pass
+    simulation: Optional[SimulationSettings] = Field(None, description="Also simulate the distribution of development margin (optional)")
+
+class RiskSimulationBatchRequest(BaseModel):
+    """Request model for simulating several deals"""
+    deals: List[UnderwritingRequest] = Field(..., min_length=1, description="The deals to simulate")
+    simulation: SimulationSettings = Field(default_factory=SimulationSettings, description="Simulation settings shared by all deals")
+
+class RiskSimulationBatchResponse(BaseModel):
+    """Response model for simulating several deals"""
+    results: List[SimulationResult] = Field(..., description="Simulation result of each deal, in request order")
 
 class RiskResponse(BaseModel):
     """Response model for risk score calculation"""
@@ -125,11 +246,23 @@ class RiskResponse(BaseModel):
     development_margin: float
     risk_score: str
     flags: List[str]
+    simulation: Optional[SimulationResult] = None
+
+class RiskScoreBatchRequest(UnderwritingBatchRequest):
+    """Request model for columnar batch risk scoring"""
+    property_type: Optional[List[str]] = Field(None, description="The types of the properties (optional)")
 
 class LeaseAnalysisRequest(BaseModel):
     """Request model for lease analysis"""
     lease_text: str = Field(..., description="The lease text to analyze")
 
+class LeaseClauseMatch(BaseModel):
+    """Model for a keyword match in a lease"""
+    indicator: str = Field(..., description="The keyword that matched")
+    description: str = Field(..., description="What the match indicates")
+    start: int = Field(..., description="Character offset where the match starts")
+    end: int = Field(..., description="Character offset where the match ends")
+
 class LeaseAnalysisResponse(BaseModel):
     """Response model for lease analysis"""
     base_rent: str = Field(..., description="The base rent extracted from the lease")
@@ -137,6 +270,36 @@ class LeaseAnalysisResponse(BaseModel):
     renewals: List[str] = Field(default_factory=list, description="Renewal options extracted from the lease")
     break_clauses: List[str] = Field(default_factory=list, description="Break clauses extracted from the lease")
     red_flags: List[str] = Field(default_factory=list, description="Red flag clauses extracted from the lease")
+    red_flag_matches: List[LeaseClauseMatch] = Field(default_factory=list, description="Every red flag keyword match with its position")
+
+class LeaseUploadResponse(BaseModel):
+    """Response model for an uploaded lease analysis"""
+    file_id: str = Field(..., description="The ID the uploaded file is stored under")
+    filename: Optional[str] = Field(None, description="The original name of the uploaded file")
+    sha256: str = Field(..., description="SHA-256 hash of the uploaded file")
+    size_bytes: int = Field(..., description="Size of the uploaded file in bytes")
+    paragraphs: int = Field(..., description="Number of paragraphs extracted from the document")
+    characters: int = Field(..., description="Number of characters of text extracted from the document")
+    analysis: LeaseAnalysisResponse = Field(..., description="The lease analysis")
+
+class LeaseBatchDocument(BaseModel):
+    """Model for one document in a batch lease analysis"""
+    document_id: Optional[str] = Field(None, description="Caller-supplied ID echoed back with the result")
+    lease_text: str = Field(..., description="The lease text to analyze")
+
+class LeaseBatchRequest(BaseModel):
+    """Request model for batch lease analysis"""
+    documents: List[LeaseBatchDocument] = Field(..., min_length=1, description="The lease documents to analyze")
+
+class LeaseBatchJobResponse(BaseModel):
+    """Response model for batch lease analysis job progress"""
+    job_id: str = Field(..., description="The ID of the job")
+    status: Literal["queued", "running", "completed", "failed"] = Field(..., description="The status of the job")
+    total: int = Field(..., description="Number of documents in the job")
+    completed: int = Field(..., description="Number of documents analyzed successfully")
+    failed: int = Field(..., description="Number of documents that could not be analyzed")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    finished_at: Optional[datetime] = Field(None, description="When the job finished")
 
 class PortfolioSummaryResponse(BaseModel):
     """Response model for portfolio summary"""
@@ -147,6 +310,30 @@ class PortfolioSummaryResponse(BaseModel):
     average_project_cost: float = Field(..., description="Average project cost across all deals")
     user_id: Optional[str] = Field(None, description="User ID if filtered by user")
 
+class CacheStatsResponse(BaseModel):
+    """Response model for result cache statistics"""
+    hits: int = Field(..., description="Number of requests served from the cache")
+    misses: int = Field(..., description="Number of requests that had to be computed")
+    evictions: int = Field(..., description="Number of entries evicted to stay within the size limits")
+    expirations: int = Field(..., description="Number of entries dropped because their TTL passed")
+    entries: int = Field(..., description="Number of entries currently cached")
+    bytes: int = Field(..., description="Approximate memory used by cached responses in bytes")
+    max_entries: int = Field(..., description="Maximum number of cached entries")
+    max_bytes: int = Field(..., description="Maximum memory for cached responses in bytes")
+    ttl_seconds: float = Field(..., description="How long a cached response stays valid in seconds")
+
+class PortfolioBreakdownResponse(BaseModel):
+    """Response model for portfolio summaries grouped by a deal attribute"""
+    group_by: str = Field(..., description="The deal attribute the summaries are grouped by")
+    groups: Dict[str, PortfolioSummaryResponse] = Field(..., description="Portfolio summary for each group")
+
+class PortfolioConsistencyResponse(BaseModel):
+    """Response model for the portfolio aggregate consistency check"""
+    consistent: bool = Field(..., description="Whether the running aggregates match a full recompute")
+    checked_groups: int = Field(..., description="Number of aggregate groups compared")
+    mismatches: List[str] = Field(default_factory=list, description="Aggregate groups that differ from the recompute")
+    repaired: bool = Field(False, description="Whether the running aggregates were rebuilt from the recompute")
+
 class AIChatRequest(BaseModel):
     """Request model for AI chat"""
     message: str = Field(..., description="The user's question about a deal")
@@ -170,6 +357,24 @@ class ConversationalAIChatResponse(BaseModel):
     """Response model for conversational AI chat"""
     reply: str = Field(..., description="The AI's response to the conversation")
 
+class ChatSessionCreateRequest(BaseModel):
+    """Request model for starting an AI chat session"""
+    context: Dict[str, Any] = Field(default_factory=dict, description="The deal context with property details")
+    messages: List[ChatMessage] = Field(default_factory=list, description="Earlier conversation history to carry over (optional)")
+
+class ChatSessionMessageRequest(BaseModel):
+    """Request model for one turn of an AI chat session"""
+    message: str = Field(..., min_length=1, description="The user's new message")
+    context: Optional[Dict[str, Any]] = Field(None, description="Changes to the deal context as a JSON merge patch; null removes a field (optional)")
+
+class ChatSessionResponse(BaseModel):
+    """Response model for an AI chat session"""
+    session_id: str = Field(..., description="The ID of the session")
+    context: Dict[str, Any] = Field(..., description="The current deal context")
+    messages: List[ChatMessage] = Field(..., description="The conversation history")
+    created_at: datetime = Field(..., description="When the session was started")
+    expires_at: datetime = Field(..., description="When the session expires unless used again")
+
 class DealBase(BaseModel):
     """Base model for deal data"""
     project_name: str = Field(..., description="The name of the project")
@@ -183,6 +388,7 @@ class DealBase(BaseModel):
     operating_expenses_per_sf: float = Field(..., description="The operating expenses per square foot")
     exit_cap_rate: float = Field(..., description="The exit capitalization rate as a percentage")
     status: str = Field(default="Draft", description="The status of the deal")
+    user_id: Optional[str] = Field(None, description="The ID of the user who owns the deal")
 
 class DealCreate(DealBase):
     """Model for creating a new deal"""
@@ -204,6 +410,8 @@ class DealUpdate(BaseModel):
     underwriting_result: Optional[Dict] = Field(None, description="The underwriting result data")
     ai_memo: Optional[str] = Field(None, description="AI-generated investment memo")
     status: Optional[str] = Field(None, description="The status of the deal")
+    user_id: Optional[str] = Field(None, description="The ID of the user who owns the deal")
+    version: Optional[int] = Field(None, description="The version the deal is expected to be at; the update is rejected with 409 if it has changed since (optional)")
 
 class Deal(DealBase):
     """Model for a deal with all fields"""
@@ -212,17 +420,102 @@ class Deal(DealBase):
     ai_memo: Optional[str] = Field(None, description="AI-generated investment memo")
     created_at: datetime = Field(..., description="The date and time when the deal was created")
     updated_at: datetime = Field(..., description="The date and time when the deal was last updated")
+    version: int = Field(1, description="The version of the deal, incremented on every update")
 
 class DealList(BaseModel):
     """Model for a list of deals"""
     deals: List[Deal] = Field(..., description="List of deals")
-    total: int = Field(..., description="Total number of deals")
+    total: int = Field(..., description="Total number of deals matching the filters")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, or None on the last page")
+
+class DealBulkUpdate(DealUpdate):
+    """Model for one update in a bulk deal update"""
+    id: str = Field(..., description="The ID of the deal to update")
+
+class DealBulkUpdateRequest(BaseModel):
+    """Request model for updating many deals at once"""
+    updates: List[DealBulkUpdate] = Field(..., min_length=1, description="The updates to apply, in order")
+
+class DealBulkUpdateResponse(BaseModel):
+    """Response model for updating many deals at once"""
+    deals: List[Deal] = Field(..., description="The updated deals, in the order of the updates")
+
+class DealImportRowError(BaseModel):
+    """Model for a row that could not be imported"""
+    row: int = Field(..., description="The 1-based data row (or line) number in the upload")
+    message: str = Field(..., description="Why the row was rejected")
+
+class DealImportResponse(BaseModel):
+    """Response model for a bulk deal import"""
+    format: str = Field(..., description="The format the upload was read as")
+    imported: int = Field(..., description="Number of deals created")
+    failed: int = Field(..., description="Number of rows rejected")
+    errors: List[DealImportRowError] = Field(default_factory=list, description="The first rejected rows and why")
 
 # ----------------- SERVICES -----------------
 
-# In-memory database for deals
-deals_db = {}
-deal_counter = 0
+def calculate_portfolio_metrics(deal: Deal) -> Dict[str, Optional[float]]:
+    """Calculate the per-deal metrics rolled up into portfolio summaries"""
+    # Exit value and development margin are None when they cannot be computed
+    metrics = underwrite_guarded(
+        deal.acquisition_price,
+        deal.construction_cost,
+        deal.square_footage,
+        deal.projected_rent_per_sf,
+        deal.vacancy_rate,
+        deal.operating_expenses_per_sf,
+        deal.exit_cap_rate
+    )
+
+    return {
+        "cap_rate": deal.exit_cap_rate,
+        "development_margin": metrics.development_margin,
+        "exit_value": metrics.estimated_exit_value,
+        "project_cost": metrics.project_cost
+    }
+
+# Deal storage (SQLite by default, see deal_store.py)
+deal_repository = create_deal_repository(Deal, calculate_portfolio_metrics)
+
+# Cache for underwriting, risk and memo results keyed by request hash (see result_cache.py)
+result_cache = create_result_cache()
+
+# Declarative risk rules over underwriting inputs, results and property type,
+# hot-reloaded from RISK_RULES_PATH when set (see risk_rules.py)
+risk_rules = create_risk_rule_engine(UNDERWRITING_INPUT_FIELDS + UnderwritingResult._fields)
+
+# Sentiment and CRE keyword lexicons for text analysis (see text_lexicon.py)
+text_lexicon = create_lexicon_engine()
+
+# Texts scored per batch text analysis request
+TEXT_ANALYSIS_MAX_BATCH = 10_000
+
+# Server-side AI chat sessions (see chat_sessions.py)
+chat_sessions = create_chat_session_store()
+
+# Model-written narratives with template fallback, enabled by FIREWORKS_API_KEY (see llm_gateway.py)
+llm_gateway = create_llm_gateway()
+app.router.on_shutdown.append(llm_gateway.aclose)
+
+NARRATIVE_SYSTEM_PROMPT = (
+    "You are a senior commercial real estate investment analyst. Write clear, professional Markdown. "
+    "Use only the figures you are given and never change them."
+)
+
+MEMO_INSTRUCTIONS = "Rewrite this investment memo draft into a polished memo for an investment committee, keeping its section headings and every figure:"
+
+UNDERWRITING_INSTRUCTIONS = "Rewrite this underwriting summary draft into a polished summary for an investment committee, keeping its section headings and every figure:"
+
+CHAT_SYSTEM_PROMPT = (
+    "You are an AI assistant helping a commercial real estate investor analyze a deal. "
+    "Answer the user's last message concisely, using only the deal context and the rules-based answer below for figures."
+)
+
+# Most recent conversation messages sent to the model with a chat turn
+CHAT_HISTORY_MESSAGES = 20
+
+# Reply to a conversation without a user message
+CHAT_GREETING = "I'm here to help with your commercial real estate analysis. What would you like to know about the deal?"
 
 def calculate_roi(request: RoiRequest) -> RoiResponse:
     """Calculate ROI for a property"""
@@ -237,9 +530,9 @@ def analyze_text(request: TextAnalysisRequest) -> TextAnalysisResponse:
     """Analyze text using a fallback response"""
     text = request.text
 
-    # Simple fallback analysis
-    words = text.split()
-    word_count = len(words)
+    # Score sentiment and CRE topics against the lexicons
+    score = text_lexicon.score(text)
+    word_count = score.word_count
 
     # Generate a simple summary
     summary = f"This is a {word_count} word text about real estate."
@@ -251,37 +544,29 @@ def analyze_text(request: TextAnalysisRequest) -> TextAnalysisResponse:
         "Further analysis would require more sophisticated NLP techniques."
     ]
 
-    # Determine sentiment (very basic)
-    positive_words = ["good", "great", "excellent", "positive", "profit", "gain", "opportunity", "growth"]
-    negative_words = ["bad", "poor", "negative", "loss", "risk", "decline", "downturn", "problem"]
-
-    positive_count = sum(1 for word in words if word.lower() in positive_words)
-    negative_count = sum(1 for word in words if word.lower() in negative_words)
-
-    if positive_count > negative_count:
-        sentiment = "Positive"
-    elif negative_count > positive_count:
-        sentiment = "Negative"
-    else:
-        sentiment = "Neutral"
-
     return TextAnalysisResponse(
         text=text,
         summary=summary,
         key_points=key_points,
-        sentiment=sentiment
+        sentiment=score.sentiment,
+        keywords=score.keywords
     )
 
-def generate_investment_memo(request: InvestmentMemoRequest) -> InvestmentMemoResponse:
-    """Generate an investment memo using a fallback response"""
-    # Calculate price per square foot
-    price_per_sf = request.asking_price / request.square_footage
+def analyze_texts(request: TextAnalysisBatchRequest) -> bytes:
+    """Score a batch of texts and serialize the response"""
+    if len(request.texts) > TEXT_ANALYSIS_MAX_BATCH:
+        raise HTTPException(status_code=422, detail=f"At most {TEXT_ANALYSIS_MAX_BATCH} texts can be analyzed per request")
 
-    # Generate a fallback memo
-    memo = f"""
+    results = [score._asdict() for score in text_lexicon.score_many(request.texts)]
+    return to_json({"results": results})
+
+def iter_investment_memo_sections(request: InvestmentMemoRequest, price_per_sf: float) -> Iterator[str]:
+    """Generate the sections of an investment memo in order"""
+    yield f"""
 # Investment Memo: {request.property_name}
 
-## Property Overview
+"""
+    yield f"""## Property Overview
 - **Location**: {request.location}
 - **Property Type**: {request.property_type}
 - **Square Footage**: {request.square_footage:,.0f} SF
@@ -290,24 +575,37 @@ def generate_investment_memo(request: InvestmentMemoRequest) -> InvestmentMemoRe
 - **Cap Rate**: {request.cap_rate}%
 - **Occupancy Rate**: {request.occupancy_rate}%
 
-## Investment Thesis
+"""
+    yield f"""## Investment Thesis
 This {request.property_type} property located in {request.location} presents an attractive investment opportunity with a cap rate of {request.cap_rate}% and current occupancy of {request.occupancy_rate}%.
 
-## Market Analysis
+"""
+    yield f"""## Market Analysis
 The {request.location} market has shown stable growth in the {request.property_type} sector, with increasing demand from both tenants and investors.
 
-## Financial Analysis
+"""
+    yield f"""## Financial Analysis
 At an asking price of ${request.asking_price:,.2f} (${price_per_sf:.2f} per SF) and a cap rate of {request.cap_rate}%, this property is expected to generate strong cash flows.
 
-## Risk Factors
+"""
+    yield """## Risk Factors
 - Market competition
 - Potential economic downturn
 - Property-specific maintenance issues
 
-## Recommendation
+"""
+    yield f"""## Recommendation
 Based on the current cap rate of {request.cap_rate}% and occupancy rate of {request.occupancy_rate}%, this property represents a {get_recommendation(request.cap_rate, request.occupancy_rate)} investment opportunity.
 """
 
+def generate_investment_memo(request: InvestmentMemoRequest) -> InvestmentMemoResponse:
+    """Generate an investment memo using a fallback response"""
+    # Calculate price per square foot
+    price_per_sf = request.asking_price / request.square_footage
+
+    # Generate a fallback memo
+    memo = "".join(iter_investment_memo_sections(request, price_per_sf))
+
     return InvestmentMemoResponse(
         property_name=request.property_name,
         location=request.location,
@@ -331,39 +629,229 @@ def get_recommendation(cap_rate: float, occupancy_rate: float) -> str:
 
 def perform_underwriting_calculations(request: UnderwritingRequest) -> dict:
     """Perform underwriting calculations"""
-    # Calculate Gross Potential Income (GPI)
-    gross_potential_income = request.square_footage * request.projected_rent_per_sf
+    return underwrite(
+        request.acquisition_price,
+        request.construction_cost,
+        request.square_footage,
+        request.projected_rent_per_sf,
+        request.vacancy_rate,
+        request.operating_expenses_per_sf,
+        request.exit_cap_rate
+    ).to_dict()
+
+# Rows serialized per chunk when streaming batch results
+UNDERWRITING_BATCH_CHUNK_SIZE = 1000
+
+def perform_underwriting_calculations_batch(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Perform underwriting calculations for many deals in one vectorized pass
 
-    # Calculate Effective Gross Income (EGI)
-    effective_gross_income = gross_potential_income * (1 - request.vacancy_rate / 100)
+    The same underwrite() call as perform_underwriting_calculations, on arrays,
+    so every row matches the scalar result exactly. Rows that would divide by
+    zero come back as inf/nan instead of failing the whole batch.
+    """
+    return underwrite_columns(columns).to_dict()
 
-    # Calculate Operating Expenses
-    operating_expenses = request.square_footage * request.operating_expenses_per_sf
+def parse_underwriting_batch_columns(request: UnderwritingBatchRequest) -> Tuple[Dict[str, np.ndarray], Optional[List[Optional[str]]]]:
+    """Convert a columnar batch request into float arrays"""
+    lengths = {len(getattr(request, field)) for field in UNDERWRITING_INPUT_FIELDS}
+    if request.project_name is not None:
+        lengths.add(len(request.project_name))
 
-    # Calculate Net Operating Income (NOI)
-    net_operating_income = effective_gross_income - operating_expenses
+    if len(lengths) > 1:
+        raise HTTPException(status_code=422, detail="All batch columns must have the same length")
 
-    # Calculate Total Project Cost
-    project_cost = request.acquisition_price + request.construction_cost
+    columns = {
+        field: np.asarray(getattr(request, field), dtype=np.float64)
+        for field in UNDERWRITING_INPUT_FIELDS
+    }
+    return columns, request.project_name
+
+def parse_underwriting_batch_ndjson(body: bytes) -> Tuple[Dict[str, np.ndarray], Optional[List[Optional[str]]]]:
+    """Convert an NDJSON body (one underwriting request per line) into float arrays"""
+    values: Dict[str, List[float]] = {field: [] for field in UNDERWRITING_INPUT_FIELDS}
+    project_names: List[Optional[str]] = []
+
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+            for field in UNDERWRITING_INPUT_FIELDS:
+                values[field].append(float(row[field]))
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=422, detail=f"Line {line_number}: invalid JSON")
+        except KeyError as e:
+            raise HTTPException(status_code=422, detail=f"Line {line_number}: missing field {e.args[0]}")
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Line {line_number}: numeric fields must be numbers")
+
+        # A missing or null name stays null in the output instead of becoming the string "None"
+        project_name = row.get("project_name")
+        project_names.append(None if project_name is None else str(project_name))
+
+    columns = {field: np.asarray(column, dtype=np.float64) for field, column in values.items()}
+    return columns, project_names
+
+def iter_underwriting_batch_ndjson(
+    columns: Dict[str, np.ndarray],
+    calculations: Dict[str, np.ndarray],
+    project_names: Optional[List[Optional[str]]] = None,
+    chunk_size: int = UNDERWRITING_BATCH_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Serialize batch underwriting results as NDJSON, one chunk of rows at a time"""
+    total = len(columns["square_footage"])
+
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        chunk = {name: values[start:stop].tolist() for name, values in calculations.items()}
+
+        lines = []
+        for offset in range(stop - start):
+            row: Dict[str, Any] = {"index": start + offset}
+            if project_names is not None:
+                row["project_name"] = project_names[start + offset]
+            for name, values in chunk.items():
+                value = values[offset]
+                # JSON has no representation for inf/nan (e.g. a zero exit cap rate)
+                row[name] = value if math.isfinite(value) else None
+            lines.append(json.dumps(row))
+
+        yield ("\n".join(lines) + "\n").encode()
+
+# Calculated values reported for each deal of a risk batch
+RISK_BATCH_OUTPUTS = ("net_operating_income", "project_cost", "estimated_exit_value", "development_margin")
+
+def score_risk_batch(request: RiskScoreBatchRequest) -> Tuple[Dict[str, np.ndarray], List[Optional[str]], List[List[RiskFlag]]]:
+    """Underwrite, score and flag every deal of a batch in one vectorized pass"""
+    columns, _ = parse_underwriting_batch_columns(request)
+    count = len(columns["square_footage"])
+
+    property_types = request.property_type
+    if property_types is None:
+        property_types = [""] * count
+    elif len(property_types) != count:
+        raise HTTPException(status_code=422, detail="All batch columns must have the same length")
+
+    calculations = perform_underwriting_calculations_batch(columns)
+    assessment = risk_rules.evaluate(dict(columns, **calculations, property_type=property_types))
+    return calculations, assessment.risk_scores, assessment.flags
+
+def iter_risk_batch_ndjson(
+    request: RiskScoreBatchRequest,
+    calculations: Dict[str, np.ndarray],
+    risk_scores: List[Optional[str]],
+    flags: List[List[RiskFlag]],
+    chunk_size: int = UNDERWRITING_BATCH_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Serialize batch risk results as NDJSON, one chunk of rows at a time"""
+    total = len(risk_scores)
+
+    for start in range(0, total, chunk_size):
+        stop = min(start + chunk_size, total)
+        chunk = {name: calculations[name][start:stop].tolist() for name in RISK_BATCH_OUTPUTS}
+
+        lines = []
+        for offset in range(stop - start):
+            index = start + offset
+            row: Dict[str, Any] = {"index": index}
+            if request.project_name is not None:
+                row["project_name"] = request.project_name[index]
+            for name, values in chunk.items():
+                value = values[offset]
+                # JSON has no representation for inf/nan (e.g. a zero exit cap rate)
+                row[name] = value if math.isfinite(value) else None
+            row["risk_score"] = risk_scores[index]
+            row["flags"] = [flag._asdict() for flag in flags[index]]
+            lines.append(json.dumps(row))
+
+        yield ("\n".join(lines) + "\n").encode()
+
+# Largest sensitivity grid computed in one request
+UNDERWRITING_SENSITIVITY_MAX_CELLS = 2_000_000
+
+# Outputs returned for every cell of a sensitivity grid
+UNDERWRITING_SENSITIVITY_OUTPUTS = ("net_operating_income", "estimated_exit_value", "development_margin")
+
+def build_sensitivity_axes(ranges: Dict[str, SensitivityRange]) -> List[Tuple[str, np.ndarray]]:
+    """Convert the requested ranges into one array of values per grid axis"""
+    axes = []
+    cells = 1
+
+    for field, sensitivity_range in ranges.items():
+        if field not in UNDERWRITING_INPUT_FIELDS:
+            raise HTTPException(status_code=422, detail=f"Unknown underwriting input '{field}'; expected one of {', '.join(UNDERWRITING_INPUT_FIELDS)}")
+
+        if sensitivity_range.values is not None:
+            values = np.asarray(sensitivity_range.values, dtype=np.float64)
+        elif None not in (sensitivity_range.start, sensitivity_range.stop, sensitivity_range.steps):
+            values = np.linspace(sensitivity_range.start, sensitivity_range.stop, sensitivity_range.steps)
+        else:
+            raise HTTPException(status_code=422, detail=f"Range for '{field}' needs either values or start, stop and steps")
 
-    # Calculate Estimated Exit Value
-    estimated_exit_value = net_operating_income / (request.exit_cap_rate / 100)
+        if values.size == 0:
+            raise HTTPException(status_code=422, detail=f"Range for '{field}' has no values")
 
-    # Calculate Development Margin
-    development_margin = (estimated_exit_value - project_cost) / project_cost * 100
+        cells *= values.size
+        if cells > UNDERWRITING_SENSITIVITY_MAX_CELLS:
+            raise HTTPException(status_code=422, detail=f"Sensitivity grid exceeds {UNDERWRITING_SENSITIVITY_MAX_CELLS:,} cells")
 
-    return {
-        "gross_potential_income": gross_potential_income,
-        "effective_gross_income": effective_gross_income,
-        "operating_expenses": operating_expenses,
-        "net_operating_income": net_operating_income,
-        "project_cost": project_cost,
-        "estimated_exit_value": estimated_exit_value,
-        "development_margin": development_margin
+        axes.append((field, values))
+
+    return axes
+
+def perform_underwriting_sensitivity(base: UnderwritingRequest, axes: List[Tuple[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """
+    Perform underwriting calculations over the Cartesian grid of the axes
+
+    Each axis is shaped to broadcast along its own dimension and the other
+    inputs stay scalars, so intermediate values are only as large as the
+    inputs they depend on (project cost never grows with a rent axis).
+
+    Returns:
+        Calculated values for every cell, each with the shape of the grid
+    """
+    columns: Dict[str, Any] = {field: np.float64(getattr(base, field)) for field in UNDERWRITING_INPUT_FIELDS}
+    for dimension, (field, values) in enumerate(axes):
+        shape = [1] * len(axes)
+        shape[dimension] = values.size
+        columns[field] = values.reshape(shape)
+
+    calculations = perform_underwriting_calculations_batch(columns)
+
+    grid_shape = tuple(values.size for _, values in axes)
+    return {name: np.broadcast_to(calculations[name], grid_shape) for name in UNDERWRITING_SENSITIVITY_OUTPUTS}
+
+def encode_sensitivity_column(values: np.ndarray, encoding: str) -> Union[List[Optional[float]], str]:
+    """Flatten a grid of results row-major and encode it for the response"""
+    if encoding == "base64":
+        return base64.b64encode(np.ascontiguousarray(values, dtype="<f8").tobytes()).decode("ascii")
+
+    flat = values.ravel().tolist()
+    if not np.isfinite(values).all():
+        # JSON has no representation for inf/nan (e.g. a zero exit cap rate)
+        flat = [value if math.isfinite(value) else None for value in flat]
+    return flat
+
+def build_underwriting_sensitivity(request: UnderwritingSensitivityRequest) -> bytes:
+    """Compute a sensitivity grid and serialize it as a columnar JSON payload"""
+    axes = build_sensitivity_axes(request.ranges)
+    grid = perform_underwriting_sensitivity(request.base, axes)
+
+    payload: Dict[str, Any] = {
+        "axes": [{"field": field, "values": values.tolist()} for field, values in axes],
+        "shape": [values.size for _, values in axes],
+        "cells": int(np.prod([values.size for _, values in axes])),
+        "encoding": request.encoding,
     }
+    for name in UNDERWRITING_SENSITIVITY_OUTPUTS:
+        payload[name] = encode_sensitivity_column(grid[name], request.encoding)
 
-def generate_underwriting_summary(request: UnderwritingRequest, calculations: dict) -> str:
-    """Generate an underwriting summary using a fallback response"""
+    return json.dumps(payload).encode()
+
+def iter_underwriting_summary_sections(request: UnderwritingRequest, calculations: dict) -> Iterator[str]:
+    """Generate the sections of an underwriting summary in order"""
     # Format currency values
     gpi_formatted = f"${calculations['gross_potential_income']:,.2f}"
     egi_formatted = f"${calculations['effective_gross_income']:,.2f}"
@@ -372,16 +860,17 @@ def generate_underwriting_summary(request: UnderwritingRequest, calculations: di
     project_cost_formatted = f"${calculations['project_cost']:,.2f}"
     exit_value_formatted = f"${calculations['estimated_exit_value']:,.2f}"
 
-    # Generate a fallback summary
-    summary = f"""
+    yield f"""
 # Underwriting Summary: {request.project_name}
 
-## Property Overview
+"""
+    yield f"""## Property Overview
 - **Location**: {request.location}
 - **Property Type**: {request.property_type}
 - **Square Footage**: {request.square_footage:,.0f} SF
 
-## Financial Analysis
+"""
+    yield f"""## Financial Analysis
 - **Gross Potential Income (GPI)**: {gpi_formatted}
 - **Effective Gross Income (EGI)**: {egi_formatted}
 - **Operating Expenses**: {opex_formatted}
@@ -390,23 +879,59 @@ def generate_underwriting_summary(request: UnderwritingRequest, calculations: di
 - **Estimated Exit Value**: {exit_value_formatted}
 - **Development Margin**: {calculations['development_margin']:.2f}%
 
-## Investment Analysis
+"""
+    yield f"""## Investment Analysis
 This {request.property_type} development project in {request.location} shows a development margin of {calculations['development_margin']:.2f}%, which is {get_margin_assessment(calculations['development_margin'])}.
 
-## Market Considerations
+"""
+    yield f"""## Market Considerations
 The {request.property_type} market in {request.location} has shown {get_market_assessment(request.property_type)} trends, which should be considered when evaluating this investment.
 
-## Risk Factors
+"""
+    yield f"""## Risk Factors
 - Vacancy risk (current projection: {request.vacancy_rate}%)
 - Exit cap rate risk (current assumption: {request.exit_cap_rate}%)
 - Construction cost overruns
 - Market competition
 
-## Recommendation
+"""
+    yield f"""## Recommendation
 Based on the development margin of {calculations['development_margin']:.2f}% and the current market conditions, this project represents a {get_investment_recommendation(calculations['development_margin'])} investment opportunity.
 """
 
-    return summary
+def generate_underwriting_summary(request: UnderwritingRequest, calculations: dict) -> str:
+    """Generate an underwriting summary using a fallback response"""
+    return "".join(iter_underwriting_summary_sections(request, calculations))
+
+def underwrite_property(request: UnderwritingRequest) -> UnderwritingResponse:
+    """Perform underwriting calculations and generate an underwriting summary"""
+    # Perform underwriting calculations
+    calculations = perform_underwriting_calculations(request)
+
+    # Generate underwriting summary
+    underwriting_summary = generate_underwriting_summary(request, calculations)
+
+    # Create and return the response
+    return UnderwritingResponse(
+        project_name=request.project_name,
+        location=request.location,
+        property_type=request.property_type,
+        acquisition_price=request.acquisition_price,
+        construction_cost=request.construction_cost,
+        square_footage=request.square_footage,
+        projected_rent_per_sf=request.projected_rent_per_sf,
+        vacancy_rate=request.vacancy_rate,
+        operating_expenses_per_sf=request.operating_expenses_per_sf,
+        exit_cap_rate=request.exit_cap_rate,
+        gross_potential_income=calculations["gross_potential_income"],
+        effective_gross_income=calculations["effective_gross_income"],
+        operating_expenses=calculations["operating_expenses"],
+        net_operating_income=calculations["net_operating_income"],
+        project_cost=calculations["project_cost"],
+        estimated_exit_value=calculations["estimated_exit_value"],
+        development_margin=calculations["development_margin"],
+        underwriting_summary=underwriting_summary
+    )
 
 def get_margin_assessment(margin: float) -> str:
     """Get an assessment of the development margin"""
@@ -448,49 +973,10 @@ def calculate_risk_score(request: RiskRequest) -> RiskResponse:
     # Perform underwriting calculations
     calculations = perform_underwriting_calculations(request)
 
-    # Determine risk score based on development margin
-    development_margin = calculations["development_margin"]
-
-    if development_margin < 10:
-        risk_score = "High"
-    elif development_margin < 15:
-        risk_score = "Medium"
-    else:
-        risk_score = "Low"
-
-    # Generate risk flags
-    flags = []
-
-    # Check development margin
-    if development_margin < 10:
-        flags.append(f"Low development margin of {development_margin:.2f}% indicates high risk")
-    elif development_margin < 15:
-        flags.append(f"Moderate development margin of {development_margin:.2f}% indicates medium risk")
-
-    # Check vacancy rate
-    if request.vacancy_rate > 7:
-        flags.append(f"High vacancy rate of {request.vacancy_rate}% increases risk")
-
-    # Check exit cap rate
-    if request.exit_cap_rate > 7:
-        flags.append(f"High exit cap rate of {request.exit_cap_rate}% increases risk")
-
-    # Property type specific risks
-    if request.property_type == "Office":
-        flags.append("Office properties face challenges from remote work trends")
-    elif request.property_type == "Retail":
-        flags.append("Retail properties face increased competition from e-commerce")
-    elif request.property_type == "Industrial":
-        flags.append("Industrial properties may be affected by supply chain disruptions")
-    elif request.property_type == "Multifamily":
-        flags.append("Multifamily properties may face rental market saturation in some areas")
-
-    # Ensure we have at least one flag
-    if not flags:
-        flags.append("General market volatility and economic uncertainty")
-
-    # Limit to 3 flags
-    flags = flags[:3]
+    # Score and flag the deal with the current risk rules
+    values = dict(calculations, property_type=request.property_type)
+    values.update((field, getattr(request, field)) for field in UNDERWRITING_INPUT_FIELDS)
+    risk_score, flags = risk_rules.evaluate_one(values)
 
     # Create and return the response
     return RiskResponse(
@@ -509,109 +995,204 @@ def calculate_risk_score(request: RiskRequest) -> RiskResponse:
         estimated_exit_value=calculations["estimated_exit_value"],
         development_margin=calculations["development_margin"],
         risk_score=risk_score,
-        flags=flags
+        flags=[flag.message for flag in flags],
+        simulation=simulate_development_margin(request, request.simulation) if request.simulation else None
+    )
+
+def build_simulation_arguments(request: UnderwritingRequest, settings: SimulationSettings) -> Dict[str, Any]:
+    """Convert a deal and simulation settings into arguments for run_simulation"""
+    # Without a project cost or exit cap rate every path's margin is nan or inf
+    if request.acquisition_price + request.construction_cost <= 0:
+        raise HTTPException(status_code=422, detail="Simulation requires a positive project cost (acquisition price + construction cost)")
+    if request.exit_cap_rate <= 0:
+        raise HTTPException(status_code=422, detail="Simulation requires a positive exit cap rate")
+
+    correlation = settings.correlation if settings.correlation is not None else DEFAULT_CORRELATION
+    try:
+        correlation_factor(correlation)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return dict(
+        inputs={field: getattr(request, field) for field in UNDERWRITING_INPUT_FIELDS},
+        calculate=underwrite_columns,
+        paths=settings.paths,
+        volatility={
+            "projected_rent_per_sf": settings.rent_volatility,
+            "vacancy_rate": settings.vacancy_volatility,
+            "operating_expenses_per_sf": settings.opex_volatility,
+            "exit_cap_rate": settings.exit_cap_volatility,
+        },
+        correlation=correlation
     )
 
+def simulate_development_margin(request: UnderwritingRequest, settings: SimulationSettings) -> SimulationResult:
+    """Simulate the distribution of a deal's development margin"""
+    summary = run_simulation(seed=settings.seed, **build_simulation_arguments(request, settings))
+    return SimulationResult(paths=settings.paths, seed=settings.seed, **summary)
+
+# Deals are simulated on monte_carlo.py's process pool, stopped with the app
+app.router.on_shutdown.append(shutdown_executor)
+
+async def simulate_deals(request: RiskSimulationBatchRequest) -> RiskSimulationBatchResponse:
+    """Simulate several deals in parallel, one process pool task per deal"""
+    settings = request.simulation
+    arguments = [build_simulation_arguments(deal, settings) for deal in request.deals]
+    # Each deal draws from its own independent stream derived from the shared seed
+    seeds = spawn_seeds(settings.seed, len(request.deals))
+
+    loop = asyncio.get_running_loop()
+    summaries = await asyncio.gather(*(
+        loop.run_in_executor(get_executor(), partial(run_simulation, seed=seed, **deal_arguments))
+        for seed, deal_arguments in zip(seeds, arguments)
+    ))
+
+    return RiskSimulationBatchResponse(results=[
+        SimulationResult(paths=settings.paths, seed=settings.seed, spawn_key=list(seed.spawn_key), **summary)
+        for seed, summary in zip(seeds, summaries)
+    ])
+
 def analyze_lease(request: LeaseAnalysisRequest) -> LeaseAnalysisResponse:
     """Analyze a commercial lease"""
-    # Simple text analysis to extract basic information
-    lease_text = request.lease_text
-    lease_text_lower = lease_text.lower()
-
-    # Extract base rent (look for dollar amounts near "rent" mentions)
-    base_rent = "Not specified"
-    rent_indicators = ["base rent", "monthly rent", "annual rent", "rent shall be"]
-    for indicator in rent_indicators:
-        if indicator in lease_text_lower:
-            # Find the indicator in the text
-            pos = lease_text_lower.find(indicator)
-            # Look for a dollar amount in the next 100 characters
-            snippet = lease_text[pos:pos+100]
-            # Simple regex-like search for dollar amounts
-            dollar_pos = snippet.find("$")
-            if dollar_pos != -1:
-                # Extract the amount (up to 20 chars after $ sign)
-                amount = snippet[dollar_pos:dollar_pos+20]
-                # Truncate at the first non-amount character
-                for i, char in enumerate(amount):
-                    if i > 0 and not (char.isdigit() or char in ",." or char.isspace()):
-                        amount = amount[:i]
-                        break
-                base_rent = amount
-                break
-
-    # Extract lease term (look for years or months near "term" mentions)
-    lease_term = "Not specified"
-    term_indicators = ["lease term", "term of lease", "term shall be"]
-    for indicator in term_indicators:
-        if indicator in lease_text_lower:
-            # Find the indicator in the text
-            pos = lease_text_lower.find(indicator)
-            # Look for year/month mentions in the next 100 characters
-            snippet = lease_text_lower[pos:pos+100]
-            # Check for common term patterns
-            for pattern in ["year", "month", "annual"]:
-                if pattern in snippet:
-                    # Extract a reasonable snippet
-                    start = max(0, snippet.find(pattern) - 10)
-                    end = min(len(snippet), snippet.find(pattern) + 20)
-                    term_snippet = lease_text[pos + start:pos + end]
-                    lease_term = term_snippet.strip()
-                    break
-            if lease_term != "Not specified":
-                break
-
-    # Generate some plausible renewals based on common patterns
-    renewals = []
-    if "renew" in lease_text_lower or "extension" in lease_text_lower:
-        if "option to extend" in lease_text_lower or "option to renew" in lease_text_lower:
-            renewals.append("Tenant has option to renew/extend (details not fully extracted)")
-
-    # Generate some plausible break clauses based on common patterns
-    break_clauses = []
-    if "terminat" in lease_text_lower:
-        break_clauses.append("Lease may contain termination provisions (details not fully extracted)")
-
-    # Generate some plausible red flags based on common issues
-    red_flags = []
-    red_flag_indicators = {
-        "indemnif": "Broad indemnification clause may create excessive liability",
-        "as is": "Property accepted 'as is' which may hide defects",
-        "waive": "Waiver of rights may be problematic",
-        "sole discret": "Landlord has sole discretion on certain matters",
-        "default": "Default provisions may be strict",
-        "assign": "Assignment restrictions may limit flexibility"
-    }
+    return analyze_lease_stream([request.lease_text])
 
-    for indicator, flag in red_flag_indicators.items():
-        if indicator in lease_text_lower:
-            red_flags.append(flag)
+def analyze_lease_stream(pieces: Iterable[str]) -> LeaseAnalysisResponse:
+    """
+    Analyze a commercial lease supplied as consecutive pieces of text
 
-    # Limit to 3 red flags
-    red_flags = red_flags[:3]
+    The pieces (e.g. paragraphs from an uploaded document) are scanned as they
+    arrive, so the full lease text is never held in memory.
+    """
+    return LeaseAnalysisResponse(**analyze_lease_pieces(pieces))
 
-    return LeaseAnalysisResponse(
-        base_rent=base_rent,
-        lease_term=lease_term,
-        renewals=renewals,
-        break_clauses=break_clauses,
-        red_flags=red_flags
-    )
+def analyze_stored_lease(file_path: str) -> Tuple[LeaseAnalysisResponse, int, int]:
+    """
+    Analyze a stored lease document paragraph by paragraph
 
-def create_deal(deal: DealCreate) -> Deal:
-    """Create a new deal"""
-    global deal_counter
+    Returns:
+        Tuple of (analysis, paragraph count, character count)
+    """
+    counts = {"paragraphs": 0, "characters": 0}
+
+    def pieces() -> Iterator[str]:
+        for paragraph in iter_lease_paragraphs(file_path):
+            # Paragraphs are joined with newlines, as in an inline lease text
+            piece = paragraph if counts["paragraphs"] == 0 else "\n" + paragraph
+            counts["paragraphs"] += 1
+            counts["characters"] += len(piece)
+            yield piece
+
+    analysis = analyze_lease_stream(pieces())
+    return analysis, counts["paragraphs"], counts["characters"]
+
+# Batch lease analysis runs on a process pool sized to half the machine's cores; the
+# worker function lives in lease_clauses.py so worker processes don't import the server
+lease_job_manager = create_lease_job_manager(analyze_lease_text)
+app.router.on_shutdown.append(lease_job_manager.shutdown)
+
+def build_lease_batch_job_response(job: LeaseBatchJob) -> LeaseBatchJobResponse:
+    """Build the progress response for a batch lease analysis job"""
+    return LeaseBatchJobResponse(
+        job_id=job.id,
+        status=job.status,
+        total=job.total,
+        completed=job.completed,
+        failed=job.failed,
+        created_at=job.created_at,
+        finished_at=job.finished_at
+    )
 
-    # Generate a unique ID
-    deal_id = str(deal_counter + 1)
-    deal_counter += 1
+async def iter_lease_batch_results(job: LeaseBatchJob) -> AsyncIterator[bytes]:
+    """Stream a batch job's results as NDJSON, one line per document as it completes"""
+    async for result in job.iter_results():
+        yield (json.dumps(result) + "\n").encode()
+
+def build_chat_session_response(session: ChatSession) -> ChatSessionResponse:
+    """Build the response for an AI chat session"""
+    return ChatSessionResponse(
+        session_id=session.id,
+        context=session.context,
+        messages=session.messages,
+        created_at=session.created_at,
+        expires_at=datetime.fromtimestamp(session.expires_at)
+    )
 
-    # Get current timestamp
-    now = datetime.now()
+async def get_chat_session(session_id: str) -> ChatSession:
+    """Get an AI chat session, raising 404 if it is unknown or expired"""
+    # The store may read the session's file, so keep disk I/O off the event loop
+    session = await run_in_threadpool(chat_sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Chat session with ID {session_id} not found")
+    return session
+
+def build_narrative_messages(instructions: str, draft: str) -> Messages:
+    """Build the model prompt for writing up a template draft"""
+    return [
+        {"role": "system", "content": NARRATIVE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"{instructions}\n\n{draft}"}
+    ]
 
-    # Create a new Deal object
-    new_deal = Deal(
-        id=deal_id,
+async def write_narrative(instructions: str, draft: str) -> Generation:
+    """Have the model write up a template draft, keeping the draft if it can't"""
+    return await llm_gateway.generate(build_narrative_messages(instructions, draft), fallback=draft)
+
+async def iter_narrative_sections(instructions: str, sections: Iterator[str]) -> AsyncIterator[str]:
+    """Stream a narrative's sections; with the gateway enabled, the model's write-up streams as its tokens arrive"""
+    if not llm_gateway.enabled:
+        for section in sections:
+            yield section
+        return
+
+    draft = "".join(sections)
+    async with aclosing(llm_gateway.generate_stream(build_narrative_messages(instructions, draft), fallback=draft)) as deltas:
+        async for delta in deltas:
+            yield delta
+
+def get_last_user_message(messages: List[ChatMessage]) -> str:
+    """Get the content of the last user message of a conversation, or "" if there is none"""
+    for message in reversed(messages):
+        if message.role == "user":
+            return message.content
+    return ""
+
+def build_chat_messages(messages: List[Dict[str, str]], context: Dict[str, Any], draft: str) -> Messages:
+    """Build the model prompt for answering a conversation, given the rules-based reply"""
+    system = f"{CHAT_SYSTEM_PROMPT}\n\nDeal context:\n{json.dumps(context, default=str)}\n\nRules-based answer:\n{draft}"
+    return [{"role": "system", "content": system}] + messages[-CHAT_HISTORY_MESSAGES:]
+
+async def write_chat_reply(messages: List[Dict[str, str]], context: Dict[str, Any], draft: str) -> str:
+    """Have the model answer a conversation, keeping the rules-based reply if it can't"""
+    if not llm_gateway.enabled:
+        return draft
+
+    return (await llm_gateway.generate(build_chat_messages(messages, context, draft), fallback=draft)).text
+
+async def iter_chat_reply_sections(messages: List[Dict[str, str]], context: Dict[str, Any], draft: str) -> AsyncIterator[str]:
+    """Stream the reply to a conversation; with the gateway enabled, the model's answer streams as its tokens arrive"""
+    if not llm_gateway.enabled:
+        for section in split_sections(draft):
+            yield section
+        return
+
+    async with aclosing(llm_gateway.generate_stream(build_chat_messages(messages, context, draft), fallback=draft)) as deltas:
+        async for delta in deltas:
+            yield delta
+
+async def add_chat_session_message(session: ChatSession, request: ChatSessionMessageRequest) -> str:
+    """Apply a turn's context changes, reply to its message and record both in the session"""
+    if request.context:
+        session.context = merge_context(session.context, request.context)
+
+    session.add_message("user", request.message)
+    reply = await write_chat_reply(session.messages, session.context, generate_conversational_reply(request.message, session.context))
+    session.add_message("assistant", reply)
+    # Written through to the shared session directory, so the next turn can go to any worker
+    await run_in_threadpool(chat_sessions.save, session)
+    return reply
+
+def build_deal_data(deal: DealCreate, now: datetime) -> Dict[str, Any]:
+    """Build the data of a new deal for the deal store, which assigns the ID"""
+    return dict(
         project_name=deal.project_name,
         location=deal.location,
         property_type=deal.property_type,
@@ -625,90 +1206,235 @@ def create_deal(deal: DealCreate) -> Deal:
         underwriting_result=deal.underwriting_result,
         ai_memo=deal.ai_memo,
         status=deal.status,
+        user_id=deal.user_id,
         created_at=now,
         updated_at=now
     )
 
-    # Save to the in-memory database
-    deals_db[deal_id] = new_deal
+def create_deal(deal: DealCreate) -> Deal:
+    """Create a new deal"""
+    # Save to the deal store, which assigns the ID
+    return deal_repository.add(build_deal_data(deal, datetime.now()))
 
-    return new_deal
+# Validates a whole batch of imported rows in one call
+deal_import_adapter = TypeAdapter(List[DealCreate])
 
-def get_deals(skip: int = 0, limit: int = 100, status: Optional[str] = None) -> List[Deal]:
-    """Get all deals with optional filtering and pagination"""
-    deals = list(deals_db.values())
+# Rejected rows reported back in an import response
+MAX_REPORTED_IMPORT_ERRORS = 100
 
-    # Filter by status if provided
-    if status:
-        deals = [deal for deal in deals if deal.status == status]
+def prepare_import_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Decode values that tabular formats carry as JSON text (e.g. underwriting_result in a CSV export)"""
+    underwriting_result = row.get("underwriting_result")
+    if isinstance(underwriting_result, str):
+        row = dict(row, underwriting_result=json.loads(underwriting_result))
+    return row
 
-    # Apply pagination
-    return deals[skip:skip + limit]
+def import_deals(file: IO[bytes], format: str) -> DealImportResponse:
+    """
+    Import deals from an upload, one batch of rows at a time
 
-def get_deal(deal_id: str) -> Deal:
-    """Get a deal by ID"""
-    if deal_id not in deals_db:
+    Each batch is validated in one pass; valid rows are inserted through the
+    deal store in a single write and invalid rows are reported and skipped.
+    """
+    imported = 0
+    errors: List[DealImportRowError] = []
+    failed = 0
+    row_offset = 0
+
+    def reject(index: int, message: str) -> None:
+        nonlocal failed
+        failed += 1
+        if len(errors) < MAX_REPORTED_IMPORT_ERRORS:
+            errors.append(DealImportRowError(row=row_offset + index + 1, message=message))
+
+    try:
+        for batch in iter_import_batches(file, format):
+            rows = {}
+            for index, row in enumerate(batch):
+                try:
+                    rows[index] = prepare_import_row(row)
+                except json.JSONDecodeError:
+                    reject(index, "underwriting_result: invalid JSON")
+
+            try:
+                deals = deal_import_adapter.validate_python(list(rows.values()))
+            except ValidationError as e:
+                # Errors are located by position in the batch; reject those rows and validate the rest
+                indexes = list(rows)
+                messages: Dict[int, List[str]] = {}
+                for error in e.errors(include_url=False):
+                    position, *field = error["loc"]
+                    messages.setdefault(indexes[position], []).append(f"{'.'.join(map(str, field)) or 'row'}: {error['msg']}")
+                for index, row_messages in messages.items():
+                    reject(index, "; ".join(row_messages))
+                    del rows[index]
+                deals = deal_import_adapter.validate_python(list(rows.values()))
+
+            now = datetime.now()
+            imported += len(deal_repository.add_many([build_deal_data(deal, now) for deal in deals]))
+            row_offset += len(batch)
+    except DealImportFormatError as e:
+        raise HTTPException(status_code=422, detail=f"{e} ({imported} deals imported before the error)")
+
+    return DealImportResponse(format=format, imported=imported, failed=failed, errors=errors)
+
+def iter_deal_pages(
+    status: Optional[str] = None,
+    property_type: Optional[str] = None,
+    location: Optional[str] = None
+) -> Iterator[List[bytes]]:
+    """Iterate over the serialized deals matching the filters, one store page at a time"""
+    after = None
+    while True:
+        page = deal_repository.list_json(
+            limit=EXPORT_BATCH_SIZE,
+            after=after,
+            status=status or None,
+            property_type=property_type or None,
+            location=location or None
+        )
+        if not page:
+            return
+        yield [document for _, document in page]
+        after = page[-1][0]
+
+def get_deals_json(
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[str] = None,
+    property_type: Optional[str] = None,
+    location: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> bytes:
+    """
+    Get a page of deals with optional filtering, ordered by last update
+
+    Returns:
+        The serialized DealList, assembled from each deal's stored JSON document
+    """
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    filters = dict(status=status or None, property_type=property_type or None, location=location or None)
+
+    # Filtering and keyset pagination are pushed down to the indexed deal store
+    page = deal_repository.list_json(skip=skip, limit=limit, after=after, **filters)
+    next_cursor = encode_cursor(page[-1][0]) if page and len(page) == limit else None
+
+    return b"".join((
+        b'{"deals":[',
+        b",".join(document for _, document in page),
+        b'],"total":',
+        to_json(deal_repository.count(**filters)),
+        b',"next_cursor":',
+        to_json(next_cursor),
+        b"}",
+    ))
+
+def get_deal_json(deal_id: str) -> bytes:
+    """Get the stored JSON document of a deal"""
+    document = deal_repository.get_json(deal_id)
+    if document is None:
         raise HTTPException(status_code=404, detail=f"Deal with ID {deal_id} not found")
 
-    return deals_db[deal_id]
+    return document
 
-def update_deal(deal_id: str, deal_update: DealUpdate) -> Deal:
-    """Update a deal"""
-    # Check if the deal exists
-    if deal_id not in deals_db:
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check whether an If-None-Match header matches an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+def get_deal(deal_id: str) -> Deal:
+    """Get a deal by ID"""
+    deal = deal_repository.get(deal_id)
+    if deal is None:
         raise HTTPException(status_code=404, detail=f"Deal with ID {deal_id} not found")
 
-    # Get the existing deal
-    existing_deal = deals_db[deal_id]
-
-    # Create a dictionary from the existing deal
-    existing_deal_dict = {
-        "id": existing_deal.id,
-        "project_name": existing_deal.project_name,
-        "location": existing_deal.location,
-        "property_type": existing_deal.property_type,
-        "acquisition_price": existing_deal.acquisition_price,
-        "construction_cost": existing_deal.construction_cost,
-        "square_footage": existing_deal.square_footage,
-        "projected_rent_per_sf": existing_deal.projected_rent_per_sf,
-        "vacancy_rate": existing_deal.vacancy_rate,
-        "operating_expenses_per_sf": existing_deal.operating_expenses_per_sf,
-        "exit_cap_rate": existing_deal.exit_cap_rate,
-        "underwriting_result": existing_deal.underwriting_result,
-        "ai_memo": existing_deal.ai_memo,
-        "status": existing_deal.status,
-        "created_at": existing_deal.created_at,
-        "updated_at": existing_deal.updated_at
-    }
+    return deal
 
-    # Create a dictionary from the update data, excluding None values
-    update_data = {k: v for k, v in deal_update.model_dump().items() if v is not None}
+def build_deal_patch(deal_id: str, deal_update: DealUpdate, now: datetime) -> DealPatch:
+    """Convert an update into a deal store patch of only the fields it sets"""
+    # The update model has already validated these fields; None values are not changes
+    changes = {
+        field: value
+        for field, value in deal_update.model_dump(exclude_unset=True, exclude={"id", "version"}).items()
+        if value is not None
+    }
+    changes["updated_at"] = now
 
-    # Update the existing deal data
-    existing_deal_dict.update(update_data)
+    return deal_id, changes, deal_update.version
 
-    # Update the updated_at timestamp
-    existing_deal_dict["updated_at"] = datetime.now()
+def apply_deal_patches(patches: List[DealPatch]) -> List[Deal]:
+    """Apply deal store patches atomically, translating store errors into HTTP errors"""
+    try:
+        return deal_repository.patch_many(patches)
+    except DealNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DealVersionConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
-    # Create a new Deal object with the updated data
-    updated_deal = Deal(**existing_deal_dict)
+def update_deal(deal_id: str, deal_update: DealUpdate) -> Deal:
+    """Update a deal"""
+    return apply_deal_patches([build_deal_patch(deal_id, deal_update, datetime.now())])[0]
 
-    # Save to the in-memory database
-    deals_db[deal_id] = updated_deal
+def update_deals(request: DealBulkUpdateRequest) -> DealBulkUpdateResponse:
+    """Update many deals at once; if any update fails, none are applied"""
+    now = datetime.now()
+    patches = [build_deal_patch(update.id, update, now) for update in request.updates]
 
-    return updated_deal
+    return DealBulkUpdateResponse(deals=apply_deal_patches(patches))
 
 def delete_deal(deal_id: str) -> Dict[str, str]:
     """Delete a deal"""
-    # Check if the deal exists
-    if deal_id not in deals_db:
-        raise HTTPException(status_code=404, detail=f"Deal with ID {deal_id} not found")
-
     # Delete the deal
-    del deals_db[deal_id]
+    if not deal_repository.delete(deal_id):
+        raise HTTPException(status_code=404, detail=f"Deal with ID {deal_id} not found")
 
     return {"message": f"Deal with ID {deal_id} deleted"}
 
+def build_portfolio_summary(rollup: Dict[str, float], user_id: Optional[str] = None) -> PortfolioSummaryResponse:
+    """Build a portfolio summary from running sums and counts"""
+    def average(metric: str) -> float:
+        count = rollup[f"{metric}_count"]
+        return rollup[f"{metric}_sum"] / count if count > 0 else 0.0
+
+    return PortfolioSummaryResponse(
+        total_deals=rollup["deal_count"],
+        average_cap_rate=average("cap_rate"),
+        average_development_margin=average("development_margin"),
+        total_gross_exit_value=rollup["exit_value_sum"],
+        average_project_cost=average("project_cost"),
+        user_id=user_id
+    )
+
+def check_portfolio_consistency(repair: bool = False) -> PortfolioConsistencyResponse:
+    """Compare the running portfolio aggregates with a full recompute"""
+    stored = deal_repository.stored_rollups()
+    recomputed = deal_repository.recompute_rollups()
+
+    mismatches = []
+    for key in sorted(set(stored) | set(recomputed)):
+        expected = recomputed.get(key, empty_rollup())
+        actual = stored.get(key, empty_rollup())
+        # Running float sums drift slightly from a fresh sum, so compare with a tolerance
+        if any(not math.isclose(actual[column], expected[column], rel_tol=1e-9, abs_tol=1e-6) for column in expected):
+            dimension, group = key
+            mismatches.append(f"{dimension}={group}" if group else dimension)
+
+    if mismatches and repair:
+        deal_repository.rebuild_rollups()
+
+    return PortfolioConsistencyResponse(
+        consistent=not mismatches,
+        checked_groups=len(set(stored) | set(recomputed)),
+        mismatches=mismatches,
+        repaired=bool(mismatches and repair)
+    )
+
 # ----------------- ROUTES -----------------
 
 @app.post("/api/calculate-roi", response_model=RoiResponse, tags=["Calculations"])
@@ -737,6 +1463,22 @@ async def analyze_text_route(request: TextAnalysisRequest):
     """
     return analyze_text(request)
 
+@app.post("/api/analyze-text/batch", response_model=TextAnalysisBatchResponse, tags=["Analysis"])
+async def analyze_text_batch_route(request: TextAnalysisBatchRequest):
+    """
+    Score many real estate texts in one call
+
+    Each text gets word, positive and negative counts, a sentiment and CRE
+    keyword counts by category; the texts themselves are not echoed back.
+
+    Args:
+        request: The texts to analyze
+
+    Returns:
+        Scores for each text, in request order
+    """
+    return Response(content=await run_in_threadpool(analyze_texts, request), media_type="application/json")
+
 @app.post("/api/generate-memo", response_model=InvestmentMemoResponse, tags=["Generation"])
 async def generate_investment_memo_route(request: InvestmentMemoRequest):
     """
@@ -748,7 +1490,34 @@ async def generate_investment_memo_route(request: InvestmentMemoRequest):
     Returns:
         Investment memo response with generated memo
     """
-    return generate_investment_memo(request)
+    fell_back = False
+
+    async def compute() -> InvestmentMemoResponse:
+        nonlocal fell_back
+        response = generate_investment_memo(request)
+        response.memo, fell_back = await write_narrative(MEMO_INSTRUCTIONS, response.memo)
+        return response
+
+    return await result_cache.get_or_compute_async("generate-memo", request, compute, cacheable=lambda _: not fell_back)
+
+@app.post("/api/generate-memo/stream", tags=["Generation"])
+async def stream_investment_memo_route(request: InvestmentMemoRequest):
+    """
+    Generate an investment memo as Server-Sent Events
+
+    Sends a "result" event with the memo's property fields, a "section" event
+    for each memo section as it is written and a final "done" event.
+
+    Args:
+        request: The investment memo request containing property details
+
+    Returns:
+        text/event-stream of the memo sections
+    """
+    price_per_sf = request.asking_price / request.square_footage
+    result = dict(request.model_dump(), price_per_sf=price_per_sf)
+    sections = iter_narrative_sections(MEMO_INSTRUCTIONS, iter_investment_memo_sections(request, price_per_sf))
+    return event_stream_response(sections, result)
 
 @app.post("/api/underwrite", response_model=UnderwritingResponse, tags=["Underwriting"])
 async def underwrite_property_route(request: UnderwritingRequest):
@@ -761,34 +1530,87 @@ async def underwrite_property_route(request: UnderwritingRequest):
     Returns:
         Underwriting response with calculated values and AI-generated underwriting summary
     """
-    # Perform underwriting calculations
+    fell_back = False
+
+    async def compute() -> UnderwritingResponse:
+        nonlocal fell_back
+        response = underwrite_property(request)
+        response.underwriting_summary, fell_back = await write_narrative(UNDERWRITING_INSTRUCTIONS, response.underwriting_summary)
+        return response
+
+    return await result_cache.get_or_compute_async("underwrite", request, compute, cacheable=lambda _: not fell_back)
+
+@app.post("/api/underwrite/stream", tags=["Underwriting"])
+async def stream_underwriting_route(request: UnderwritingRequest):
+    """
+    Perform property underwriting and stream the underwriting summary as Server-Sent Events
+
+    Sends a "result" event with the calculated values, a "section" event for
+    each summary section as it is written and a final "done" event.
+
+    Args:
+        request: The underwriting request containing property details
+
+    Returns:
+        text/event-stream of the calculated values and summary sections
+    """
     calculations = perform_underwriting_calculations(request)
+    result = dict(request.model_dump(), **calculations)
+    sections = iter_narrative_sections(UNDERWRITING_INSTRUCTIONS, iter_underwriting_summary_sections(request, calculations))
+    return event_stream_response(sections, result)
 
-    # Generate underwriting summary
-    underwriting_summary = generate_underwriting_summary(request, calculations)
+@app.post("/api/underwrite/batch", tags=["Underwriting"])
+async def underwrite_batch_route(request: Request):
+    """
+    Perform underwriting calculations for many properties in one call
 
-    # Create and return the response
-    return UnderwritingResponse(
-        project_name=request.project_name,
-        location=request.location,
-        property_type=request.property_type,
-        acquisition_price=request.acquisition_price,
-        construction_cost=request.construction_cost,
-        square_footage=request.square_footage,
-        projected_rent_per_sf=request.projected_rent_per_sf,
-        vacancy_rate=request.vacancy_rate,
-        operating_expenses_per_sf=request.operating_expenses_per_sf,
-        exit_cap_rate=request.exit_cap_rate,
-        gross_potential_income=calculations["gross_potential_income"],
-        effective_gross_income=calculations["effective_gross_income"],
-        operating_expenses=calculations["operating_expenses"],
-        net_operating_income=calculations["net_operating_income"],
-        project_cost=calculations["project_cost"],
-        estimated_exit_value=calculations["estimated_exit_value"],
-        development_margin=calculations["development_margin"],
-        underwriting_summary=underwriting_summary
+    The body is either a columnar JSON object (see UnderwritingBatchRequest) or,
+    with a Content-Type of application/x-ndjson, one underwriting request per line.
+
+    Args:
+        request: The raw HTTP request carrying the batch
+
+    Returns:
+        NDJSON stream with one line of calculated values per input row
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        columns, project_names = parse_underwriting_batch_ndjson(body)
+    else:
+        try:
+            batch_request = UnderwritingBatchRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors(include_url=False))
+        columns, project_names = parse_underwriting_batch_columns(batch_request)
+
+    calculations = perform_underwriting_calculations_batch(columns)
+
+    return StreamingResponse(
+        iter_underwriting_batch_ndjson(columns, calculations, project_names),
+        media_type="application/x-ndjson"
     )
 
+@app.post("/api/underwrite/sensitivity", response_model=UnderwritingSensitivityResponse, tags=["Underwriting"])
+async def underwrite_sensitivity_route(request: UnderwritingSensitivityRequest):
+    """
+    Compute NOI, exit value and development margin over a sensitivity grid
+
+    Every combination of the requested input ranges is evaluated in one
+    vectorized pass. Results are returned as flat row-major columns; use the
+    base64 encoding for large grids.
+
+    Args:
+        request: The base case and the ranges of the inputs to vary
+
+    Returns:
+        The grid axes and one column of results per output
+    """
+    # Serialized directly: validating a million-cell response model would dominate the request
+    content = await run_in_threadpool(build_underwriting_sensitivity, request)
+    return Response(content=content, media_type="application/json")
+
 @app.post("/api/generate-report", tags=["Reports"])
 async def generate_report_route(request: ReportRequest):
     """
@@ -813,7 +1635,61 @@ async def calculate_risk_score_route(request: RiskRequest):
     Returns:
         Risk response with calculated values and AI-generated risk assessment
     """
-    return calculate_risk_score(request)
+    # Results are cached per rule set version, so edited rules take effect straight away
+    namespace = f"risk-score:{risk_rules.version}"
+
+    if request.simulation:
+        # Simulating a million paths is CPU-bound, so keep it off the event loop
+        return await run_in_threadpool(result_cache.get_or_compute, namespace, request, lambda: calculate_risk_score(request))
+
+    return result_cache.get_or_compute(namespace, request, lambda: calculate_risk_score(request))
+
+@app.post("/api/risk-score/batch", tags=["Risk"])
+async def calculate_risk_score_batch_route(request: RiskScoreBatchRequest):
+    """
+    Score and flag a portfolio of properties in one pass
+
+    Every risk rule is applied to whole columns of the batch at once; see
+    risk_rules.py for the rule table.
+
+    Args:
+        request: The columnar batch of properties
+
+    Returns:
+        NDJSON stream with one line per property: calculated values, risk score and flags
+    """
+    calculations, risk_scores, flags = await run_in_threadpool(score_risk_batch, request)
+
+    return StreamingResponse(
+        iter_risk_batch_ndjson(request, calculations, risk_scores, flags),
+        media_type="application/x-ndjson"
+    )
+
+@app.get("/api/risk-rules", tags=["Risk"])
+async def get_risk_rules_route():
+    """
+    Get the risk rules in force
+
+    Returns:
+        The rule table, its version and where it was loaded from
+    """
+    return risk_rules.status()
+
+@app.post("/api/risk-score/simulate", response_model=RiskSimulationBatchResponse, tags=["Risk"])
+async def simulate_risk_route(request: RiskSimulationBatchRequest):
+    """
+    Simulate the distribution of development margin for several deals
+
+    Rent, vacancy, operating expenses and exit cap rate are drawn from
+    correlated distributions; deals are simulated in parallel across cores.
+
+    Args:
+        request: The deals and the simulation settings
+
+    Returns:
+        Margin percentiles and threshold probabilities for each deal
+    """
+    return await simulate_deals(request)
 
 @app.post("/api/analyze-lease", response_model=LeaseAnalysisResponse, tags=["Lease"])
 async def analyze_lease_route(request: LeaseAnalysisRequest):
@@ -828,84 +1704,163 @@ async def analyze_lease_route(request: LeaseAnalysisRequest):
     """
     return analyze_lease(request)
 
+@app.post("/api/analyze-lease/upload", response_model=LeaseUploadResponse, tags=["Lease"])
+async def analyze_lease_upload_route(file: UploadFile = File(..., description="The lease document (DOCX or plain text)")):
+    """
+    Upload a lease document and analyze it
+
+    The file is streamed to the uploads directory in chunks and hashed on the
+    way, then its paragraphs are fed through lease analysis one at a time.
+
+    Args:
+        file: The uploaded lease document
+
+    Returns:
+        Upload details and the lease analysis
+    """
+    file_id, file_path, sha256, size = await save_upload(file)
+
+    try:
+        analysis, paragraphs, characters = await run_in_threadpool(analyze_stored_lease, file_path)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Could not read lease document: {str(e)}")
+
+    return LeaseUploadResponse(
+        file_id=file_id,
+        filename=file.filename,
+        sha256=sha256,
+        size_bytes=size,
+        paragraphs=paragraphs,
+        characters=characters,
+        analysis=analysis
+    )
+
+@app.post("/api/analyze-lease/batch", response_model=LeaseBatchJobResponse, status_code=202, tags=["Lease"])
+async def analyze_lease_batch_route(request: LeaseBatchRequest):
+    """
+    Submit many leases for analysis as a background job
+
+    Documents are analyzed in parallel on a process pool, so the event loop
+    stays free to serve other routes while the job runs.
+
+    Args:
+        request: The batch request containing the lease documents
+
+    Returns:
+        The job ID and its initial progress
+    """
+    job = lease_job_manager.submit([(document.document_id, document.lease_text) for document in request.documents])
+    return build_lease_batch_job_response(job)
+
+@app.get("/api/analyze-lease/batch/{job_id}", response_model=LeaseBatchJobResponse, tags=["Lease"])
+async def get_lease_batch_job_route(job_id: str):
+    """
+    Get the progress of a batch lease analysis job
+
+    Args:
+        job_id: The ID of the job
+
+    Returns:
+        The job's status and document counts
+    """
+    job = lease_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+
+    return build_lease_batch_job_response(job)
+
+@app.get("/api/analyze-lease/batch/{job_id}/results", tags=["Lease"])
+async def stream_lease_batch_results_route(job_id: str):
+    """
+    Stream the results of a batch lease analysis job as they complete
+
+    Each NDJSON line holds a document's index in the batch, its document_id,
+    and either its analysis or an error. The stream ends when the job does.
+
+    Args:
+        job_id: The ID of the job
+
+    Returns:
+        Streaming NDJSON response with one result per document
+    """
+    job = lease_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job with ID {job_id} not found")
+
+    return StreamingResponse(iter_lease_batch_results(job), media_type="application/x-ndjson")
+
 @app.get("/api/portfolio-summary", response_model=PortfolioSummaryResponse, tags=["Portfolio"])
-async def get_portfolio_summary_route():
+async def get_portfolio_summary_route(user_id: Optional[str] = None):
     """
     Get a summary of portfolio metrics across all deals
 
+    Args:
+        user_id: Only summarize deals owned by this user (optional)
+
     Returns:
         Portfolio summary with aggregate metrics
     """
-    # Get all deals from the in-memory database
-    deals = list(deals_db.values())
-
-    # Check if there are any deals
-    if not deals:
-        return PortfolioSummaryResponse(
-            total_deals=0,
-            average_cap_rate=0.0,
-            average_development_margin=0.0,
-            total_gross_exit_value=0.0,
-            average_project_cost=0.0
-        )
+    # Served from the running aggregates maintained by the deal store
+    if user_id:
+        rollup = await run_in_threadpool(deal_repository.get_rollup, "user_id", user_id)
+    else:
+        rollup = await run_in_threadpool(deal_repository.get_rollup)
 
-    # Calculate aggregate metrics
-    total_deals = len(deals)
-
-    # Initialize variables for calculations
-    sum_cap_rate = 0.0
-    sum_development_margin = 0.0
-    total_exit_value = 0.0
-    sum_project_cost = 0.0
-
-    # Count deals with valid metrics for averaging
-    valid_cap_rate_count = 0
-    valid_margin_count = 0
-    valid_cost_count = 0
-
-    # Process each deal
-    for deal in deals:
-        # Cap rate
-        if hasattr(deal, 'exit_cap_rate') and deal.exit_cap_rate is not None:
-            sum_cap_rate += deal.exit_cap_rate
-            valid_cap_rate_count += 1
-
-        # For the standalone server, we'll calculate these values on the fly
-        # since we don't have underwriting_result stored
-
-        # Calculate project cost
-        project_cost = deal.acquisition_price + deal.construction_cost
-        sum_project_cost += project_cost
-        valid_cost_count += 1
-
-        # Calculate NOI
-        gross_potential_income = deal.square_footage * deal.projected_rent_per_sf
-        effective_gross_income = gross_potential_income * (1 - deal.vacancy_rate / 100)
-        operating_expenses = deal.square_footage * deal.operating_expenses_per_sf
-        net_operating_income = effective_gross_income - operating_expenses
-
-        # Calculate exit value
-        estimated_exit_value = net_operating_income / (deal.exit_cap_rate / 100)
-        total_exit_value += estimated_exit_value
-
-        # Calculate development margin
-        development_margin = (estimated_exit_value - project_cost) / project_cost * 100
-        sum_development_margin += development_margin
-        valid_margin_count += 1
-
-    # Calculate averages (avoid division by zero)
-    average_cap_rate = sum_cap_rate / valid_cap_rate_count if valid_cap_rate_count > 0 else 0.0
-    average_development_margin = sum_development_margin / valid_margin_count if valid_margin_count > 0 else 0.0
-    average_project_cost = sum_project_cost / valid_cost_count if valid_cost_count > 0 else 0.0
+    return build_portfolio_summary(rollup, user_id=user_id or None)
 
-    # Create and return the response
-    return PortfolioSummaryResponse(
-        total_deals=total_deals,
-        average_cap_rate=average_cap_rate,
-        average_development_margin=average_development_margin,
-        total_gross_exit_value=total_exit_value,
-        average_project_cost=average_project_cost
-    )
+@app.get("/api/portfolio-summary/breakdown", response_model=PortfolioBreakdownResponse, tags=["Portfolio"])
+async def get_portfolio_breakdown_route(group_by: Literal["status", "property_type", "location", "user_id"] = "status"):
+    """
+    Get portfolio summaries grouped by a deal attribute
+
+    Args:
+        group_by: The deal attribute to group by (status, property_type, location or user_id)
+
+    Returns:
+        Portfolio summary for each group
+    """
+    rollups = await run_in_threadpool(deal_repository.get_rollups, group_by)
+    groups = {
+        key: build_portfolio_summary(rollup, user_id=key if group_by == "user_id" else None)
+        for key, rollup in sorted(rollups.items())
+    }
+
+    return PortfolioBreakdownResponse(group_by=group_by, groups=groups)
+
+@app.get("/api/portfolio-summary/consistency", response_model=PortfolioConsistencyResponse, tags=["Portfolio"])
+async def check_portfolio_consistency_route(repair: bool = False):
+    """
+    Verify the running portfolio aggregates against a full recompute
+
+    This walks every deal, so it is meant for maintenance rather than dashboards.
+
+    Args:
+        repair: Rebuild the running aggregates from the recompute if they differ
+
+    Returns:
+        Whether the aggregates are consistent and which groups differ
+    """
+    # Reads every deal and may rewrite the aggregates, so keep it off the event loop
+    return await run_in_threadpool(check_portfolio_consistency, repair)
+
+# Topics the conversational chat answers itself, in priority order
+CHAT_TOPIC_ROUTER = IntentRouter([
+    ("irr", ["irr", "return", "yield"]),
+    ("risk", ["risk", "risky", "safe", "concern"]),
+    ("summary", ["summarize", "summary", "overview", "memo"]),
+])
+
+# Metrics a chat question can ask about, in priority order
+CHAT_METRIC_ROUTER = IntentRouter([
+    ("irr", ["irr", "return"]),
+    ("cap_rate", ["cap rate"]),
+    ("noi", ["noi", "net operating income"]),
+    ("margin", ["margin", "profit"]),
+    ("cost", ["cost", "budget"]),
+    ("rent", ["rent", "income"]),
+    ("vacancy", ["vacancy"]),
+    ("exit", ["exit", "sale"]),
+])
 
 @app.post("/api/ai-chat", response_model=AIChatResponse, tags=["AI Chat"], deprecated=True)
 async def ai_chat_route(request: AIChatRequest):
@@ -941,21 +1896,105 @@ async def conversational_ai_chat_route(request: ConversationalAIChatRequest):
     Returns:
         Conversational AI chat response with the AI's reply
     """
-    # Extract the last user message
-    last_user_message = ""
-    for msg in reversed(request.messages):
-        if msg.role == "user":
-            last_user_message = msg.content
-            break
+    last_user_message = get_last_user_message(request.messages)
 
     # If no user message found, provide a generic response
     if not last_user_message:
-        return ConversationalAIChatResponse(
-            reply="I'm here to help with your commercial real estate analysis. What would you like to know about the deal?"
-        )
+        return ConversationalAIChatResponse(reply=CHAT_GREETING)
+
+    reply = generate_conversational_reply(last_user_message, request.context)
+    messages = [message.model_dump() for message in request.messages]
+    return ConversationalAIChatResponse(reply=await write_chat_reply(messages, request.context, reply))
 
+@app.post("/api/ai-chat/v2/stream", tags=["AI Chat"])
+async def stream_conversational_ai_chat_route(request: ConversationalAIChatRequest):
+    """
+    Process a conversational AI chat request and stream the reply as Server-Sent Events
+
+    Sends "section" events with the reply as it is written (paragraphs of the
+    rules-based reply, or the model's text as its tokens arrive) and a final
+    "done" event.
+
+    Args:
+        request: The conversational AI chat request containing the message history and context
+
+    Returns:
+        text/event-stream of the reply
+    """
+    last_user_message = get_last_user_message(request.messages)
+    if not last_user_message:
+        return event_stream_response(split_sections(CHAT_GREETING))
+
+    reply = generate_conversational_reply(last_user_message, request.context)
+    messages = [message.model_dump() for message in request.messages]
+    return event_stream_response(iter_chat_reply_sections(messages, request.context, reply))
+
+@app.post("/api/ai-chat/sessions", response_model=ChatSessionResponse, tags=["AI Chat"])
+async def create_chat_session_route(request: ChatSessionCreateRequest):
+    """
+    Start a server-side AI chat session
+
+    The session keeps the conversation and deal context, so each turn only
+    posts its new message to /api/ai-chat/sessions/{session_id}/messages.
+    Sessions expire after a period without use.
+
+    Args:
+        request: The initial deal context and optional earlier history
+
+    Returns:
+        The new session
+    """
+    session = await run_in_threadpool(chat_sessions.create, request.context, [message.model_dump() for message in request.messages])
+    return build_chat_session_response(session)
+
+@app.get("/api/ai-chat/sessions/{session_id}", response_model=ChatSessionResponse, tags=["AI Chat"])
+async def get_chat_session_route(session_id: str):
+    """
+    Get an AI chat session
+
+    Args:
+        session_id: The ID of the session
+
+    Returns:
+        The session's deal context and conversation history
+    """
+    return build_chat_session_response(await get_chat_session(session_id))
+
+@app.post("/api/ai-chat/sessions/{session_id}/messages", response_model=ConversationalAIChatResponse, tags=["AI Chat"])
+async def add_chat_session_message_route(session_id: str, request: ChatSessionMessageRequest):
+    """
+    Send a message to an AI chat session
+
+    Args:
+        session_id: The ID of the session
+        request: The new message and any changes to the deal context
+
+    Returns:
+        The AI's reply, which is also added to the session history
+    """
+    # Read the session inside the lock, so a queued turn sees the reply of the one before it
+    async with chat_sessions.turn_lock(session_id):
+        session = await get_chat_session(session_id)
+        return ConversationalAIChatResponse(reply=await add_chat_session_message(session, request))
+
+@app.delete("/api/ai-chat/sessions/{session_id}", tags=["AI Chat"])
+async def delete_chat_session_route(session_id: str):
+    """
+    End an AI chat session
+
+    Args:
+        session_id: The ID of the session
+
+    Returns:
+        A message indicating the session was deleted
+    """
+    if not await run_in_threadpool(chat_sessions.delete, session_id):
+        raise HTTPException(status_code=404, detail=f"Chat session with ID {session_id} not found")
+    return {"message": f"Chat session with ID {session_id} deleted"}
+
+def generate_conversational_reply(message: str, context: Dict[str, Any]) -> str:
+    """Generate the reply to the latest user message of a conversation about a deal"""
     # Check if context is empty or completely missing
-    context = request.context
     context_empty = not context or len(context) == 0
 
     # Define critical fields for different types of analysis
@@ -969,47 +2008,32 @@ async def conversational_ai_chat_route(request: ConversationalAIChatRequest):
 
     # Determine the context completeness level
     if context_empty:
-        return ConversationalAIChatResponse(
-            reply="I'd be happy to help analyze a commercial real estate deal for you. To get started, could you please provide some basic information about the property? I'll need details like the project name, location, property type, acquisition price, construction cost, square footage, projected rent per square foot, vacancy rate, operating expenses, and exit cap rate."
-        )
+        return "I'd be happy to help analyze a commercial real estate deal for you. To get started, could you please provide some basic information about the property? I'll need details like the project name, location, property type, acquisition price, construction cost, square footage, projected rent per square foot, vacancy rate, operating expenses, and exit cap rate."
 
     elif len(missing_fields) > len(all_critical_fields) / 2:
         available_fields = [f for f in all_critical_fields if f not in missing_fields]
-        return ConversationalAIChatResponse(
-            reply=f"Thanks for providing some initial details about the deal. I see you've included information about {', '.join(available_fields)}. To complete my analysis, I'll also need {', '.join(missing_fields[:5])}{'...' if len(missing_fields) > 5 else ''}. This will help me give you a comprehensive assessment of the investment opportunity."
-        )
+        return f"Thanks for providing some initial details about the deal. I see you've included information about {', '.join(available_fields)}. To complete my analysis, I'll also need {', '.join(missing_fields[:5])}{'...' if len(missing_fields) > 5 else ''}. This will help me give you a comprehensive assessment of the investment opportunity."
 
     elif missing_fields:
-        return ConversationalAIChatResponse(
-            reply=f"I can work with the information you've provided so far, but to give you a more accurate analysis, it would be helpful to know the {', '.join(missing_fields)} as well. Would you like me to proceed with what we have, or would you prefer to provide the additional details?"
-        )
+        return f"I can work with the information you've provided so far, but to give you a more accurate analysis, it would be helpful to know the {', '.join(missing_fields)} as well. Would you like me to proceed with what we have, or would you prefer to provide the additional details?"
 
     # If we have complete context, try to answer based on the question
-    lower_message = last_user_message.lower()
+    intent = CHAT_TOPIC_ROUTER.classify(message)
+    metrics = _get_chat_metrics(context)
+    development_margin = metrics.development_margin
 
     # Check for common question types and provide appropriate responses
-    if any(term in lower_message for term in ["irr", "return", "yield"]):
+    if intent == "irr":
         # Calculate a simple IRR estimate based on development margin
-        project_cost = context.get("acquisition_price", 0) + context.get("construction_cost", 0)
-        noi = _calculate_noi(context)
-        exit_value = noi / (context.get("exit_cap_rate", 7) / 100)
-        development_margin = ((exit_value - project_cost) / project_cost) * 100 if project_cost > 0 else 0
         estimated_irr = development_margin / 5  # Simple approximation
 
-        return ConversationalAIChatResponse(
-            reply=f"Based on the information provided for {context.get('project_name', 'the project')}, I estimate the IRR to be approximately {estimated_irr:.1f}%. This is calculated using a development margin of {development_margin:.1f}% and an exit cap rate of {context.get('exit_cap_rate', 7)}%. Would you like me to break down the calculation in more detail?"
-        )
+        return f"Based on the information provided for {context.get('project_name', 'the project')}, I estimate the IRR to be approximately {estimated_irr:.1f}%. This is calculated using a development margin of {development_margin:.1f}% and an exit cap rate of {context.get('exit_cap_rate', 7)}%. Would you like me to break down the calculation in more detail?"
 
-    elif any(term in lower_message for term in ["risk", "risky", "safe", "concern"]):
+    elif intent == "risk":
         # Assess risk based on various factors
         risk_factors = []
 
         # Check development margin
-        project_cost = context.get("acquisition_price", 0) + context.get("construction_cost", 0)
-        noi = _calculate_noi(context)
-        exit_value = noi / (context.get("exit_cap_rate", 7) / 100)
-        development_margin = ((exit_value - project_cost) / project_cost) * 100 if project_cost > 0 else 0
-
         if development_margin < 10:
             risk_factors.append(f"The development margin of {development_margin:.1f}% is below the typical threshold of 15% for this type of investment")
 
@@ -1036,19 +2060,10 @@ async def conversational_ai_chat_route(request: ConversationalAIChatRequest):
             risk_factors.append("Based on the provided metrics, this appears to be a relatively balanced investment with no major red flags")
 
         risk_assessment = "\n".join([f"- {factor}" for factor in risk_factors])
-        return ConversationalAIChatResponse(
-            reply=f"Here's my risk assessment for {context.get('project_name', 'the project')}:\n\n{risk_assessment}\n\nWould you like me to suggest any risk mitigation strategies?"
-        )
+        return f"Here's my risk assessment for {context.get('project_name', 'the project')}:\n\n{risk_assessment}\n\nWould you like me to suggest any risk mitigation strategies?"
 
-    elif any(term in lower_message for term in ["summarize", "summary", "overview", "memo"]):
+    elif intent == "summary":
         # Generate a deal summary
-        project_cost = context.get("acquisition_price", 0) + context.get("construction_cost", 0)
-        price_per_sf = project_cost / context.get("square_footage", 1) if context.get("square_footage", 0) > 0 else 0
-        noi = _calculate_noi(context)
-        cap_rate = (noi / project_cost) * 100 if project_cost > 0 else 0
-        exit_value = noi / (context.get("exit_cap_rate", 7) / 100)
-        development_margin = ((exit_value - project_cost) / project_cost) * 100 if project_cost > 0 else 0
-
         summary = f"""## {context.get('project_name', 'Investment')} Summary
 
 **Property Overview:**
@@ -1057,28 +2072,26 @@ async def conversational_ai_chat_route(request: ConversationalAIChatRequest):
 - Size: {context.get('square_footage', 0):,.0f} SF
 
 **Financial Metrics:**
-- Total Project Cost: ${project_cost:,.2f} (${price_per_sf:.2f}/SF)
-- Projected NOI: ${noi:,.2f}
-- Going-in Cap Rate: {cap_rate:.2f}%
+- Total Project Cost: ${metrics.project_cost:,.2f} (${metrics.price_per_sf:.2f}/SF)
+- Projected NOI: ${metrics.net_operating_income:,.2f}
+- Going-in Cap Rate: {metrics.cap_rate:.2f}%
 - Exit Cap Rate: {context.get('exit_cap_rate', 0)}%
 - Development Margin: {development_margin:.2f}%
 
 **Investment Thesis:**
 This {context.get('property_type', '')} investment in {context.get('location', '')} presents a {_assess_margin(development_margin)} opportunity with a projected development margin of {development_margin:.2f}%."""
 
-        return ConversationalAIChatResponse(
-            reply=f"{summary}\n\nWould you like me to generate a more detailed report or focus on any specific aspect of this investment?"
-        )
+        return f"{summary}\n\nWould you like me to generate a more detailed report or focus on any specific aspect of this investment?"
 
     else:
         # For other types of questions, use the existing handler with conversational enhancements
-        reply = _generate_ai_chat_response(last_user_message, context)
+        reply = _generate_ai_chat_response(message, context)
 
         # Make the response more conversational
-        if "?" not in last_user_message and len(last_user_message.split()) < 5:
+        if "?" not in message and len(message.split()) < 5:
             reply = f"Based on your input about {context.get('project_name', 'the project')}, {reply.lower()}"
 
-        return ConversationalAIChatResponse(reply=reply)
+        return reply
 
 def _assess_cap_rate(cap_rate: float) -> str:
     """Assess whether a cap rate is favorable"""
@@ -1106,26 +2119,80 @@ def _assess_margin(margin: float) -> str:
         return "highly favorable"
 
 
-def _calculate_noi(context: Dict[str, Any]) -> float:
-    """Calculate Net Operating Income based on context"""
-    square_footage = context.get("square_footage", 0)
-    rent_per_sf = context.get("projected_rent_per_sf", 0)
-    vacancy_rate = context.get("vacancy_rate", 5)
-    op_ex_per_sf = context.get("operating_expenses_per_sf", 0)
+class ChatMetrics(NamedTuple):
+    """Deal metrics quoted in AI chat replies"""
+    gross_potential_income: float
+    effective_gross_income: float
+    operating_expenses: float
+    net_operating_income: float
+    project_cost: float
+    estimated_exit_value: float
+    development_margin: float
+    price_per_sf: float
+    cap_rate: float
+
+
+# Context fields the chat metrics are derived from, with the value used when one is missing
+CHAT_METRIC_INPUTS = (
+    ("acquisition_price", 0),
+    ("construction_cost", 0),
+    ("square_footage", 1),  # Avoid division by zero
+    ("projected_rent_per_sf", 0),
+    ("vacancy_rate", 0),
+    ("operating_expenses_per_sf", 0),
+    ("exit_cap_rate", 0),
+)
+CHAT_METRIC_FIELDS, CHAT_METRIC_DEFAULTS = zip(*CHAT_METRIC_INPUTS)
 
-    # Calculate Gross Potential Income (GPI)
-    gpi = square_footage * rent_per_sf
+# Distinct deal contexts whose chat metrics are kept
+CHAT_METRICS_CACHE_SIZE = 4096
 
-    # Calculate Effective Gross Income (EGI)
-    egi = gpi * (1 - vacancy_rate / 100)
 
-    # Calculate Operating Expenses
-    op_ex = square_footage * op_ex_per_sf
+@lru_cache(maxsize=CHAT_METRICS_CACHE_SIZE, typed=True)
+def _calculate_chat_metrics(
+    acquisition_price: float,
+    construction_cost: float,
+    square_footage: float,
+    projected_rent_per_sf: float,
+    vacancy_rate: float,
+    operating_expenses_per_sf: float,
+    exit_cap_rate: float
+) -> ChatMetrics:
+    """Calculate the chat metrics of a deal; metrics that can't be computed are quoted as 0"""
+    result = underwrite_guarded(
+        acquisition_price,
+        construction_cost,
+        square_footage,
+        projected_rent_per_sf,
+        vacancy_rate,
+        operating_expenses_per_sf,
+        exit_cap_rate
+    )
+    project_cost = result.project_cost
+
+    return ChatMetrics(
+        result.gross_potential_income,
+        result.effective_gross_income,
+        result.operating_expenses,
+        result.net_operating_income,
+        project_cost,
+        result.estimated_exit_value or 0,
+        result.development_margin or 0,
+        price_per_sf=project_cost / square_footage if square_footage > 0 else 0,
+        # Going-in cap rate: year-one NOI over the total project cost
+        cap_rate=result.net_operating_income / project_cost * 100 if project_cost > 0 else 0
+    )
 
-    # Calculate Net Operating Income (NOI)
-    noi = egi - op_ex
 
-    return noi
+def _get_chat_metrics(context: Dict[str, Any]) -> ChatMetrics:
+    """Get the chat metrics of a deal context, memoized on the values they depend on"""
+    # Every turn of a conversation carries the same context, so this fingerprint repeats
+    fingerprint = tuple(map(context.get, CHAT_METRIC_FIELDS, CHAT_METRIC_DEFAULTS))
+    try:
+        return _calculate_chat_metrics(*fingerprint)
+    except TypeError:
+        # Unhashable values (e.g. a list) can't be cached; anything else that fails raises again here
+        return _calculate_chat_metrics.__wrapped__(*fingerprint)
 
 
 def _assess_vacancy(vacancy_rate: float, property_type: str) -> str:
@@ -1152,67 +2219,42 @@ def _assess_vacancy(vacancy_rate: float, property_type: str) -> str:
 
 def _generate_ai_chat_response(message: str, context: Dict[str, Any]) -> str:
     """Generate an AI response to a question about a deal"""
-    # Extract key metrics from the context
-    message_lower = message.lower()
-
-    # Calculate some basic metrics
-    acquisition_price = context.get("acquisition_price", 0)
-    construction_cost = context.get("construction_cost", 0)
-    square_footage = context.get("square_footage", 1)  # Avoid division by zero
-    projected_rent_per_sf = context.get("projected_rent_per_sf", 0)
-    vacancy_rate = context.get("vacancy_rate", 0)
-    operating_expenses_per_sf = context.get("operating_expenses_per_sf", 0)
-    exit_cap_rate = context.get("exit_cap_rate", 0)
-
-    # Calculate NOI
-    gross_potential_income = square_footage * projected_rent_per_sf
-    effective_gross_income = gross_potential_income * (1 - vacancy_rate / 100)
-    operating_expenses = square_footage * operating_expenses_per_sf
-    net_operating_income = effective_gross_income - operating_expenses
-
-    # Calculate total project cost
-    project_cost = acquisition_price + construction_cost
-
-    # Calculate estimated exit value
-    estimated_exit_value = 0
-    if exit_cap_rate > 0:
-        estimated_exit_value = net_operating_income / (exit_cap_rate / 100)
+    metrics = _get_chat_metrics(context)
+    net_operating_income = metrics.net_operating_income
+    development_margin = metrics.development_margin
+    estimated_exit_value = metrics.estimated_exit_value
+    project_cost = metrics.project_cost
+    price_per_sf = metrics.price_per_sf
 
-    # Calculate development margin
-    development_margin = 0
-    if project_cost > 0:
-        development_margin = (estimated_exit_value - project_cost) / project_cost * 100
-
-    # Calculate price per square foot
-    price_per_sf = 0
-    if square_footage > 0:
-        price_per_sf = project_cost / square_footage
+    exit_cap_rate = context.get("exit_cap_rate", 0)
 
     # Generate a response based on the question
-    if "irr" in message_lower or "return" in message_lower:
+    intent = CHAT_METRIC_ROUTER.classify(message)
+    if intent == "irr":
         # Estimate a plausible IRR based on the development margin
         estimated_irr = development_margin / 5  # Simple approximation
         return f"Based on the provided metrics, the projected IRR for the {context.get('project_name', 'project')} is estimated at approximately {estimated_irr:.1f}%, assuming a {exit_cap_rate}% exit cap rate and standard market conditions."
 
-    elif "cap rate" in message_lower:
+    elif intent == "cap_rate":
         return f"The exit cap rate for the {context.get('project_name', 'project')} is {exit_cap_rate}%, which is {_assess_cap_rate(exit_cap_rate)} for a {context.get('property_type', 'commercial')} property in {context.get('location', 'this market')}."
 
-    elif "noi" in message_lower or "net operating income" in message_lower:
+    elif intent == "noi":
         return f"The projected Net Operating Income (NOI) for the {context.get('project_name', 'project')} is ${net_operating_income:,.2f}, based on the provided rent and expense assumptions."
 
-    elif "margin" in message_lower or "profit" in message_lower:
+    elif intent == "margin":
         return f"The development margin for the {context.get('project_name', 'project')} is projected at {development_margin:.1f}%, which is {_assess_margin(development_margin)} for a {context.get('property_type', 'commercial')} development."
 
-    elif "cost" in message_lower or "budget" in message_lower:
-        return f"The total project cost for the {context.get('project_name', 'project')} is ${project_cost:,.2f} (${price_per_sf:.2f}/SF), including acquisition (${acquisition_price:,.2f}) and construction (${construction_cost:,.2f})."
+    elif intent == "cost":
+        return f"The total project cost for the {context.get('project_name', 'project')} is ${project_cost:,.2f} (${price_per_sf:.2f}/SF), including acquisition (${context.get('acquisition_price', 0):,.2f}) and construction (${context.get('construction_cost', 0):,.2f})."
 
-    elif "rent" in message_lower or "income" in message_lower:
-        return f"The projected rent for the {context.get('project_name', 'project')} is ${projected_rent_per_sf:.2f}/SF, resulting in a gross potential income of ${gross_potential_income:,.2f} annually."
+    elif intent == "rent":
+        return f"The projected rent for the {context.get('project_name', 'project')} is ${context.get('projected_rent_per_sf', 0):.2f}/SF, resulting in a gross potential income of ${metrics.gross_potential_income:,.2f} annually."
 
-    elif "vacancy" in message_lower:
+    elif intent == "vacancy":
+        vacancy_rate = context.get("vacancy_rate", 0)
         return f"The projected vacancy rate for the {context.get('project_name', 'project')} is {vacancy_rate}%, which is {_assess_vacancy(vacancy_rate, context.get('property_type', 'commercial'))} for a {context.get('property_type', 'commercial')} property in {context.get('location', 'this market')}."
 
-    elif "exit" in message_lower or "sale" in message_lower:
+    elif intent == "exit":
         return f"The estimated exit value for the {context.get('project_name', 'project')} is ${estimated_exit_value:,.2f}, based on a {exit_cap_rate}% cap rate applied to the projected NOI of ${net_operating_income:,.2f}."
 
     else:
@@ -1229,27 +2271,108 @@ async def create_deal_route(deal: DealCreate):
     Returns:
         The created deal with ID and timestamps
     """
-    return create_deal(deal)
+    # The store blocks on SQLite (and on other writers' locks), so keep it off the event loop
+    return await run_in_threadpool(create_deal, deal)
 
 @app.get("/api/deals", response_model=DealList, tags=["Deals"])
 async def get_deals_route(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    property_type: Optional[str] = None,
+    location: Optional[str] = None,
+    cursor: Optional[str] = None
 ):
     """
     Get all commercial real estate deals
 
+    Deals are ordered by last update. Pass the returned next_cursor to get the
+    following page; the response ETag changes whenever any deal changes, so
+    clients revalidating with If-None-Match get 304 Not Modified until then.
+
     Args:
-        skip: Number of deals to skip (for pagination)
+        skip: Number of deals to skip after the cursor (for pagination)
         limit: Maximum number of deals to return (for pagination)
         status: Filter deals by status (optional)
+        property_type: Filter deals by property type (optional)
+        location: Filter deals by location (optional)
+        cursor: Cursor returned with the previous page (optional)
+
+    Returns:
+        List of deals with the total matching the filters and the next page cursor
+    """
+    # Read the version before the deals so a concurrent write can only make the ETag stale, never the body
+    etag = f'"{await run_in_threadpool(deal_repository.version)}"'
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    # Deals are sent as stored rather than re-serialized through the response model
+    return Response(
+        content=await run_in_threadpool(get_deals_json, skip, limit, status, property_type, location, cursor),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
+@app.post("/api/deals/import", response_model=DealImportResponse, tags=["Deals"])
+async def import_deals_route(
+    file: UploadFile = File(..., description="CSV, NDJSON, XLSX or Parquet file with one deal per row"),
+    format: Optional[Literal["csv", "ndjson", "xlsx", "parquet"]] = None
+):
+    """
+    Import deals in bulk from an uploaded file
+
+    The file is parsed, validated and inserted in batches of rows. Invalid
+    rows are skipped and reported; columns that are not deal fields (such as
+    id in an export) are ignored.
+
+    Args:
+        file: The uploaded file
+        format: The file format (optional; detected from the file extension)
+
+    Returns:
+        Counts of imported and rejected rows with the first errors
+    """
+    try:
+        import_format = detect_format(file.filename, format)
+    except DealImportFormatError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return await run_in_threadpool(import_deals, file.file, import_format)
+
+@app.get("/api/deals/export", tags=["Deals"])
+async def export_deals_route(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[str] = None,
+    property_type: Optional[str] = None,
+    location: Optional[str] = None
+):
+    """
+    Export deals as a streamed NDJSON or CSV file
+
+    Deals are read from the store a page at a time while the response is
+    streamed, so memory use does not grow with the number of deals.
+
+    Args:
+        format: The file format (ndjson or csv)
+        status: Filter deals by status (optional)
+        property_type: Filter deals by property type (optional)
+        location: Filter deals by location (optional)
 
     Returns:
-        List of deals
+        Streaming file response
     """
-    deals = get_deals(skip, limit, status)
-    return DealList(deals=deals, total=len(deals))
+    pages = iter_deal_pages(status, property_type, location)
+    if format == "csv":
+        content, media_type = iter_csv_export(pages, list(Deal.model_fields)), "text/csv"
+    else:
+        content, media_type = iter_ndjson_export(pages), "application/x-ndjson"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="deals.{format}"'}
+    )
 
 @app.get("/api/deals/{deal_id}", response_model=Deal, tags=["Deals"])
 async def get_deal_route(deal_id: str):
@@ -1262,13 +2385,16 @@ async def get_deal_route(deal_id: str):
     Returns:
         The deal with the specified ID
     """
-    return get_deal(deal_id)
+    return Response(content=await run_in_threadpool(get_deal_json, deal_id), media_type="application/json")
 
 @app.put("/api/deals/{deal_id}", response_model=Deal, tags=["Deals"])
 async def update_deal_route(deal_id: str, deal_update: DealUpdate):
     """
     Update a commercial real estate deal
 
+    Only the fields set in the update are changed. Include the deal's version
+    to have the update rejected with 409 if someone else changed it first.
+
     Args:
         deal_id: The ID of the deal to update
         deal_update: The deal data to update
@@ -1276,7 +2402,23 @@ async def update_deal_route(deal_id: str, deal_update: DealUpdate):
     Returns:
         The updated deal
     """
-    return update_deal(deal_id, deal_update)
+    return await run_in_threadpool(update_deal, deal_id, deal_update)
+
+@app.patch("/api/deals", response_model=DealBulkUpdateResponse, tags=["Deals"])
+async def update_deals_route(request: DealBulkUpdateRequest):
+    """
+    Update many commercial real estate deals atomically
+
+    Each update only changes the fields it sets. If any deal does not exist
+    or is not at its expected version, no update is applied.
+
+    Args:
+        request: The updates to apply
+
+    Returns:
+        The updated deals
+    """
+    return await run_in_threadpool(update_deals, request)
 
 @app.delete("/api/deals/{deal_id}", tags=["Deals"])
 async def delete_deal_route(deal_id: str):
@@ -1289,7 +2431,17 @@ async def delete_deal_route(deal_id: str):
     Returns:
         A message indicating the deal was deleted
     """
-    return delete_deal(deal_id)
+    return await run_in_threadpool(delete_deal, deal_id)
+
+@app.get("/api/cache/stats", response_model=CacheStatsResponse, tags=["Cache"])
+async def get_cache_stats_route():
+    """
+    Get hit, miss and eviction counters for the result cache
+
+    Returns:
+        Result cache statistics and limits
+    """
+    return CacheStatsResponse(**result_cache.stats())
 
 @app.get("/", tags=["Root"])
 async def root():
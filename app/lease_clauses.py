@@ -0,0 +1,272 @@
+"""
+Single-pass keyword extraction for lease analysis
+
+Lease analysis looks for dozens of indicator phrases (rent, term, renewal,
+termination and red-flag keywords). Rather than lowercasing the whole lease
+and running one substring scan per phrase, ClauseExtractor compiles every
+phrase into one regular expression and records the character offsets of
+every occurrence in a single pass.
+
+The text is lowercased one fixed-size window at a time (matching lowercased
+text is several times faster in `re` than IGNORECASE), so no full lowercase
+copy of a large lease is ever held in memory.
+
+analyze_lease_pieces() is the lease analysis built on them. It only depends
+on this module and returns plain JSON data, so it is also the function batch
+jobs run in pool worker processes without importing the API server.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List
+
+# Characters of text lowercased and scanned at a time
+DEFAULT_WINDOW_SIZE = 64 * 1024
+
+
+class ClauseExtractor:
+    """Find every occurrence of a set of case-insensitive keywords in one pass"""
+
+    def __init__(self, keywords: Iterable[str], window_size: int = DEFAULT_WINDOW_SIZE):
+        # Longest first so the alternation prefers "option to renew" over "option"
+        self.keywords = sorted({keyword.lower() for keyword in keywords}, key=len, reverse=True)
+        self.window_size = window_size
+
+        # Windows overlap by this much so matches across a boundary are not lost
+        self._overlap = max(len(keyword) for keyword in self.keywords) - 1
+
+        # The lookahead makes the scan zero-width, so overlapping occurrences are
+        # all reported (e.g. "as is" inside "has isolated", like the substring test)
+        alternation = "|".join(re.escape(keyword) for keyword in self.keywords)
+        self._pattern = re.compile(f"(?=({alternation}))")
+
+        # Only one alternative can match at a given position, so shorter keywords
+        # that are prefixes of the matched one are credited explicitly
+        self._implied = {
+            keyword: [other for other in self.keywords if other != keyword and keyword.startswith(other)]
+            for keyword in self.keywords
+        }
+
+    def find_all(self, text: str) -> Dict[str, List[int]]:
+        """
+        Find every keyword occurrence in the text
+
+        Args:
+            text: The text to scan (matched case-insensitively)
+
+        Returns:
+            Start offsets of each keyword that occurs, in ascending order
+        """
+        scanner = ClauseScanner(self)
+        scanner.feed(text)
+        return scanner.close()
+
+
+class ClauseScanner:
+    """
+    Incremental keyword scanner fed text piece by piece
+
+    Pieces (e.g. paragraphs of an uploaded lease) are treated as one
+    continuous text, so offsets are global and matches spanning two pieces
+    are found. Only a tail shorter than the longest keyword is kept between
+    feeds, so memory does not grow with the size of the document.
+
+    For each snippet keyword, the text following its first occurrence is
+    captured as well, which lease analysis needs to read rent and term values.
+    """
+
+    def __init__(self, extractor: ClauseExtractor, snippet_keywords: Iterable[str] = (), snippet_length: int = 100):
+        self.extractor = extractor
+        self.hits: Dict[str, List[int]] = {}
+        self.snippets: Dict[str, str] = {}
+        self.length = 0
+
+        self._snippet_keywords = {keyword.lower() for keyword in snippet_keywords}
+        self._snippet_length = snippet_length
+        # Keywords whose snippet is still shorter than snippet_length
+        self._open_snippets: List[str] = []
+
+        # Unscanned tail carried over to the next feed, and its global offset
+        self._pending = ""
+        self._pending_offset = 0
+
+    def feed(self, text: str) -> None:
+        """Scan the next piece of text"""
+        self.length += len(text)
+
+        # Snippets opened by earlier pieces continue into this one
+        for keyword in list(self._open_snippets):
+            snippet = self.snippets[keyword] + text[:self._snippet_length - len(self.snippets[keyword])]
+            self.snippets[keyword] = snippet
+            if len(snippet) >= self._snippet_length:
+                self._open_snippets.remove(keyword)
+
+        self._scan(self._pending + text, final=False)
+
+    def close(self) -> Dict[str, List[int]]:
+        """Scan whatever text is left and return every keyword occurrence"""
+        self._scan(self._pending, final=True)
+        self._pending = ""
+        self._open_snippets = []
+        return self.hits
+
+    def _scan(self, buffer: str, final: bool) -> None:
+        extractor = self.extractor
+        offset = self._pending_offset
+        # Matches must start before the limit to be complete; later ones are rescanned next time
+        limit = len(buffer) if final else max(len(buffer) - extractor._overlap, 0)
+
+        for base in range(0, limit, extractor.window_size):
+            window_end = min(base + extractor.window_size, limit)
+            window = buffer[base:window_end + extractor._overlap].lower()
+
+            for match in extractor._pattern.finditer(window):
+                start = base + match.start()
+                if start >= window_end:
+                    break
+
+                keyword = match.group(1)
+                self._record(keyword, buffer, start, offset)
+                for implied in extractor._implied[keyword]:
+                    self._record(implied, buffer, start, offset)
+
+        self._pending = buffer[limit:]
+        self._pending_offset = offset + limit
+
+    def _record(self, keyword: str, buffer: str, start: int, offset: int) -> None:
+        positions = self.hits.setdefault(keyword, [])
+        if not positions and keyword in self._snippet_keywords:
+            # The buffer holds all text received so far from this point on
+            snippet = buffer[start:start + self._snippet_length]
+            self.snippets[keyword] = snippet
+            if len(snippet) < self._snippet_length:
+                self._open_snippets.append(keyword)
+        positions.append(offset + start)
+
+
+# Indicators searched for by lease analysis, in order of preference
+LEASE_RENT_INDICATORS = ["base rent", "monthly rent", "annual rent", "rent shall be"]
+LEASE_TERM_INDICATORS = ["lease term", "term of lease", "term shall be"]
+LEASE_RENEWAL_KEYWORDS = ["renew", "extension"]
+LEASE_RENEWAL_OPTION_KEYWORDS = ["option to extend", "option to renew"]
+LEASE_BREAK_KEYWORDS = ["terminat"]
+LEASE_RED_FLAG_INDICATORS = {
+    "indemnif": "Broad indemnification clause may create excessive liability",
+    "as is": "Property accepted 'as is' which may hide defects",
+    "waive": "Waiver of rights may be problematic",
+    "sole discret": "Landlord has sole discretion on certain matters",
+    "default": "Default provisions may be strict",
+    "assign": "Assignment restrictions may limit flexibility"
+}
+
+# All lease indicators compiled into one single-pass matcher
+LEASE_CLAUSE_EXTRACTOR = ClauseExtractor(
+    LEASE_RENT_INDICATORS
+    + LEASE_TERM_INDICATORS
+    + LEASE_RENEWAL_KEYWORDS
+    + LEASE_RENEWAL_OPTION_KEYWORDS
+    + LEASE_BREAK_KEYWORDS
+    + list(LEASE_RED_FLAG_INDICATORS)
+)
+
+
+def analyze_lease_pieces(pieces: Iterable[str]) -> Dict[str, Any]:
+    """
+    Analyze a commercial lease supplied as consecutive pieces of text
+
+    The pieces (e.g. paragraphs from an uploaded document) are scanned as they
+    arrive, so the full lease text is never held in memory.
+
+    Returns:
+        The fields of a lease analysis response, as plain JSON data
+    """
+    # Find every indicator with its offsets in one pass over the text, keeping
+    # the 100 characters after the first rent and term indicators
+    scanner = ClauseScanner(
+        LEASE_CLAUSE_EXTRACTOR,
+        snippet_keywords=LEASE_RENT_INDICATORS + LEASE_TERM_INDICATORS,
+        snippet_length=100
+    )
+    for piece in pieces:
+        scanner.feed(piece)
+    scanner.close()
+
+    return build_lease_analysis(scanner.hits, scanner.snippets)
+
+
+def analyze_lease_text(lease_text: str) -> Dict[str, Any]:
+    """Analyze one lease of a batch job; runs in a pool worker process"""
+    return analyze_lease_pieces([lease_text])
+
+
+def build_lease_analysis(hits: Dict[str, List[int]], snippets: Dict[str, str]) -> Dict[str, Any]:
+    """Build a lease analysis from indicator offsets and the text following the first rent and term indicators"""
+    # Extract base rent (look for dollar amounts near "rent" mentions)
+    base_rent = "Not specified"
+    for indicator in LEASE_RENT_INDICATORS:
+        if indicator in hits:
+            # Look for a dollar amount in the 100 characters after the first occurrence
+            snippet = snippets[indicator]
+            # Simple regex-like search for dollar amounts
+            dollar_pos = snippet.find("$")
+            if dollar_pos != -1:
+                # Extract the amount (up to 20 chars after $ sign)
+                amount = snippet[dollar_pos:dollar_pos+20]
+                # Truncate at the first non-amount character
+                for i, char in enumerate(amount):
+                    if i > 0 and not (char.isdigit() or char in ",." or char.isspace()):
+                        amount = amount[:i]
+                        break
+                base_rent = amount
+                break
+
+    # Extract lease term (look for years or months near "term" mentions)
+    lease_term = "Not specified"
+    for indicator in LEASE_TERM_INDICATORS:
+        if indicator in hits:
+            # Look for year/month mentions in the 100 characters after the first occurrence
+            snippet = snippets[indicator]
+            snippet_lower = snippet.lower()
+            # Check for common term patterns
+            for pattern in ["year", "month", "annual"]:
+                if pattern in snippet_lower:
+                    # Extract a reasonable snippet
+                    start = max(0, snippet_lower.find(pattern) - 10)
+                    end = min(len(snippet_lower), snippet_lower.find(pattern) + 20)
+                    term_snippet = snippet[start:end]
+                    lease_term = term_snippet.strip()
+                    break
+            if lease_term != "Not specified":
+                break
+
+    # Generate some plausible renewals based on common patterns
+    renewals = []
+    if any(keyword in hits for keyword in LEASE_RENEWAL_KEYWORDS):
+        if any(keyword in hits for keyword in LEASE_RENEWAL_OPTION_KEYWORDS):
+            renewals.append("Tenant has option to renew/extend (details not fully extracted)")
+
+    # Generate some plausible break clauses based on common patterns
+    break_clauses = []
+    if any(keyword in hits for keyword in LEASE_BREAK_KEYWORDS):
+        break_clauses.append("Lease may contain termination provisions (details not fully extracted)")
+
+    # Report every red flag, with the position of each match
+    red_flags = []
+    red_flag_matches = []
+    for indicator, flag in LEASE_RED_FLAG_INDICATORS.items():
+        if indicator in hits:
+            red_flags.append(flag)
+            red_flag_matches.extend(
+                {"indicator": indicator, "description": flag, "start": pos, "end": pos + len(indicator)}
+                for pos in hits[indicator]
+            )
+
+    red_flag_matches.sort(key=lambda match: match["start"])
+
+    return {
+        "base_rent": base_rent,
+        "lease_term": lease_term,
+        "renewals": renewals,
+        "break_clauses": break_clauses,
+        "red_flags": red_flags,
+        "red_flag_matches": red_flag_matches
+    }
@@ -0,0 +1,126 @@
+"""
+Streaming ingestion of uploaded lease documents
+
+Uploads are copied to the uploads directory in fixed-size chunks while
+being hashed (in the threadpool, off the event loop), and paragraphs are then read back one at a time so large
+leases can be analyzed without loading the whole document into memory.
+
+DOCX files are parsed with zipfile and an incremental XML parser (no extra
+dependencies); anything that is not a DOCX archive is read as UTF-8 text,
+one line per paragraph.
+
+The upload directory comes from the LEASE_UPLOAD_DIR environment variable
+(default "uploads").
+"""
+
+import hashlib
+import os
+import uuid
+import zipfile
+from typing import BinaryIO, Iterator, Tuple
+from xml.etree import ElementTree
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Bytes read from the upload and written to disk at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Namespace of the WordprocessingML elements in word/document.xml
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def discard(out: BinaryIO, file_path: str) -> None:
+    """Close and delete a partially written upload"""
+    out.close()
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+
+def get_upload_dir() -> str:
+    """Get the directory uploaded leases are stored in, creating it if needed"""
+    upload_dir = os.getenv("LEASE_UPLOAD_DIR", "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir
+
+
+async def save_upload(file: UploadFile) -> Tuple[str, str, str, int]:
+    """
+    Stream an uploaded file to the uploads directory, hashing it in flight
+
+    Args:
+        file: The uploaded file
+
+    Returns:
+        Tuple of (file ID, path on disk, SHA-256 hex digest, size in bytes)
+    """
+    extension = os.path.splitext(file.filename or "")[1].lower()
+    file_id = str(uuid.uuid4())
+    file_path = os.path.join(await run_in_threadpool(get_upload_dir), f"{file_id}{extension}")
+
+    sha256 = hashlib.sha256()
+    size = 0
+
+    def write(out: BinaryIO, chunk: bytes) -> None:
+        sha256.update(chunk)
+        out.write(chunk)
+
+    # Disk I/O and hashing run in the threadpool so a large lease doesn't stall the event loop
+    out = await run_in_threadpool(open, file_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await run_in_threadpool(write, out, chunk)
+            size += len(chunk)
+        await run_in_threadpool(out.close)
+    except Exception:
+        # Do not leave partial uploads behind
+        await run_in_threadpool(discard, out, file_path)
+        raise
+
+    return file_id, file_path, sha256.hexdigest(), size
+
+
+def iter_docx_paragraphs(file_path: str) -> Iterator[str]:
+    """Yield the text of each paragraph of a DOCX file, parsing document.xml incrementally"""
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open("word/document.xml") as document:
+            parts = []
+            for event, element in ElementTree.iterparse(document, events=("end",)):
+                tag = element.tag
+                if tag == f"{WORD_NAMESPACE}t":
+                    parts.append(element.text or "")
+                elif tag == f"{WORD_NAMESPACE}tab":
+                    parts.append("\t")
+                elif tag in (f"{WORD_NAMESPACE}br", f"{WORD_NAMESPACE}cr"):
+                    parts.append("\n")
+                elif tag == f"{WORD_NAMESPACE}p":
+                    yield "".join(parts)
+                    parts = []
+                    # Free the paragraph's subtree now that its text is extracted
+                    element.clear()
+
+
+def iter_text_paragraphs(file_path: str) -> Iterator[str]:
+    """Yield each line of a text file"""
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def is_docx(file_path: str) -> bool:
+    """Check whether a file is a DOCX archive"""
+    if not zipfile.is_zipfile(file_path):
+        return False
+    with zipfile.ZipFile(file_path) as archive:
+        return "word/document.xml" in archive.namelist()
+
+
+def iter_lease_paragraphs(file_path: str) -> Iterator[str]:
+    """Yield the paragraphs of a stored lease document, one at a time"""
+    if is_docx(file_path):
+        return iter_docx_paragraphs(file_path)
+    return iter_text_paragraphs(file_path)
+
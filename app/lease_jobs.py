@@ -0,0 +1,167 @@
+"""
+Batch lease analysis jobs for the CRE Platform API
+
+A batch job fans its documents out to a shared ProcessPoolExecutor, so
+CPU-bound clause extraction runs on every core while the asyncio event
+loop stays free to serve other routes. Results are recorded as they
+complete; clients poll the job for progress or stream its results.
+
+Jobs are kept in memory by the worker process that accepted them, so
+clients must poll the same worker (e.g. with sticky sessions) when the API
+runs under several gunicorn workers.
+
+The pool size comes from the LEASE_BATCH_WORKERS environment variable
+(default: half the CPU cores). The Monte Carlo simulation pool
+(RISK_SIMULATION_WORKERS, see monte_carlo.py) takes the other half, so keep
+LEASE_BATCH_WORKERS + RISK_SIMULATION_WORKERS at or below the core count
+when setting either.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+# Finished jobs kept for polling before the oldest are dropped
+MAX_RETAINED_JOBS = 100
+
+# Documents in flight per pool worker; bounds how much work is queued at once
+IN_FLIGHT_PER_WORKER = 2
+
+
+class LeaseBatchJob:
+    """State of one batch lease analysis job"""
+
+    def __init__(self, total: int):
+        self.id = str(uuid.uuid4())
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.status = "queued"
+        self.created_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+        # Result records in completion order
+        self.results: List[Dict[str, Any]] = []
+        self._changed = asyncio.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    async def record(self, result: Dict[str, Any]) -> None:
+        """Record a finished document and wake up result streams"""
+        async with self._changed:
+            self.results.append(result)
+            if "error" in result:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._changed.notify_all()
+
+    async def finish(self, status: str) -> None:
+        async with self._changed:
+            self.status = status
+            self.finished_at = datetime.now()
+            self._changed.notify_all()
+
+    async def iter_results(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every result, waiting for new ones until the job is done"""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.results) > sent or self.done)
+                pending = self.results[sent:]
+                done = self.done
+
+            for result in pending:
+                yield result
+            sent += len(pending)
+
+            if done and sent == len(self.results):
+                return
+
+
+class LeaseJobManager:
+    """Runs batch lease analysis jobs on a shared process pool"""
+
+    def __init__(self, worker: Callable[[str], Dict[str, Any]], max_workers: Optional[int] = None):
+        self.worker = worker
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 1) // 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: "OrderedDict[str, LeaseBatchJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the API does not fork workers
+        if self._executor is None:
+            # Spawned, not forked: the API process runs threads, and forking those is unsafe. The worker
+            # function must live in a module without import side effects (see lease_clauses.py)
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def submit(self, documents: List[Tuple[Optional[str], str]]) -> LeaseBatchJob:
+        """
+        Start a job analyzing (document_id, lease_text) pairs
+
+        Must be called from the event loop; the job runs in the background.
+        """
+        job = LeaseBatchJob(total=len(documents))
+        self._jobs[job.id] = job
+        self._evict_finished_jobs()
+
+        task = asyncio.get_running_loop().create_task(self._run(job, documents))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[LeaseBatchJob]:
+        return self._jobs.get(job_id)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, job: LeaseBatchJob, documents: List[Tuple[Optional[str], str]]) -> None:
+        loop = asyncio.get_running_loop()
+        in_flight = asyncio.Semaphore(self.max_workers * IN_FLIGHT_PER_WORKER)
+        job.status = "running"
+
+        async def analyze(index: int, document_id: Optional[str], lease_text: str) -> None:
+            async with in_flight:
+                try:
+                    analysis = await loop.run_in_executor(self.executor, self.worker, lease_text)
+                    result = {"index": index, "document_id": document_id, "analysis": analysis}
+                except Exception as e:
+                    result = {"index": index, "document_id": document_id, "error": str(e)}
+            await job.record(result)
+
+        try:
+            await asyncio.gather(*(
+                analyze(index, document_id, lease_text)
+                for index, (document_id, lease_text) in enumerate(documents)
+            ))
+        except Exception:
+            await job.finish("failed")
+            raise
+
+        await job.finish("completed")
+
+    def _evict_finished_jobs(self) -> None:
+        while len(self._jobs) > MAX_RETAINED_JOBS:
+            oldest = next((job_id for job_id, job in self._jobs.items() if job.done), None)
+            if oldest is None:
+                return
+            del self._jobs[oldest]
+
+
+def create_lease_job_manager(worker: Callable[[str], Dict[str, Any]]) -> LeaseJobManager:
+    """Create the lease job manager configured by the environment"""
+    max_workers = os.getenv("LEASE_BATCH_WORKERS")
+    return LeaseJobManager(worker, max_workers=int(max_workers) if max_workers else None)
@@ -0,0 +1,403 @@
+"""
+Async LLM gateway for narrative generation
+
+Memos, underwriting summaries and chat replies are drafted from templates;
+when an API key is configured the gateway asks a model (Fireworks, through
+its OpenAI-compatible chat completions API) to write the final text, and
+falls back to the template draft whenever the model can't answer in time.
+
+- One keep-alive httpx.AsyncClient is shared by every request in the process
+- A semaphore caps concurrent model calls per process; waiting for a slot
+  counts against the deadline
+- Timeouts, 429 and 5xx responses are retried with exponential backoff and
+  full jitter; the slot is released while backing off and taken again for
+  the next attempt
+- stream() and generate_stream() request a streamed completion and yield its
+  text deltas as they arrive, so SSE endpoints can send model text before the
+  whole completion exists; cache hits come back whole
+- Completions are cached in SQLite under a hash of the model, messages and
+  sampling parameters, so an identical prompt is only paid for once and the
+  cache survives restarts; cache reads and writes run in a worker thread so
+  disk I/O never blocks the event loop
+
+Settings come from the environment:
+
+- FIREWORKS_API_KEY: enables the gateway; without it templates are used
+- LLM_API_URL: chat completions endpoint (default Fireworks; point it at a
+  local stub server for testing)
+- LLM_MODEL: model name (default accounts/fireworks/models/llama-v3p1-70b-instruct)
+- LLM_MAX_CONCURRENCY: concurrent model calls per process (default 8)
+- LLM_TIMEOUT_SECONDS: timeout of one attempt (default 20)
+- LLM_MAX_RETRIES: retries after a failed attempt (default 2)
+- LLM_DEADLINE_SECONDS: total time before falling back (default 45)
+- LLM_CACHE_PATH: SQLite file of the response cache (default "llm_cache.db";
+  empty to disable)
+- LLM_CACHE_TTL_SECONDS: how long cached completions are used (default 7 days)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional
+
+import httpx
+
+FIREWORKS_API_URL = "https://api.fireworks.ai/inference/v1/chat/completions"
+DEFAULT_MODEL = "accounts/fireworks/models/llama-v3p1-70b-instruct"
+
+# Responses worth another attempt; other errors fail the call straight away
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# First retry waits up to this long, doubling with each further retry
+RETRY_BASE_SECONDS = 0.5
+
+Messages = List[Dict[str, str]]
+
+
+class LLMError(Exception):
+    """Raised when the model did not return a completion"""
+
+
+class Generation(NamedTuple):
+    """Text of a generate() call"""
+    text: str
+    # The model failed and the text is the fallback; don't cache it, so the model is asked again once it recovers
+    fell_back: bool
+
+
+def prompt_hash(model: str, messages: Messages, max_tokens: int, temperature: float) -> str:
+    """Get the cache key of a completion request"""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def iter_completion_deltas(response: httpx.Response) -> AsyncIterator[str]:
+    """
+    Yield the content deltas of a streamed chat completion (OpenAI-style SSE)
+
+    Raises:
+        LLMError: If an event is not a completion chunk
+    """
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+
+        try:
+            choices = json.loads(data)["choices"]
+            # The last chunk may carry only usage, with no choices
+            content = (choices[0].get("delta") or {}).get("content") if choices else None
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise LLMError("Model returned an unexpected stream event")
+        if content:
+            yield content
+
+
+class LLMResponseCache:
+    """Persistent SQLite cache of completions keyed by prompt hash"""
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached completion, or None if it is missing or expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM llm_responses WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl_seconds)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, response: str) -> None:
+        """Cache a completion"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, time.time())
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete expired completions; returns how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_responses WHERE created_at <= ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMGateway:
+    """Pooled, rate-limited and cached client for chat completions"""
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        api_url: str = FIREWORKS_API_URL,
+        model: str = DEFAULT_MODEL,
+        max_concurrency: int = 8,
+        timeout_seconds: float = 20,
+        max_retries: int = 2,
+        deadline_seconds: float = 45,
+        cache: Optional[LLMResponseCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout_seconds = timeout_seconds
+        self.max_retries = max_retries
+        self.deadline_seconds = deadline_seconds
+        self.cache = cache
+
+        # Created on first use, inside the event loop that serves requests
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.api_key)
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Connections and the semaphore belong to one event loop; a new loop (e.g. in tests) gets its own
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            await self._close_client()
+        if self._client is None:
+            self._loop = loop
+            self._client = httpx.AsyncClient(
+                transport=self._transport,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(self.timeout_seconds),
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    async def _close_client(self) -> None:
+        client, loop = self._client, self._loop
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+        if loop is not None and loop.is_running() and loop is not asyncio.get_running_loop():
+            # The client's loop runs in another thread; close the connections there
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except RuntimeError:
+            # The client's loop is already closed; its sockets are closed when collected
+            pass
+
+    async def complete(self, messages: Messages, max_tokens: int = 1024, temperature: float = 0.2) -> str:
+        """
+        Get a chat completion, from the cache when the same prompt was seen before
+
+        Raises:
+            LLMError: If every attempt failed or the model rejected the request
+        """
+        key = prompt_hash(self.model, messages, max_tokens, temperature)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        client = await self._get_client()
+        semaphore = self._semaphore
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature}
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                # Back off without holding a slot, so a flapping upstream doesn't starve other callers
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+            async with semaphore:
+                self.requests += 1
+                try:
+                    response = await client.post(self.api_url, json=payload)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    error = LLMError(f"Model request failed: {e!r}")
+                    continue
+
+            if response.status_code in RETRY_STATUS_CODES:
+                error = LLMError(f"Model returned HTTP {response.status_code}")
+                continue
+            if response.status_code != 200:
+                raise LLMError(f"Model returned HTTP {response.status_code}: {response.text[:200]}")
+
+            try:
+                text = response.json()["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                raise LLMError("Model returned an unexpected response")
+            break
+        else:
+            raise error
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, text)
+        return text
+
+    async def generate(self, messages: Messages, fallback: str, max_tokens: int = 1024) -> Generation:
+        """Get a completion, or the fallback text if the gateway is disabled or the model doesn't answer in time"""
+        if not self.enabled:
+            return Generation(fallback, False)
+
+        try:
+            text = await asyncio.wait_for(self.complete(messages, max_tokens), self.deadline_seconds)
+        except (LLMError, asyncio.TimeoutError):
+            self.fallbacks += 1
+            return Generation(fallback, True)
+        text = text.strip()
+        return Generation(text, False) if text else Generation(fallback, True)
+
+    async def stream(self, messages: Messages, max_tokens: int = 1024, temperature: float = 0.2) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas; a cached completion comes back as one delta
+
+        Failed attempts are retried like complete() until the first delta has
+        been yielded. The concurrency slot is held while deltas are consumed,
+        so a slow reader slows the model call down instead of buffering it.
+
+        Raises:
+            LLMError: If every attempt failed, the model rejected the request or the stream broke off
+        """
+        key = prompt_hash(self.model, messages, max_tokens, temperature)
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                self.cache_hits += 1
+                yield cached
+                return
+
+        client = await self._get_client()
+        semaphore = self._semaphore
+        payload = {"model": self.model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature, "stream": True}
+        parts: List[str] = []
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+            async with semaphore:
+                self.requests += 1
+                try:
+                    async with client.stream("POST", self.api_url, json=payload) as response:
+                        if response.status_code in RETRY_STATUS_CODES:
+                            error = LLMError(f"Model returned HTTP {response.status_code}")
+                            continue
+                        if response.status_code != 200:
+                            await response.aread()
+                            raise LLMError(f"Model returned HTTP {response.status_code}: {response.text[:200]}")
+
+                        async for delta in iter_completion_deltas(response):
+                            parts.append(delta)
+                            yield delta
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    # Text already sent can't be taken back, so only a stream that hasn't started is retried
+                    if parts:
+                        raise LLMError(f"Model stream broke off: {e!r}")
+                    error = LLMError(f"Model request failed: {e!r}")
+                    continue
+            break
+        else:
+            raise error
+
+        if self.cache is not None and parts:
+            await asyncio.to_thread(self.cache.set, key, "".join(parts))
+
+    async def generate_stream(self, messages: Messages, fallback: str, max_tokens: int = 1024) -> AsyncIterator[str]:
+        """
+        Stream a completion's text as it is generated, or the fallback text if
+        the gateway is disabled or the model has no text by the deadline
+
+        The deadline bounds the wait for the first delta. A stream that breaks
+        off after that raises LLMError, since the text sent can't be replaced.
+        """
+        if not self.enabled:
+            yield fallback
+            return
+
+        async with aclosing(self.stream(messages, max_tokens)) as deltas:
+            try:
+                first = await asyncio.wait_for(deltas.__anext__(), self.deadline_seconds)
+            except (LLMError, asyncio.TimeoutError, StopAsyncIteration):
+                self.fallbacks += 1
+                yield fallback
+                return
+
+            yield first
+            async for delta in deltas:
+                yield delta
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the gateway counters"""
+        return {
+            "enabled": self.enabled,
+            "model": self.model,
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "max_concurrency": self.max_concurrency
+        }
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._close_client()
+
+
+def create_llm_gateway() -> LLMGateway:
+    """Create the LLM gateway configured by the environment"""
+    api_key = os.getenv("FIREWORKS_API_KEY") or None
+    cache_path = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    cache = None
+    if api_key and cache_path:
+        cache = LLMResponseCache(cache_path, ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))))
+
+    return LLMGateway(
+        api_key=api_key,
+        api_url=os.getenv("LLM_API_URL", FIREWORKS_API_URL),
+        model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+        timeout_seconds=float(os.getenv("LLM_TIMEOUT_SECONDS", "20")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "2")),
+        deadline_seconds=float(os.getenv("LLM_DEADLINE_SECONDS", "45")),
+        cache=cache
+    )
@@ -0,0 +1,187 @@
+"""
+Monte Carlo simulation of development margin for the CRE Platform API
+
+Rent, vacancy, operating expenses and exit cap rate are drawn jointly from
+correlated normal factors (Cholesky of the correlation matrix) using a
+seeded numpy Generator, so a simulation is reproducible from its seed.
+Rent, opex and exit cap are lognormal around the base case (volatility is
+relative); vacancy is normal in percentage points, clipped to [0, 100].
+
+Paths are simulated in fixed-size chunks so memory stays bounded for
+millions of paths. Several deals are simulated in parallel on a process
+pool sized by RISK_SIMULATION_WORKERS (default: half the CPU cores). The
+pool spawns its workers rather than forking the threaded API process, and the
+calculate function sent to them is underwriting.underwrite_columns, so
+workers only import this module and underwriting.py.
+
+The lease batch pool (LEASE_BATCH_WORKERS, see lease_jobs.py) also defaults
+to half the cores, so the two pools together use one process per core per API
+worker process. When setting either variable, keep
+RISK_SIMULATION_WORKERS + LEASE_BATCH_WORKERS at or below the core count.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .underwriting import UnderwritingResult
+
+# Simulated inputs, in the order of the rows/columns of the correlation matrix
+SIMULATED_FIELDS = ("projected_rent_per_sf", "vacancy_rate", "operating_expenses_per_sf", "exit_cap_rate")
+
+# Rent moves against vacancy and exit cap; weak markets see all three worsen together
+DEFAULT_CORRELATION = (
+    (1.0, -0.5, 0.2, -0.3),
+    (-0.5, 1.0, 0.0, 0.4),
+    (0.2, 0.0, 1.0, 0.1),
+    (-0.3, 0.4, 0.1, 1.0),
+)
+
+DEFAULT_VOLATILITY = {
+    "projected_rent_per_sf": 0.10,
+    "vacancy_rate": 3.0,
+    "operating_expenses_per_sf": 0.10,
+    "exit_cap_rate": 0.10,
+}
+
+# Paths drawn and evaluated at a time
+CHUNK_SIZE = 262_144
+
+# Margin thresholds reported as probabilities, in percent
+MARGIN_THRESHOLDS = (10, 15)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def correlation_factor(correlation: Sequence[Sequence[float]]) -> np.ndarray:
+    """
+    Get the Cholesky factor of a correlation matrix over SIMULATED_FIELDS
+
+    Raises:
+        ValueError: If the matrix is not a valid correlation matrix
+    """
+    matrix = np.asarray(correlation, dtype=np.float64)
+    size = len(SIMULATED_FIELDS)
+
+    if matrix.shape != (size, size):
+        raise ValueError(f"Correlation matrix must be {size}x{size} over {', '.join(SIMULATED_FIELDS)}")
+    if not np.allclose(matrix, matrix.T) or not np.allclose(np.diag(matrix), 1.0):
+        raise ValueError("Correlation matrix must be symmetric with ones on the diagonal")
+
+    try:
+        return np.linalg.cholesky(matrix)
+    except np.linalg.LinAlgError:
+        raise ValueError("Correlation matrix must be positive definite")
+
+
+def simulate_margins(
+    inputs: Dict[str, float],
+    calculate: Callable[[Mapping[str, Any]], UnderwritingResult],
+    paths: int,
+    seed: Any,
+    volatility: Dict[str, float],
+    correlation: Sequence[Sequence[float]] = DEFAULT_CORRELATION
+) -> np.ndarray:
+    """
+    Simulate the development margin of one deal
+
+    Args:
+        inputs: Base-case underwriting inputs
+        calculate: Vectorized underwriting calculation, e.g. underwrite_columns
+        paths: Number of paths to simulate
+        seed: Seed (int or SeedSequence) for the random generator
+        volatility: Volatility of each simulated input
+        correlation: Correlation matrix over SIMULATED_FIELDS
+
+    Returns:
+        Development margin of every path
+    """
+    rng = np.random.default_rng(seed)
+    factor = correlation_factor(correlation)
+
+    rent_sigma = volatility["projected_rent_per_sf"]
+    opex_sigma = volatility["operating_expenses_per_sf"]
+    cap_sigma = volatility["exit_cap_rate"]
+
+    margins = np.empty(paths)
+    for start in range(0, paths, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, paths - start)
+        rent_z, vacancy_z, opex_z, cap_z = factor @ rng.standard_normal((len(SIMULATED_FIELDS), count))
+
+        columns: Dict[str, Any] = dict(inputs)
+        # Mean-preserving lognormal draws keep the base case as the expected value
+        columns["projected_rent_per_sf"] = inputs["projected_rent_per_sf"] * np.exp(rent_sigma * rent_z - rent_sigma ** 2 / 2)
+        columns["operating_expenses_per_sf"] = inputs["operating_expenses_per_sf"] * np.exp(opex_sigma * opex_z - opex_sigma ** 2 / 2)
+        columns["exit_cap_rate"] = inputs["exit_cap_rate"] * np.exp(cap_sigma * cap_z - cap_sigma ** 2 / 2)
+        columns["vacancy_rate"] = np.clip(inputs["vacancy_rate"] + volatility["vacancy_rate"] * vacancy_z, 0, 100)
+
+        margins[start:start + count] = calculate(columns).development_margin
+
+    return margins
+
+
+def summarize_margins(margins: np.ndarray) -> Dict[str, float]:
+    """
+    Get the percentiles and threshold probabilities of simulated margins
+
+    Paths without a finite margin (e.g. a drawn exit cap rate that rounds to
+    zero) are left out and counted as dropped_paths.
+
+    Raises:
+        ValueError: If no path has a finite margin
+    """
+    finite = margins[np.isfinite(margins)]
+    if not finite.size:
+        raise ValueError("No simulated path has a finite development margin")
+
+    p5, p50, p95 = np.percentile(finite, (5, 50, 95))
+    summary = {
+        "p5_margin": float(p5),
+        "p50_margin": float(p50),
+        "p95_margin": float(p95),
+        "mean_margin": float(finite.mean()),
+        "dropped_paths": int(margins.size - finite.size),
+    }
+    for threshold in MARGIN_THRESHOLDS:
+        summary[f"probability_margin_below_{threshold}"] = float(np.count_nonzero(finite < threshold) / finite.size)
+    return summary
+
+
+def run_simulation(
+    inputs: Dict[str, float],
+    calculate: Callable[[Mapping[str, Any]], UnderwritingResult],
+    paths: int,
+    seed: Any,
+    volatility: Dict[str, float],
+    correlation: Sequence[Sequence[float]] = DEFAULT_CORRELATION
+) -> Dict[str, float]:
+    """Simulate one deal and summarize it; the unit of work sent to pool workers"""
+    return summarize_margins(simulate_margins(inputs, calculate, paths, seed, volatility, correlation))
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the process pool deals are simulated on, creating it on first use"""
+    global _executor
+    if _executor is None:
+        max_workers = os.getenv("RISK_SIMULATION_WORKERS")
+        _executor = ProcessPoolExecutor(
+            max_workers=int(max_workers) if max_workers else max(1, (os.cpu_count() or 1) // 2),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    """Stop the simulation pool's workers; a later simulation starts a new pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def spawn_seeds(seed: int, count: int) -> List[np.random.SeedSequence]:
+    """Derive independent, reproducible seeds for simulating several deals"""
+    return np.random.SeedSequence(seed).spawn(count)
@@ -0,0 +1,163 @@
+"""
+Content-addressed result cache for the CRE Platform API
+
+Calculation and narrative endpoints are pure functions of their request
+model, so their responses can be cached under a hash of the normalized
+request. The cache is a bounded LRU with a TTL and a memory budget; entry
+sizes are measured as the length of the serialized response.
+
+Settings come from the environment:
+
+- RESULT_CACHE_MAX_ENTRIES: maximum number of cached responses (default 1024)
+- RESULT_CACHE_MAX_BYTES: maximum total size of cached responses (default 64 MB)
+- RESULT_CACHE_TTL_SECONDS: how long a response stays valid (default 300)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+
+def cache_key(namespace: str, request: BaseModel) -> str:
+    """
+    Get the cache key for a request model
+
+    The model is dumped in JSON mode after validation, so payloads that only
+    differ in key order, whitespace or int/float spelling share a key.
+    """
+    canonical = json.dumps(
+        request.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    digest = hashlib.sha256(f"{namespace}:{canonical}".encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class ResultCache:
+    """Thread-safe LRU cache with a TTL and a memory budget"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (expires_at, size, value), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, size, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: BaseModel) -> None:
+        """Cache a response model, evicting least recently used entries to stay within budget"""
+        size = len(value.model_dump_json())
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_compute(self, namespace: str, request: BaseModel, compute: Callable[[], BaseModel]) -> BaseModel:
+        """Get the cached response for a request, computing and caching it on a miss"""
+        key = cache_key(namespace, request)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        result = compute()
+        self.set(key, result)
+        return result
+
+    async def get_or_compute_async(
+        self,
+        namespace: str,
+        request: BaseModel,
+        compute: Callable[[], Awaitable[BaseModel]],
+        cacheable: Callable[[BaseModel], bool] = lambda result: True
+    ) -> BaseModel:
+        """
+        Like get_or_compute, for responses computed by a coroutine
+
+        A computed response is only cached if cacheable(response) is true,
+        e.g. not when it holds template text because the model failed.
+        """
+        key = cache_key(namespace, request)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        result = await compute()
+        if cacheable(result):
+            self.set(key, result)
+        return result
+
+    def clear(self) -> None:
+        """Remove every entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the cache counters and current usage"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds
+            }
+
+
+def create_result_cache() -> ResultCache:
+    """Create the result cache configured by the environment"""
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300"))
+    )
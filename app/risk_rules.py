@@ -0,0 +1,440 @@
+"""
+Table-driven risk rules evaluated over batches of deals
+
+A rule set is data, not code: each rule names a metric, a comparator, a
+threshold, a severity and a message template, e.g.
+
+    {"id": "high_vacancy", "metric": "vacancy_rate", "op": ">", "threshold": 7,
+     "severity": "medium", "message": "High vacancy rate of {vacancy_rate}% increases risk"}
+
+Compiling a rule set turns every rule into a comparison that is applied to a
+whole column at once, so a portfolio of any size is flagged with one NumPy
+mask per rule; only the flagged rows are then formatted. Rules sharing a
+"group" are exclusive like an if/elif chain: a row gets the first matching
+rule of the group, in table order. The risk score comes from bands over one
+metric, and rows without any flag get the default flag.
+
+RiskRuleEngine serves the current rule set. With RISK_RULES_PATH set it
+reads the rules from that JSON file and checks it for changes at most every
+RISK_RULES_CHECK_SECONDS (default 2), so every worker process picks up an
+edited file without a restart. A file that fails to load is logged and the
+previous rules stay in force.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import math
+import operator
+import os
+import string
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+COMPARATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+SEVERITIES = ("low", "medium", "high")
+
+# The rules calculate_risk_score used to hard-code
+DEFAULT_RISK_RULES: Dict[str, Any] = {
+    "rules": [
+        {
+            "id": "low_margin",
+            "metric": "development_margin",
+            "op": "<",
+            "threshold": 10,
+            "severity": "high",
+            "group": "margin",
+            "message": "Low development margin of {development_margin:.2f}% indicates high risk"
+        },
+        {
+            "id": "moderate_margin",
+            "metric": "development_margin",
+            "op": "<",
+            "threshold": 15,
+            "severity": "medium",
+            "group": "margin",
+            "message": "Moderate development margin of {development_margin:.2f}% indicates medium risk"
+        },
+        {
+            "id": "high_vacancy",
+            "metric": "vacancy_rate",
+            "op": ">",
+            "threshold": 7,
+            "severity": "medium",
+            "message": "High vacancy rate of {vacancy_rate}% increases risk"
+        },
+        {
+            "id": "high_exit_cap",
+            "metric": "exit_cap_rate",
+            "op": ">",
+            "threshold": 7,
+            "severity": "medium",
+            "message": "High exit cap rate of {exit_cap_rate}% increases risk"
+        },
+        {
+            "id": "office",
+            "metric": "property_type",
+            "op": "==",
+            "threshold": "Office",
+            "severity": "low",
+            "group": "property_type",
+            "message": "Office properties face challenges from remote work trends"
+        },
+        {
+            "id": "retail",
+            "metric": "property_type",
+            "op": "==",
+            "threshold": "Retail",
+            "severity": "low",
+            "group": "property_type",
+            "message": "Retail properties face increased competition from e-commerce"
+        },
+        {
+            "id": "industrial",
+            "metric": "property_type",
+            "op": "==",
+            "threshold": "Industrial",
+            "severity": "low",
+            "group": "property_type",
+            "message": "Industrial properties may be affected by supply chain disruptions"
+        },
+        {
+            "id": "multifamily",
+            "metric": "property_type",
+            "op": "==",
+            "threshold": "Multifamily",
+            "severity": "low",
+            "group": "property_type",
+            "message": "Multifamily properties may face rental market saturation in some areas"
+        }
+    ],
+    "score": {
+        "metric": "development_margin",
+        "bands": [{"below": 10, "score": "High"}, {"below": 15, "score": "Medium"}],
+        "default": "Low"
+    },
+    "default_flag": {"severity": "low", "message": "General market volatility and economic uncertainty"},
+    "max_flags": 3
+}
+
+
+class RiskFlag(NamedTuple):
+    """One risk flag raised for a deal"""
+    rule: str
+    severity: str
+    message: str
+
+
+class RiskAssessment(NamedTuple):
+    """Risk scores and flags of a batch of deals, one entry per row"""
+    risk_scores: List[Optional[str]]
+    flags: List[List[RiskFlag]]
+
+
+class RiskRule(NamedTuple):
+    """A compiled rule"""
+    id: str
+    metric: str
+    op: str
+    threshold: Any
+    severity: str
+    message: str
+    group: Optional[str]
+    template: str
+    fields: Tuple[str, ...]
+
+
+def _compile_template(message: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Split a message template into a positional template and the metrics it quotes
+
+    "{vacancy_rate:.1f}%" becomes ("{0:.1f}%", ("vacancy_rate",)), which can be
+    formatted straight from columns of values with map().
+    """
+    pieces = []
+    fields: List[str] = []
+    for literal, name, spec, conversion in string.Formatter().parse(message):
+        pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+        if name is None:
+            continue
+        if not name or "{" in (spec or ""):
+            raise ValueError(f"Message template '{message}' must name each metric and can't nest fields")
+        if name not in fields:
+            fields.append(name)
+        pieces.append("{" + str(fields.index(name)) + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+    return "".join(pieces), tuple(fields)
+
+
+class RiskRuleSet:
+    """
+    A validated, compiled rule set
+
+    Raises:
+        ValueError: If the rule set is malformed or refers to unknown metrics
+    """
+
+    def __init__(self, config: Mapping[str, Any], metrics: Optional[Mapping[str, type]] = None):
+        self.config = copy.deepcopy(dict(config))
+        canonical = json.dumps(self.config, sort_keys=True, separators=(",", ":"))
+        self.version = hashlib.sha256(canonical.encode()).hexdigest()[:12]
+
+        try:
+            self.rules = [self._compile_rule(rule, metrics) for rule in self.config["rules"]]
+
+            score = self.config["score"]
+            self.score_metric = score["metric"]
+            self._check_metric(self.score_metric, metrics, numeric=True)
+            self.score_bands = [(float(band["below"]), str(band["score"])) for band in score["bands"]]
+            self.default_score = str(score["default"])
+
+            default_flag = self.config.get("default_flag")
+            self.default_flag = RiskFlag("default", default_flag["severity"], default_flag["message"]) if default_flag else None
+            self.max_flags: Optional[int] = self.config.get("max_flags")
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed risk rule set: {e!r}")
+
+        ids = [rule.id for rule in self.rules]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Risk rule IDs must be unique")
+        if self.default_flag and self.default_flag.severity not in SEVERITIES:
+            raise ValueError(f"Unknown severity '{self.default_flag.severity}' of the default flag")
+        if self.max_flags is not None and (not isinstance(self.max_flags, int) or self.max_flags < 1):
+            raise ValueError("max_flags must be a positive integer or null")
+
+        self.metrics = sorted({rule.metric for rule in self.rules} | {field for rule in self.rules for field in rule.fields} | {self.score_metric})
+
+    @staticmethod
+    def _check_metric(metric: str, metrics: Optional[Mapping[str, type]], numeric: bool) -> None:
+        if metrics is None:
+            return
+        if metric not in metrics:
+            raise ValueError(f"Unknown metric '{metric}'; expected one of {', '.join(metrics)}")
+        if numeric and metrics[metric] is str:
+            raise ValueError(f"Metric '{metric}' is text and can only be compared with == or !=")
+
+    def _compile_rule(self, rule: Mapping[str, Any], metrics: Optional[Mapping[str, type]]) -> RiskRule:
+        rule_id = str(rule["id"])
+        op = rule["op"]
+        if op not in COMPARATORS:
+            raise ValueError(f"Rule '{rule_id}': unknown comparator '{op}'; expected one of {', '.join(COMPARATORS)}")
+        if rule["severity"] not in SEVERITIES:
+            raise ValueError(f"Rule '{rule_id}': unknown severity '{rule['severity']}'; expected one of {', '.join(SEVERITIES)}")
+
+        threshold = rule["threshold"]
+        numeric = op not in ("==", "!=") or not isinstance(threshold, str)
+        if numeric and not isinstance(threshold, (int, float)):
+            raise ValueError(f"Rule '{rule_id}': threshold must be a number")
+        self._check_metric(rule["metric"], metrics, numeric)
+        if metrics is not None and not numeric and metrics[rule["metric"]] is not str:
+            raise ValueError(f"Rule '{rule_id}': metric '{rule['metric']}' is a number")
+
+        message = str(rule["message"])
+        template, fields = _compile_template(message)
+        for field in fields:
+            self._check_metric(field, metrics, numeric=False)
+
+        return RiskRule(rule_id, rule["metric"], op, threshold, rule["severity"], message, rule.get("group"), template, fields)
+
+    def evaluate(self, columns: Mapping[str, Any]) -> RiskAssessment:
+        """
+        Score and flag a batch of deals
+
+        Args:
+            columns: One equal-length array (or list) per metric the rules use
+
+        Returns:
+            The risk score and flags of every row; the score is None where the
+            score metric is not finite (e.g. a zero exit cap rate)
+        """
+        arrays = {metric: np.asarray(columns[metric]) for metric in self.metrics}
+        score_values = arrays[self.score_metric]
+        count = len(score_values)
+
+        # One mask per rule; a group's mask only keeps rows no earlier rule of the group took
+        taken: Dict[str, np.ndarray] = {}
+        masks = []
+        with np.errstate(invalid="ignore"):
+            for rule in self.rules:
+                mask = COMPARATORS[rule.op](arrays[rule.metric], rule.threshold)
+                if rule.group is not None:
+                    claimed = taken.get(rule.group)
+                    if claimed is not None:
+                        mask = mask & ~claimed
+                        taken[rule.group] = claimed | mask
+                    else:
+                        taken[rule.group] = mask
+                masks.append(mask)
+
+            finite = np.isfinite(score_values)
+            scores = np.select(
+                [score_values < below for below, _ in self.score_bands],
+                [label for _, label in self.score_bands],
+                default=self.default_score
+            ).astype(object)
+            scores[~finite] = None
+
+        # Only flagged rows are formatted, a rule at a time from the masked columns it quotes
+        flags: List[List[RiskFlag]] = [[] for _ in range(count)]
+        for rule, mask in zip(self.rules, masks):
+            rows = np.flatnonzero(mask).tolist()
+            if not rule.fields:
+                flag = RiskFlag(rule.id, rule.severity, rule.message)
+                for row in rows:
+                    flags[row].append(flag)
+                continue
+
+            messages = map(rule.template.format, *(arrays[field][mask].tolist() for field in rule.fields))
+            for row, message in zip(rows, messages):
+                flags[row].append(RiskFlag(rule.id, rule.severity, message))
+
+        for row_flags in flags:
+            if not row_flags and self.default_flag:
+                row_flags.append(self.default_flag)
+            if self.max_flags is not None:
+                del row_flags[self.max_flags:]
+
+        return RiskAssessment(scores.tolist(), flags)
+
+    def evaluate_one(self, values: Mapping[str, Any]) -> Tuple[Optional[str], List[RiskFlag]]:
+        """
+        Score and flag one deal
+
+        The same comparisons as evaluate() on plain values: one-row arrays
+        would cost ten times as much as the rules themselves.
+        """
+        flags: List[RiskFlag] = []
+        taken = set()
+        for rule in self.rules:
+            if rule.group in taken or not COMPARATORS[rule.op](values[rule.metric], rule.threshold):
+                continue
+            if rule.group is not None:
+                taken.add(rule.group)
+            message = rule.template.format(*[values[field] for field in rule.fields]) if rule.fields else rule.message
+            flags.append(RiskFlag(rule.id, rule.severity, message))
+
+        if not flags and self.default_flag:
+            flags.append(self.default_flag)
+        if self.max_flags is not None:
+            del flags[self.max_flags:]
+
+        score_value = values[self.score_metric]
+        risk_score = None
+        if math.isfinite(score_value):
+            risk_score = next((label for below, label in self.score_bands if score_value < below), self.default_score)
+        return risk_score, flags
+
+
+class RiskRuleEngine:
+    """Serve the current risk rule set, reloading it when its file changes"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        metrics: Optional[Mapping[str, type]] = None,
+        check_interval: float = 2.0
+    ):
+        self.path = path
+        self.metrics = metrics
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self.loaded_at = datetime.now()
+        self.reloads = 0
+        self.last_error: Optional[str] = None
+
+        self._rules = RiskRuleSet(DEFAULT_RISK_RULES, metrics)
+        if path:
+            # A missing or broken file at startup is a configuration error, not something to fall back from
+            self._rules = self._load()
+            self._checked_at = time.monotonic()
+
+    def _load(self) -> RiskRuleSet:
+        stat = os.stat(self.path)
+        with open(self.path) as f:
+            rules = RiskRuleSet(json.load(f), self.metrics)
+        self._signature = (stat.st_mtime_ns, stat.st_size)
+        self.loaded_at = datetime.now()
+        return rules
+
+    @property
+    def rules(self) -> RiskRuleSet:
+        """The current rule set, after picking up any change to the rules file"""
+        if self.path and time.monotonic() - self._checked_at >= self.check_interval:
+            self.reload()
+        return self._rules
+
+    def reload(self, force: bool = False) -> bool:
+        """Reload the rules file if it changed; returns whether new rules are in force"""
+        if not self.path:
+            return False
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                stat = os.stat(self.path)
+                if not force and (stat.st_mtime_ns, stat.st_size) == self._signature:
+                    return False
+                rules = self._load()
+            except (OSError, ValueError) as e:
+                # json.JSONDecodeError is a ValueError; keep serving the rules we have
+                self.last_error = f"{type(e).__name__}: {e}"
+                logger.warning(f"Could not reload risk rules from {self.path}: {self.last_error}")
+                return False
+
+            changed = rules.version != self._rules.version
+            self._rules = rules
+            self.last_error = None
+            if changed:
+                self.reloads += 1
+                logger.info(f"Loaded risk rules version {rules.version} from {self.path}")
+            return changed
+
+    @property
+    def version(self) -> str:
+        return self.rules.version
+
+    def evaluate(self, columns: Mapping[str, Any]) -> RiskAssessment:
+        """Score and flag a batch of deals with the current rules"""
+        return self.rules.evaluate(columns)
+
+    def evaluate_one(self, values: Mapping[str, Any]) -> Tuple[Optional[str], List[RiskFlag]]:
+        """Score and flag one deal with the current rules"""
+        return self.rules.evaluate_one(values)
+
+    def status(self) -> Dict[str, Any]:
+        """Get where the current rules came from and whether the last reload failed"""
+        rules = self.rules
+        return {
+            "version": rules.version,
+            "source": self.path or "default",
+            "loaded_at": self.loaded_at.isoformat(),
+            "reloads": self.reloads,
+            "last_error": self.last_error,
+            "rules": rules.config
+        }
+
+
+def create_risk_rule_engine(numeric_metrics: Iterable[str], text_metrics: Iterable[str] = ("property_type",)) -> RiskRuleEngine:
+    """Create the risk rule engine configured by the environment, for rules over the given metrics"""
+    return RiskRuleEngine(
+        path=os.getenv("RISK_RULES_PATH") or None,
+        metrics={**dict.fromkeys(numeric_metrics, float), **dict.fromkeys(text_metrics, str)},
+        check_interval=float(os.getenv("RISK_RULES_CHECK_SECONDS", "2"))
+    )
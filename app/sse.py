@@ -0,0 +1,84 @@
+"""
+Server-Sent Events streaming for narrative endpoints
+
+The streaming variants of the chat, memo and underwriting endpoints send their
+text section by section as it is produced, so a client can render it before
+the whole narrative exists. Every stream has the same events:
+
+- "result": the structured fields of the non-streaming response, if any
+- "section": {"text": ...} for each section; the texts concatenated equal the
+  narrative of the non-streaming response. Template narratives are sent a
+  paragraph at a time; model-written ones as their tokens arrive
+- "error": {"detail": ...} if generation fails part way
+- "done": sent last when generation finished
+
+Back-pressure: StreamingResponse awaits every send, so the next section is
+only produced once the previous one was handed to the server and a slow
+client slows generation down instead of piling up buffered events.
+
+Cancellation: when the client disconnects, Starlette cancels the response
+task, and the section producer is closed where it stopped.
+"""
+
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+from fastapi.responses import StreamingResponse
+
+# Proxies (e.g. nginx) must not buffer the stream or cache it
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+Sections = Union[Iterable[str], AsyncIterable[str]]
+
+
+def format_event(event: str, data: Any) -> bytes:
+    """Encode one SSE event with a JSON payload"""
+    # json.dumps escapes newlines, so the payload always fits on one data line
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def split_sections(text: str) -> List[str]:
+    """Split finished text into paragraphs that concatenate back to it"""
+    paragraphs = text.split("\n\n")
+    sections = [paragraph + "\n\n" for paragraph in paragraphs[:-1]]
+    if paragraphs[-1]:
+        sections.append(paragraphs[-1])
+    return sections
+
+
+async def iter_sse_events(sections: Sections, result: Optional[Dict[str, Any]] = None) -> AsyncIterator[bytes]:
+    """
+    Stream narrative sections as SSE events
+
+    Args:
+        sections: The narrative sections in order, from a sync or async iterator
+        result: Structured fields sent first as the "result" event (optional)
+    """
+    try:
+        if result is not None:
+            yield format_event("result", result)
+
+        try:
+            if hasattr(sections, "__aiter__"):
+                async for text in sections:
+                    yield format_event("section", {"text": text})
+            else:
+                for text in sections:
+                    yield format_event("section", {"text": text})
+        except Exception as e:
+            yield format_event("error", {"detail": str(e)})
+            return
+
+        yield format_event("done", {})
+    finally:
+        # Runs on disconnect too, so a generator producing sections stops there
+        close = getattr(sections, "aclose", None)
+        if close is not None:
+            await close()
+        elif hasattr(sections, "close"):
+            sections.close()
+
+
+def event_stream_response(sections: Sections, result: Optional[Dict[str, Any]] = None) -> StreamingResponse:
+    """Build an SSE response streaming narrative sections"""
+    return StreamingResponse(iter_sse_events(sections, result), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -3,8 +3,19 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List
 
+try:
+    from .risk_rules import create_risk_rule_engine
+    from .underwriting import UNDERWRITING_INPUT_FIELDS, UnderwritingResult, underwrite
+except ImportError:
+    # Run as a script (python app/standalone.py)
+    from risk_rules import create_risk_rule_engine
+    from underwriting import UNDERWRITING_INPUT_FIELDS, UnderwritingResult, underwrite
+
 app = FastAPI()
 
+# Risk flags come from the shared rule table (see risk_rules.py)
+risk_rules = create_risk_rule_engine(UNDERWRITING_INPUT_FIELDS + UnderwritingResult._fields)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -66,56 +77,19 @@ async def calculate_risk_score(request: RiskRequest):
     """
     try:
         # Calculate financial metrics
-        gross_potential_income = request.square_footage * request.projected_rent_per_sf
-        effective_gross_income = gross_potential_income * (1 - request.vacancy_rate / 100)
-        operating_expenses = request.square_footage * request.operating_expenses_per_sf
-        net_operating_income = effective_gross_income - operating_expenses
-        project_cost = request.acquisition_price + request.construction_cost
-        estimated_exit_value = net_operating_income / (request.exit_cap_rate / 100)
-        development_margin = (estimated_exit_value - project_cost) / project_cost * 100
-        
-        # Determine risk score based on development margin
-        if development_margin < 10:
-            risk_score = "High"
-        elif development_margin < 15:
-            risk_score = "Medium"
-        else:
-            risk_score = "Low"
-        
-        # Generate risk flags
-        flags = []
-        
-        # Check development margin
-        if development_margin < 10:
-            flags.append(f"Low development margin of {development_margin:.2f}% indicates high risk")
-        elif development_margin < 15:
-            flags.append(f"Moderate development margin of {development_margin:.2f}% indicates medium risk")
-        
-        # Check vacancy rate
-        if request.vacancy_rate > 7:
-            flags.append(f"High vacancy rate of {request.vacancy_rate}% increases risk")
-        
-        # Check exit cap rate
-        if request.exit_cap_rate > 7:
-            flags.append(f"High exit cap rate of {request.exit_cap_rate}% increases risk")
-        
-        # Property type specific risks
-        if request.property_type == "Office":
-            flags.append("Office properties face challenges from remote work trends")
-        elif request.property_type == "Retail":
-            flags.append("Retail properties face increased competition from e-commerce")
-        elif request.property_type == "Industrial":
-            flags.append("Industrial properties may be affected by supply chain disruptions")
-        elif request.property_type == "Multifamily":
-            flags.append("Multifamily properties may face rental market saturation in some areas")
-        
-        # Ensure we have at least one flag
-        if not flags:
-            flags.append("General market volatility and economic uncertainty")
-        
-        # Limit to 3 flags
-        flags = flags[:3]
-        
+        result = underwrite(
+            request.acquisition_price,
+            request.construction_cost,
+            request.square_footage,
+            request.projected_rent_per_sf,
+            request.vacancy_rate,
+            request.operating_expenses_per_sf,
+            request.exit_cap_rate
+        )
+
+        # Score and flag the deal with the current risk rules
+        risk_score, flags = risk_rules.evaluate_one(dict(request.model_dump(), **result.to_dict()))
+
         # Create and return the response
         return RiskResponse(
             project_name=request.project_name,
@@ -128,12 +102,12 @@ async def calculate_risk_score(request: RiskRequest):
             vacancy_rate=request.vacancy_rate,
             operating_expenses_per_sf=request.operating_expenses_per_sf,
             exit_cap_rate=request.exit_cap_rate,
-            net_operating_income=net_operating_income,
-            project_cost=project_cost,
-            estimated_exit_value=estimated_exit_value,
-            development_margin=development_margin,
+            net_operating_income=result.net_operating_income,
+            project_cost=result.project_cost,
+            estimated_exit_value=result.estimated_exit_value,
+            development_margin=result.development_margin,
             risk_score=risk_score,
-            flags=flags
+            flags=[flag.message for flag in flags]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating risk score: {str(e)}")
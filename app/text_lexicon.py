@@ -0,0 +1,135 @@
+"""
+Lexicon engine for real estate text analysis
+
+A document is lowercased once, split into a stream of whitespace tokens and
+counted in a Counter (all in C); only the distinct tokens, usually a few
+hundred per document, are then normalized and looked up in frozen sets, so
+scoring is linear in the text and independent of the lexicon size.
+Multi-word terms ("cap rate", "net operating income") are searched for only
+when every one of their words occurs in the document.
+
+Tokens are words with surrounding punctuation removed, so "growth." counts
+as "growth"; hyphenated words stay whole, so "risk-free" is not "risk".
+
+The vocabulary is configurable: TEXT_LEXICON_PATH may name a JSON file with
+any of "positive" and "negative" (lists of words) and "keywords" (category
+-> list of terms), replacing the matching defaults below.
+"""
+
+import json
+import os
+import re
+import string
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple
+
+DEFAULT_POSITIVE_WORDS = ["good", "great", "excellent", "positive", "profit", "gain", "opportunity", "growth"]
+DEFAULT_NEGATIVE_WORDS = ["bad", "poor", "negative", "loss", "risk", "decline", "downturn", "problem"]
+
+# CRE vocabulary counted per category
+DEFAULT_KEYWORDS = {
+    "valuation": ["cap rate", "valuation", "appraisal", "noi", "net operating income", "price per square foot"],
+    "leasing": ["lease", "leases", "leasing", "tenant", "tenants", "rent", "rents", "renewal", "absorption"],
+    "occupancy": ["vacancy", "vacant", "occupancy", "occupied"],
+    "financing": ["interest rate", "interest rates", "debt", "loan", "refinancing", "lender", "ltv", "dscr"],
+    "development": ["construction", "development", "entitlement", "zoning", "permits"],
+    "supply": ["supply", "inventory", "pipeline", "deliveries", "demand"],
+}
+
+# Stripped from both ends of each token
+TOKEN_PUNCTUATION = string.punctuation + "\u2018\u2019\u201c\u201d"
+
+
+class TextScore(NamedTuple):
+    """Sentiment and keyword counts of one document"""
+    word_count: int
+    positive_count: int
+    negative_count: int
+    sentiment: str
+    keywords: Dict[str, int]
+
+
+def _continues_word(text: str, start: int) -> bool:
+    """Whether a match at start is inside a longer word"""
+    return start > 0 and (text[start - 1].isalnum() or text[start - 1] == "_")
+
+
+class LexiconEngine:
+    """Score documents against frozen sentiment lexicons and a keyword vocabulary"""
+
+    def __init__(
+        self,
+        positive: Iterable[str] = DEFAULT_POSITIVE_WORDS,
+        negative: Iterable[str] = DEFAULT_NEGATIVE_WORDS,
+        keywords: Mapping[str, Iterable[str]] = DEFAULT_KEYWORDS
+    ):
+        self.positive: FrozenSet[str] = frozenset(word.lower() for word in positive)
+        self.negative: FrozenSet[str] = frozenset(word.lower() for word in negative)
+
+        # Single words are looked up in the token counts, phrases are searched for in the text
+        self._word_categories: Dict[str, List[str]] = {}
+        self._phrase_categories: Dict[str, List[str]] = {}
+        for category, terms in keywords.items():
+            for term in terms:
+                words = term.lower().split()
+                table = self._phrase_categories if len(words) > 1 else self._word_categories
+                table.setdefault(" ".join(words), []).append(category)
+        self.categories = list(keywords)
+
+        # A leading \b would stop re from scanning for the literal first word, so the
+        # start of each match is checked by hand; the trailing \b keeps "interest rate"
+        # from matching inside "interest rates"
+        self._phrases = [
+            (frozenset(phrase.split()), re.compile(r"\s+".join(map(re.escape, phrase.split())) + r"\b"), categories)
+            for phrase, categories in self._phrase_categories.items()
+        ]
+
+    def score(self, text: str) -> TextScore:
+        """Score one document"""
+        lowered = text.lower()
+        tokens = lowered.split()
+
+        counts: Counter = Counter()
+        for token, count in Counter(tokens).items():
+            counts[token.strip(TOKEN_PUNCTUATION)] += count
+
+        positive_count = sum(counts[word] for word in self.positive.intersection(counts))
+        negative_count = sum(counts[word] for word in self.negative.intersection(counts))
+        if positive_count > negative_count:
+            sentiment = "Positive"
+        elif negative_count > positive_count:
+            sentiment = "Negative"
+        else:
+            sentiment = "Neutral"
+
+        keywords = dict.fromkeys(self.categories, 0)
+        for word in self._word_categories.keys() & counts.keys():
+            for category in self._word_categories[word]:
+                keywords[category] += counts[word]
+        for words, pattern, categories in self._phrases:
+            if not words <= counts.keys():
+                continue
+            occurrences = sum(1 for match in pattern.finditer(lowered) if not _continues_word(lowered, match.start()))
+            for category in categories:
+                keywords[category] += occurrences
+
+        return TextScore(len(tokens), positive_count, negative_count, sentiment, keywords)
+
+    def score_many(self, texts: Iterable[str]) -> List[TextScore]:
+        """Score many documents"""
+        return [self.score(text) for text in texts]
+
+
+def create_lexicon_engine() -> LexiconEngine:
+    """Create the lexicon engine, with vocabulary from TEXT_LEXICON_PATH if set"""
+    path = os.getenv("TEXT_LEXICON_PATH")
+    if not path:
+        return LexiconEngine()
+
+    with open(path) as f:
+        config = json.load(f)
+    return LexiconEngine(
+        positive=config.get("positive", DEFAULT_POSITIVE_WORDS),
+        negative=config.get("negative", DEFAULT_NEGATIVE_WORDS),
+        keywords=config.get("keywords", DEFAULT_KEYWORDS)
+    )
@@ -15,6 +15,7 @@ from models.base import Base
 from models.asset import Asset, AssetType
 from models.tenant import Tenant, PaymentHistory, SatisfactionRecord, CommunicationRecord
 from models.lease import Lease, LeaseStatus, LeaseType, RenewalOption
+from models.analytics_cache import AnalyticsCacheEntry, AnalyticsCacheGeneration
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,40 @@
+"""Covering indexes for the rent roll analytics
+
+Revision ID: 3f9c2a7d1b64
+Revises:
+Create Date: 2026-10-16 00:00:00.000000
+
+Databases created by Base.metadata.create_all() before the indexes were
+declared lack them, while newer ones already have them, so each index is
+only created when it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2a7d1b64'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+LEASE_INDEXES = {
+    # Covers the rent roll aggregates: active leases are read in tenant order from the index alone
+    "ix_leases_status_tenant_rent": [
+        "status", "tenant_id", "start_date", "end_date", "base_rent", "rent_escalation", "lease_type", "lease_area"
+    ],
+    # Narrows the same aggregates to one asset
+    "ix_leases_asset_status": ["asset_id", "status"],
+}
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("leases")}
+    for name, columns in LEASE_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "leases", columns)
+
+
+def downgrade() -> None:
+    for name in LEASE_INDEXES:
+        op.drop_index(name, table_name="leases")
@@ -0,0 +1,45 @@
+"""Analytics cache tables
+
+Revision ID: 8b41e6c05a2f
+Revises: 3f9c2a7d1b64
+Create Date: 2026-10-16 00:00:00.000000
+
+rent_roll_main.py's Base.metadata.create_all() may already have created
+the tables, so each one is only created when it is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b41e6c05a2f'
+down_revision = '3f9c2a7d1b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "analytics_cache_entries" not in tables:
+        op.create_table(
+            "analytics_cache_entries",
+            sa.Column("key", sa.String(length=255), primary_key=True),
+            sa.Column("scope", sa.String(length=64), nullable=False),
+            sa.Column("value", sa.Text(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_analytics_cache_entries_scope", "analytics_cache_entries", ["scope"])
+
+    if "analytics_cache_generations" not in tables:
+        op.create_table(
+            "analytics_cache_generations",
+            sa.Column("scope", sa.String(length=64), primary_key=True),
+            sa.Column("generation", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_cache_generations")
+    op.drop_index("ix_analytics_cache_entries_scope", table_name="analytics_cache_entries")
+    op.drop_table("analytics_cache_entries")
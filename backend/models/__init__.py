@@ -2,6 +2,7 @@ from .base import Base
 from .asset import Asset, AssetType
 from .tenant import Tenant, PaymentHistory, SatisfactionRecord, CommunicationRecord
 from .lease import Lease, LeaseStatus, LeaseType, RenewalOption
+from .analytics_cache import AnalyticsCacheEntry, AnalyticsCacheGeneration
 
 __all__ = [
     'Base',
@@ -14,5 +15,7 @@ __all__ = [
     'Lease',
     'LeaseStatus',
     'LeaseType',
-    'RenewalOption'
+    'RenewalOption',
+    'AnalyticsCacheEntry',
+    'AnalyticsCacheGeneration'
 ]
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, DateTime, Text
+
+from .base import Base
+
+
+class AnalyticsCacheEntry(Base):
+    __tablename__ = "analytics_cache_entries"
+
+    key = Column(String(255), primary_key=True)
+    scope = Column(String(64), nullable=False, index=True)  # Asset ID, or "portfolio"
+    value = Column(Text, nullable=False)  # JSON response
+    expires_at = Column(DateTime, nullable=False)
+
+
+class AnalyticsCacheGeneration(Base):
+    __tablename__ = "analytics_cache_generations"
+
+    scope = Column(String(64), primary_key=True)  # Asset ID, "portfolio", or "*" for every scope
+    generation = Column(Integer, nullable=False, default=0)
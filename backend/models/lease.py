@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
@@ -49,6 +49,16 @@ class Lease(Base):
     tenant = relationship("Tenant", back_populates="leases")
     renewal_options = relationship("RenewalOption", back_populates="lease", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Covers the rent roll aggregates: active leases are read in tenant order from the index alone
+        Index(
+            "ix_leases_status_tenant_rent",
+            "status", "tenant_id", "start_date", "end_date", "base_rent", "rent_escalation", "lease_type", "lease_area"
+        ),
+        # Narrows the same aggregates to one asset
+        Index("ix_leases_asset_status", "asset_id", "status"),
+    )
+
     def to_dict(self):
         return {
             "id": str(self.id),
@@ -10,15 +10,21 @@ from ..schemas.analytics import (
     PropertyTypeDistribution,
     LeaseExpirationTimeline,
     TenantConcentration,
-    RentRollSummary
+    RentRollSummary,
+    MonthlyRentProjection,
+    WaltSummary
 )
 from ..services.analytics_service import (
     get_property_type_distribution,
     get_lease_expiration_timeline,
     get_tenant_concentration,
-    get_rent_roll_summary
+    get_rent_roll_summary,
+    get_rent_projection,
+    get_walt
 )
+from ..services.analytics_cache import get_cached_analytics
 
+# Responses are cached until the leases, assets or tenants change, or UTC midnight
 router = APIRouter(
     prefix="/rent-roll",
     tags=["rent-roll"]
@@ -40,7 +46,10 @@ def get_summary(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid asset ID format")
     
-    return get_rent_roll_summary(db, asset_uuid)
+    return get_cached_analytics(
+        db, "summary", asset_uuid, {},
+        lambda: get_rent_roll_summary(db, asset_uuid)
+    )
 
 
 @router.get("/property-type-distribution", response_model=List[PropertyTypeDistribution])
@@ -58,7 +67,10 @@ def get_distribution_by_property_type(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid asset ID format")
     
-    return get_property_type_distribution(db, asset_uuid)
+    return get_cached_analytics(
+        db, "property-type-distribution", asset_uuid, {},
+        lambda: get_property_type_distribution(db, asset_uuid)
+    )
 
 
 @router.get("/lease-expiration-timeline", response_model=List[LeaseExpirationTimeline])
@@ -77,7 +89,10 @@ def get_lease_expirations(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid asset ID format")
     
-    return get_lease_expiration_timeline(db, asset_uuid, years_ahead)
+    return get_cached_analytics(
+        db, "lease-expiration-timeline", asset_uuid, {"years_ahead": years_ahead},
+        lambda: get_lease_expiration_timeline(db, asset_uuid, years_ahead)
+    )
 
 
 @router.get("/tenant-concentration", response_model=List[TenantConcentration])
@@ -96,4 +111,52 @@ def get_concentration_by_tenant(
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid asset ID format")
     
-    return get_tenant_concentration(db, asset_uuid, top_n)
+    return get_cached_analytics(
+        db, "tenant-concentration", asset_uuid, {"top_n": top_n},
+        lambda: get_tenant_concentration(db, asset_uuid, top_n)
+    )
+
+
+@router.get("/rent-projection", response_model=List[MonthlyRentProjection])
+def get_monthly_rent_projection(
+    asset_id: Optional[str] = None,
+    months: int = Query(60, ge=1, le=600),
+    include_renewals: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the projected rent for each month, from the current month.
+    """
+    asset_uuid = None
+    if asset_id:
+        try:
+            asset_uuid = uuid.UUID(asset_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid asset ID format")
+    
+    return get_cached_analytics(
+        db, "rent-projection", asset_uuid, {"months": months, "include_renewals": include_renewals},
+        lambda: get_rent_projection(db, asset_uuid, months, include_renewals)
+    )
+
+
+@router.get("/walt", response_model=WaltSummary)
+def get_weighted_average_lease_term(
+    asset_id: Optional[str] = None,
+    include_renewals: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the weighted average lease term remaining, overall and per asset.
+    """
+    asset_uuid = None
+    if asset_id:
+        try:
+            asset_uuid = uuid.UUID(asset_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid asset ID format")
+    
+    return get_cached_analytics(
+        db, "walt", asset_uuid, {"include_renewals": include_renewals},
+        lambda: get_walt(db, asset_uuid, include_renewals)
+    )
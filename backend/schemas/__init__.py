@@ -22,7 +22,10 @@ from .analytics import (
     PropertyTypeDistribution,
     LeaseExpirationTimeline,
     TenantConcentration,
-    RentRollSummary
+    RentRollSummary,
+    MonthlyRentProjection,
+    AssetWalt,
+    WaltSummary
 )
 
 __all__ = [
@@ -48,5 +51,8 @@ __all__ = [
     'PropertyTypeDistribution',
     'LeaseExpirationTimeline',
     'TenantConcentration',
-    'RentRollSummary'
+    'RentRollSummary',
+    'MonthlyRentProjection',
+    'AssetWalt',
+    'WaltSummary'
 ]
@@ -37,3 +37,27 @@ class RentRollSummary(BaseModel):
     occupancy_rate: float
     top_property_type: str
     top_property_type_percentage: float
+
+
+class MonthlyRentProjection(BaseModel):
+    period: str
+    year: int
+    month: int
+    rent: float
+    lease_count: int
+    timestamp: int
+
+
+class AssetWalt(BaseModel):
+    asset_id: str
+    name: str
+    walt_by_rent: float  # Years
+    walt_by_area: float  # Years
+    lease_count: int
+
+
+class WaltSummary(BaseModel):
+    walt_by_rent: float  # Years
+    walt_by_area: float  # Years
+    lease_count: int
+    assets: List[AssetWalt]
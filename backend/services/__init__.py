@@ -27,7 +27,13 @@ from .analytics_service import (
     get_property_type_distribution,
     get_lease_expiration_timeline,
     get_tenant_concentration,
-    get_rent_roll_summary
+    get_rent_roll_summary,
+    get_rent_projection,
+    get_walt
+)
+from .analytics_cache import (
+    get_cached_analytics,
+    invalidate_analytics
 )
 
 __all__ = [
@@ -53,5 +59,9 @@ __all__ = [
     'get_property_type_distribution',
     'get_lease_expiration_timeline',
     'get_tenant_concentration',
-    'get_rent_roll_summary'
+    'get_rent_roll_summary',
+    'get_rent_projection',
+    'get_walt',
+    'get_cached_analytics',
+    'invalidate_analytics'
 ]
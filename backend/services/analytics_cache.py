@@ -0,0 +1,267 @@
+"""
+Cache for the rent roll analytics endpoints.
+
+Each response is cached per (endpoint, asset, params) until the next UTC
+midnight, since lease rents and expiry windows are measured from utcnow().
+Entries are scoped to an asset, or to the whole portfolio when no asset is
+given. Lease and asset writes invalidate their asset and the portfolio;
+tenant writes invalidate everything, since tenant names appear in every
+scope.
+
+Every scope has a generation number, bumped by each invalidation. A miss
+reads the generation before computing, and the result is only stored if no
+invalidation happened in the meantime, so a computation that raced a write
+never caches what it read before the write.
+
+Two backends are provided:
+
+- DatabaseAnalyticsCache: cache tables in the application database, shared
+  by every gunicorn worker (the default). Invalidations are written in the
+  same transaction as the change that causes them; entries are stored
+  through a session of their own.
+- InMemoryAnalyticsCache: process-local stand-in for a single worker, tests
+  and local development. Invalidations apply when the change is committed.
+
+The backend is chosen with the RENT_ROLL_CACHE_BACKEND environment variable
+("database" or "memory").
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from fastapi.encoders import jsonable_encoder
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from datetime import datetime, timedelta
+import json
+import os
+import threading
+import uuid
+
+from ..models import AnalyticsCacheEntry, AnalyticsCacheGeneration
+
+PORTFOLIO_SCOPE = "portfolio"
+
+# Bumped by invalidations that touch every scope
+ALL_SCOPES = "*"
+
+
+def next_utc_midnight(now: Optional[datetime] = None) -> datetime:
+    """
+    Get the next UTC midnight after a naive UTC datetime (default: now).
+    """
+    now = now or datetime.utcnow()
+    return datetime(now.year, now.month, now.day) + timedelta(days=1)
+
+
+def cache_scope(asset_id: Optional[uuid.UUID] = None) -> str:
+    """
+    Get the cache scope of an asset, or of the whole portfolio.
+    """
+    return str(asset_id) if asset_id else PORTFOLIO_SCOPE
+
+
+def analytics_cache_key(endpoint: str, scope: str, params: Dict[str, Any]) -> str:
+    """
+    Get the cache key of an endpoint response for a scope and query parameters.
+    """
+    return f"{endpoint}:{scope}:{json.dumps(params, sort_keys=True, separators=(',', ':'))}"
+
+
+class AnalyticsCacheBackend:
+    """Interface for analytics cache backends"""
+
+    def get(self, db: Session, key: str) -> Optional[str]:
+        """Get a cached response, or None if it is missing or expired"""
+        raise NotImplementedError
+
+    def generation(self, db: Session, scope: str) -> int:
+        """Get the generation of a scope, which changes with every invalidation that covers it"""
+        raise NotImplementedError
+
+    def set(self, db: Session, key: str, scope: str, value: str, expires_at: datetime, generation: int) -> bool:
+        """Cache a response, unless its scope has been invalidated since the given generation"""
+        raise NotImplementedError
+
+    def invalidate(self, db: Session, scopes: Optional[Iterable[str]] = None) -> None:
+        """Invalidate scopes (default: every scope) when the session's changes are committed"""
+        raise NotImplementedError
+
+
+class InMemoryAnalyticsCache(AnalyticsCacheBackend):
+    """Process-local analytics cache"""
+
+    def __init__(self):
+        # key -> (scope, expires_at, value)
+        self._entries: Dict[str, Tuple[str, datetime, str]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            _, expires_at, value = entry
+            if expires_at <= datetime.utcnow():
+                del self._entries[key]
+                return None
+
+            return value
+
+    def generation(self, db: Session, scope: str) -> int:
+        with self._lock:
+            return self._generations.get(scope, 0) + self._generations.get(ALL_SCOPES, 0)
+
+    def set(self, db: Session, key: str, scope: str, value: str, expires_at: datetime, generation: int) -> bool:
+        with self._lock:
+            if self._generations.get(scope, 0) + self._generations.get(ALL_SCOPES, 0) != generation:
+                return False
+
+            self._entries[key] = (scope, expires_at, value)
+            return True
+
+    def invalidate(self, db: Session, scopes: Optional[Iterable[str]] = None) -> None:
+        scopes = None if scopes is None else set(scopes)
+
+        # Until the commit, other workers could still read (and cache) the old rows
+        event.listen(db, "after_commit", lambda session: self._invalidate(scopes), once=True)
+
+    def _invalidate(self, scopes: Optional[set]) -> None:
+        with self._lock:
+            for scope in scopes or (ALL_SCOPES,):
+                self._generations[scope] = self._generations.get(scope, 0) + 1
+
+            self._entries = {
+                key: entry for key, entry in self._entries.items()
+                if scopes is not None and entry[0] not in scopes
+            }
+
+
+class DatabaseAnalyticsCache(AnalyticsCacheBackend):
+    """Analytics cache kept in the application database"""
+
+    def get(self, db: Session, key: str) -> Optional[str]:
+        return db.query(AnalyticsCacheEntry.value).filter(
+            AnalyticsCacheEntry.key == key,
+            AnalyticsCacheEntry.expires_at > datetime.utcnow()
+        ).scalar()
+
+    def _generations(self, db: Session, scope: str, lock: bool = False) -> int:
+        query = db.query(AnalyticsCacheGeneration.generation).filter(
+            AnalyticsCacheGeneration.scope.in_((scope, ALL_SCOPES))
+        )
+
+        # A shared lock makes invalidations of the scope wait until the entry is stored (and then delete it)
+        if lock:
+            query = query.with_for_update(read=True)
+
+        return sum(generation for generation, in query)
+
+    def generation(self, db: Session, scope: str) -> int:
+        return self._generations(db, scope)
+
+    def set(self, db: Session, key: str, scope: str, value: str, expires_at: datetime, generation: int) -> bool:
+        # Written through a session of its own on the same engine, so the request's session and transaction are left alone
+        with Session(bind=db.get_bind()) as cache_db:
+            try:
+                if self._generations(cache_db, scope, lock=True) != generation:
+                    cache_db.rollback()
+                    return False
+
+                # Drop expired entries while we are writing anyway
+                cache_db.query(AnalyticsCacheEntry).filter(
+                    AnalyticsCacheEntry.expires_at <= datetime.utcnow()
+                ).delete(synchronize_session=False)
+                cache_db.merge(AnalyticsCacheEntry(key=key, scope=scope, value=value, expires_at=expires_at))
+                cache_db.commit()
+                return True
+            except SQLAlchemyError:
+                # E.g. another worker stored the same entry first; caching is best effort
+                cache_db.rollback()
+                return False
+
+    def invalidate(self, db: Session, scopes: Optional[Iterable[str]] = None) -> None:
+        scopes = None if scopes is None else sorted(set(scopes))
+
+        # Scopes are bumped in sorted order, so concurrent writes can't deadlock on them
+        for scope in scopes or (ALL_SCOPES,):
+            bumped = db.query(AnalyticsCacheGeneration).filter(AnalyticsCacheGeneration.scope == scope).update(
+                {AnalyticsCacheGeneration.generation: AnalyticsCacheGeneration.generation + 1},
+                synchronize_session=False
+            )
+
+            if not bumped:
+                try:
+                    with db.begin_nested():
+                        db.add(AnalyticsCacheGeneration(scope=scope, generation=1))
+                except IntegrityError:
+                    # Another worker created it first
+                    db.query(AnalyticsCacheGeneration).filter(AnalyticsCacheGeneration.scope == scope).update(
+                        {AnalyticsCacheGeneration.generation: AnalyticsCacheGeneration.generation + 1},
+                        synchronize_session=False
+                    )
+
+        entries = db.query(AnalyticsCacheEntry)
+        if scopes is not None:
+            entries = entries.filter(AnalyticsCacheEntry.scope.in_(scopes))
+        entries.delete(synchronize_session=False)
+
+
+def create_analytics_cache() -> AnalyticsCacheBackend:
+    """
+    Create the analytics cache backend configured by the environment.
+    """
+    backend = os.getenv("RENT_ROLL_CACHE_BACKEND", "database").lower()
+
+    if backend == "database":
+        return DatabaseAnalyticsCache()
+    if backend == "memory":
+        return InMemoryAnalyticsCache()
+
+    raise ValueError(f"Unknown rent roll cache backend: {backend}")
+
+
+analytics_cache = create_analytics_cache()
+
+
+def get_cached_analytics(
+    db: Session,
+    endpoint: str,
+    asset_id: Optional[uuid.UUID],
+    params: Dict[str, Any],
+    compute: Callable[[], Any]
+) -> Any:
+    """
+    Get the cached response of an analytics endpoint, computing and caching it on a miss.
+
+    Cached responses come back as their JSON data, for the route's response
+    model to validate.
+    """
+    scope = cache_scope(asset_id)
+    key = analytics_cache_key(endpoint, scope, params)
+
+    cached = analytics_cache.get(db, key)
+    if cached is not None:
+        return json.loads(cached)
+
+    # Read before computing, so an invalidation during the computation is noticed
+    expires_at = next_utc_midnight()
+    generation = analytics_cache.generation(db, scope)
+
+    result = compute()
+    analytics_cache.set(db, key, scope, json.dumps(jsonable_encoder(result)), expires_at, generation)
+
+    return result
+
+
+def invalidate_analytics(db: Session, asset_id: Optional[uuid.UUID] = None) -> None:
+    """
+    Invalidate the cached analytics of an asset and the portfolio (default: everything).
+
+    Call before committing the change, so the invalidation goes with it.
+    """
+    if asset_id:
+        analytics_cache.invalidate(db, (cache_scope(asset_id), PORTFOLIO_SCOPE))
+    else:
+        analytics_cache.invalidate(db)
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, or_, case, literal
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import numpy as np
 import uuid
 from collections import defaultdict
 
@@ -10,9 +11,13 @@ from ..schemas.analytics import (
     PropertyTypeDistribution,
     LeaseExpirationTimeline,
     TenantConcentration,
-    RentRollSummary
+    RentRollSummary,
+    MonthlyRentProjection,
+    AssetWalt,
+    WaltSummary
 )
-from .lease_service import calculate_rent_for_date
+from .lease_service import rent_for_date_expression
+from .lease_schedule import load_lease_schedule, month_starts
 
 
 def get_property_type_distribution(
@@ -21,37 +26,40 @@ def get_property_type_distribution(
 ) -> List[PropertyTypeDistribution]:
     """
     Get the distribution of rent by property type.
+
+    Rent is escalated and summed per lease type in the database, in one
+    GROUP BY query over the active leases.
     """
-    # Get all active leases
-    query = db.query(Lease).filter(Lease.status == LeaseStatus.ACTIVE)
+    now = datetime.utcnow()
+    rent = rent_for_date_expression(now)
+
+    query = db.query(
+        Lease.lease_type,
+        func.coalesce(func.sum(rent), 0.0),
+        func.count(Lease.id)
+    ).filter(Lease.status == LeaseStatus.ACTIVE)
     
     if asset_id:
         query = query.filter(Lease.asset_id == asset_id)
     
-    leases = query.all()
-    
-    # Calculate total rent
-    now = datetime.utcnow()
-    total_rent = sum(calculate_rent_for_date(lease, now) for lease in leases)
+    totals = {lease_type: (type_rent, count) for lease_type, type_rent, count in query.group_by(Lease.lease_type)}
+    total_rent = sum(type_rent for type_rent, _ in totals.values())
     
-    # Group by property type
-    property_types = {}
+    # Types in enum order, so ties keep the same order after sorting
+    result = []
     
     for lease_type in LeaseType:
-        type_leases = [lease for lease in leases if lease.lease_type == lease_type]
-        type_rent = sum(calculate_rent_for_date(lease, now) for lease in type_leases)
-        percentage = (type_rent / total_rent * 100) if total_rent > 0 else 0
+        type_rent, count = totals.get(lease_type, (0, 0))
         
         if type_rent > 0:
-            property_types[lease_type.value] = {
-                "name": lease_type.value,
-                "value": type_rent,
-                "percentage": percentage,
-                "count": len(type_leases)
-            }
-    
-    # Convert to list and sort by rent (descending)
-    result = [PropertyTypeDistribution(**data) for data in property_types.values()]
+            result.append(PropertyTypeDistribution(
+                name=lease_type.value,
+                value=type_rent,
+                percentage=type_rent / total_rent * 100,
+                count=count
+            ))
+    
+    # Sort by rent (descending)
     result.sort(key=lambda x: x.value, reverse=True)
     
     return result
@@ -118,60 +126,61 @@ def get_tenant_concentration(
 ) -> List[TenantConcentration]:
     """
     Get the concentration of rent by tenant.
+
+    One query: escalated rent is summed per tenant, ranked with a window
+    function, and every tenant past the top N is folded into an "Others" row
+    before tenant names are joined in.
     """
-    # Get all active leases
-    query = db.query(Lease).filter(Lease.status == LeaseStatus.ACTIVE)
-    
-    if asset_id:
-        query = query.filter(Lease.asset_id == asset_id)
-    
-    leases = query.all()
-    
-    # Calculate total rent
     now = datetime.utcnow()
-    total_rent = sum(calculate_rent_for_date(lease, now) for lease in leases)
     
-    # Group by tenant
-    tenants = {}
+    # Rent per tenant across its active leases
+    tenant_rent = db.query(
+        Lease.tenant_id.label("tenant_id"),
+        func.sum(rent_for_date_expression(now)).label("rent")
+    ).filter(Lease.status == LeaseStatus.ACTIVE)
     
-    for lease in leases:
-        tenant_id = str(lease.tenant_id)
-        tenant_name = lease.tenant.name if lease.tenant else "Unknown"
-        
-        if tenant_id not in tenants:
-            tenants[tenant_id] = {
-                "id": tenant_id,
-                "name": tenant_name,
-                "rent": 0,
-                "percentage": 0
-            }
-        
-        tenants[tenant_id]["rent"] += calculate_rent_for_date(lease, now)
-    
-    # Calculate percentages
-    for tenant_id, data in tenants.items():
-        data["percentage"] = (data["rent"] / total_rent * 100) if total_rent > 0 else 0
+    if asset_id:
+        tenant_rent = tenant_rent.filter(Lease.asset_id == asset_id)
+    
+    tenant_rent = tenant_rent.group_by(Lease.tenant_id).subquery()
+    
+    # Rank tenants by rent (descending), with the portfolio total on every row
+    ranked = db.query(
+        tenant_rent.c.tenant_id,
+        tenant_rent.c.rent,
+        func.row_number().over(order_by=(tenant_rent.c.rent.desc(), tenant_rent.c.tenant_id)).label("position"),
+        func.sum(tenant_rent.c.rent).over().label("total_rent")
+    ).subquery()
+    
+    # Tenants past the top N share one bucket with no tenant ID
+    in_top = ranked.c.position <= top_n
+    bucketed = db.query(
+        case((in_top, ranked.c.tenant_id)).label("tenant_id"),
+        case((in_top, ranked.c.position), else_=top_n + 1).label("position"),
+        ranked.c.rent,
+        ranked.c.total_rent
+    ).subquery()
+    
+    folded = db.query(
+        bucketed.c.tenant_id,
+        bucketed.c.position,
+        func.sum(bucketed.c.rent).label("rent"),
+        func.max(bucketed.c.total_rent).label("total_rent")
+    ).group_by(bucketed.c.tenant_id, bucketed.c.position).subquery()
+    
+    rows = db.query(folded.c.tenant_id, Tenant.name, folded.c.rent, folded.c.total_rent).outerjoin(
+        Tenant, Tenant.id == folded.c.tenant_id
+    ).order_by(folded.c.position).all()
     
-    # Convert to list and sort by rent (descending)
-    result = [TenantConcentration(**data) for data in tenants.values()]
-    result.sort(key=lambda x: x.rent, reverse=True)
+    result = []
     
-    # Take top N tenants and group the rest as "Others"
-    if len(result) > top_n:
-        top_tenants = result[:top_n]
-        other_tenants = result[top_n:]
-        
-        other_rent = sum(tenant.rent for tenant in other_tenants)
-        other_percentage = sum(tenant.percentage for tenant in other_tenants)
-        
-        top_tenants.append(TenantConcentration(
-            id="others",
-            name="Others",
-            rent=other_rent,
-            percentage=other_percentage
-        ))
+    for tenant_id, tenant_name, rent, total_rent in rows:
+        percentage = (rent / total_rent * 100) if total_rent > 0 else 0
         
-        return top_tenants
+        if tenant_id is None:
+            result.append(TenantConcentration(id="others", name="Others", rent=rent, percentage=percentage))
+        else:
+            result.append(TenantConcentration(id=str(tenant_id), name=tenant_name or "Unknown", rent=rent, percentage=percentage))
     
     return result
 
@@ -182,30 +191,69 @@ def get_rent_roll_summary(
 ) -> RentRollSummary:
     """
     Get a summary of the rent roll data.
+
+    One query: the active leases are read once into a CTE, from which the
+    rent, area and expiry totals and the top property type are aggregated.
     """
-    # Get all leases
-    query = db.query(Lease)
-    
-    if asset_id:
-        query = query.filter(Lease.asset_id == asset_id)
-        
-        # Get the asset for occupancy calculation
-        asset = db.query(Asset).filter(Asset.id == asset_id).first()
-        total_area = asset.total_area if asset else 0
-    else:
-        # Get total area of all assets
-        total_area = db.query(func.sum(Asset.total_area)).scalar() or 0
-    
-    leases = query.all()
-    active_leases = [lease for lease in leases if lease.status == LeaseStatus.ACTIVE]
-    
-    # Calculate metrics
     now = datetime.utcnow()
     ninety_days = now + timedelta(days=90)
     one_year = now + timedelta(days=365)
     
-    total_monthly_rent = sum(calculate_rent_for_date(lease, now) for lease in active_leases)
-    total_leased_area = sum(lease.lease_area for lease in active_leases)
+    # Active leases with their rent today, read once
+    active_leases = db.query(
+        Lease.lease_type,
+        Lease.lease_area,
+        Lease.end_date,
+        rent_for_date_expression(now).label("rent")
+    ).filter(Lease.status == LeaseStatus.ACTIVE)
+    
+    if asset_id:
+        active_leases = active_leases.filter(Lease.asset_id == asset_id)
+    
+    active_leases = active_leases.cte("active_leases")
+    
+    totals = db.query(
+        func.coalesce(func.sum(active_leases.c.rent), 0.0).label("total_monthly_rent"),
+        func.coalesce(func.sum(active_leases.c.lease_area), 0.0).label("total_leased_area"),
+        func.count().label("active_leases_count"),
+        func.coalesce(func.sum(case((active_leases.c.end_date <= ninety_days, 1), else_=0)), 0).label("expiring_within_90_days"),
+        func.coalesce(func.sum(case((active_leases.c.end_date <= one_year, 1), else_=0)), 0).label("expiring_within_year")
+    ).cte("totals")
+    
+    # Property type with the most rent; ties go to the first type in enum order
+    rent_by_type = db.query(
+        active_leases.c.lease_type,
+        func.sum(active_leases.c.rent).label("rent")
+    ).group_by(active_leases.c.lease_type).cte("rent_by_type")
+    
+    top_type = db.query(rent_by_type.c.lease_type, rent_by_type.c.rent).filter(rent_by_type.c.rent > 0).order_by(
+        rent_by_type.c.rent.desc(),
+        case(*((rent_by_type.c.lease_type == lease_type, order) for order, lease_type in enumerate(LeaseType)))
+    ).limit(1).subquery()
+    
+    # Occupancy is measured against one asset, or every asset
+    if asset_id:
+        total_area = db.query(Asset.total_area).filter(Asset.id == asset_id).scalar_subquery()
+    else:
+        total_area = db.query(func.sum(Asset.total_area)).scalar_subquery()
+    
+    row = db.query(
+        totals,
+        top_type.c.lease_type,
+        top_type.c.rent,
+        func.coalesce(total_area, 0.0)
+    ).outerjoin(top_type, literal(True)).one()
+    
+    (
+        total_monthly_rent,
+        total_leased_area,
+        active_leases_count,
+        expiring_within_90_days,
+        expiring_within_year,
+        top_lease_type,
+        top_type_rent,
+        total_area
+    ) = row
     
     # Calculate average rent per sqft (annual)
     average_rent_per_sqft = (total_monthly_rent * 12 / total_leased_area) if total_leased_area > 0 else 0
@@ -213,23 +261,105 @@ def get_rent_roll_summary(
     # Calculate occupancy rate
     occupancy_rate = (total_leased_area / total_area * 100) if total_area > 0 else 0
     
-    # Count leases expiring soon
-    expiring_within_90_days = sum(1 for lease in active_leases if lease.end_date <= ninety_days)
-    expiring_within_year = sum(1 for lease in active_leases if lease.end_date <= one_year)
-    
-    # Get top property type
-    property_types = get_property_type_distribution(db, asset_id)
-    top_property_type = property_types[0].name if property_types else "N/A"
-    top_property_type_percentage = property_types[0].percentage if property_types else 0
-    
     return RentRollSummary(
         total_monthly_rent=total_monthly_rent,
         total_leased_area=total_leased_area,
         average_rent_per_sqft=average_rent_per_sqft,
-        active_leases_count=len(active_leases),
+        active_leases_count=active_leases_count,
         expiring_within_90_days=expiring_within_90_days,
         expiring_within_year=expiring_within_year,
         occupancy_rate=occupancy_rate,
-        top_property_type=top_property_type,
-        top_property_type_percentage=top_property_type_percentage
+        top_property_type=top_lease_type.value if top_lease_type else "N/A",
+        top_property_type_percentage=(top_type_rent / total_monthly_rent * 100) if top_lease_type else 0
+    )
+
+
+def get_rent_projection(
+    db: Session, 
+    asset_id: Optional[uuid.UUID] = None,
+    months: int = 60,
+    include_renewals: bool = False
+) -> List[MonthlyRentProjection]:
+    """
+    Get the projected rent for each month, from the current month.
+
+    Every lease's rent in every month comes from one (leases x months) rent
+    matrix, with escalations and optionally renewal options.
+    """
+    schedule = load_lease_schedule(db, asset_id, include_renewals)
+    dates = month_starts(datetime.utcnow(), months)
+    rents = schedule.rent_matrix(dates)
+    
+    result = []
+    
+    for date, rent, lease_count in zip(dates.tolist(), rents.sum(axis=0).tolist(), (rents > 0).sum(axis=0).tolist()):
+        result.append(MonthlyRentProjection(
+            period=f"{date.year}-{date.month:02d}",
+            year=date.year,
+            month=date.month,
+            rent=rent,
+            lease_count=lease_count,
+            timestamp=int(date.replace(tzinfo=timezone.utc).timestamp())
+        ))
+    
+    return result
+
+
+def _weighted_averages(values: np.ndarray, weights: np.ndarray, groups: np.ndarray, count: int) -> np.ndarray:
+    """
+    Weighted average of values per group, 0 for groups without weight.
+    """
+    totals = np.bincount(groups, weights=weights, minlength=count)
+    weighted = np.bincount(groups, weights=values * weights, minlength=count)
+    return np.divide(weighted, totals, out=np.zeros(count), where=totals > 0)
+
+
+def get_walt(
+    db: Session, 
+    asset_id: Optional[uuid.UUID] = None,
+    include_renewals: bool = False
+) -> WaltSummary:
+    """
+    Get the weighted average lease term (WALT) remaining, overall and per asset.
+
+    Leases in force today are weighted by their current rent and by their
+    area; the term runs to the end of the last renewal when renewals are
+    included.
+    """
+    now = datetime.utcnow()
+    schedule = load_lease_schedule(db, asset_id, include_renewals)
+    
+    rents = schedule.rents_on(now)
+    in_force = rents > 0
+    remaining = schedule.remaining_years(now)[in_force]
+    rents = rents[in_force]
+    areas = schedule.lease_areas[in_force]
+    
+    # Per asset, in order of asset ID
+    asset_ids, groups = np.unique(schedule.asset_ids[in_force].astype(str), return_inverse=True)
+    names = dict(db.query(Asset.id, Asset.name).filter(Asset.id.in_([uuid.UUID(asset) for asset in asset_ids])).all())
+    
+    assets = []
+    
+    for asset, walt_by_rent, walt_by_area, lease_count in zip(
+        asset_ids.tolist(),
+        _weighted_averages(remaining, rents, groups, len(asset_ids)).tolist(),
+        _weighted_averages(remaining, areas, groups, len(asset_ids)).tolist(),
+        np.bincount(groups, minlength=len(asset_ids)).tolist()
+    ):
+        assets.append(AssetWalt(
+            asset_id=asset,
+            name=names.get(uuid.UUID(asset), "Unknown"),
+            walt_by_rent=walt_by_rent,
+            walt_by_area=walt_by_area,
+            lease_count=lease_count
+        ))
+    
+    portfolio = np.zeros(len(remaining), dtype=np.int64)
+    
+    return WaltSummary(
+        walt_by_rent=float(_weighted_averages(remaining, rents, portfolio, 1)[0]),
+        walt_by_area=float(_weighted_averages(remaining, areas, portfolio, 1)[0]),
+        lease_count=int(in_force.sum()),
+        assets=assets
     )
@@ -4,6 +4,7 @@ import uuid
 
 from ..models import Asset
 from ..schemas.asset import AssetCreate, AssetUpdate
+from .analytics_cache import invalidate_analytics
 
 
 def get_all_assets(
@@ -61,6 +62,9 @@ def create_asset(db: Session, asset: AssetCreate) -> Asset:
     )
     
     db.add(db_asset)
+    db.flush()  # Flush to get the ID
+    
+    invalidate_analytics(db, db_asset.id)
     db.commit()
     db.refresh(db_asset)
     
@@ -75,6 +79,7 @@ def update_asset(db: Session, db_asset: Asset, asset: AssetUpdate) -> Asset:
     for key, value in asset.dict(exclude_unset=True).items():
         setattr(db_asset, key, value)
     
+    invalidate_analytics(db, db_asset.id)
     db.commit()
     db.refresh(db_asset)
     
@@ -85,5 +90,6 @@ def delete_asset(db: Session, db_asset: Asset) -> None:
     """
     Delete an asset.
     """
+    invalidate_analytics(db, db_asset.id)
     db.delete(db_asset)
     db.commit()
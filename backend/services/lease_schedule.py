@@ -0,0 +1,223 @@
+"""
+Vectorized lease rent schedules.
+
+A LeaseSchedule holds lease terms as NumPy arrays and evaluates the rent of
+every lease in every month of a horizon in one pass, as a (leases x months)
+matrix, instead of calling calculate_rent_for_date per lease and month.
+
+Rent follows calculate_rent_for_date: a lease pays its base rent escalated
+once per whole year since its start month, and nothing outside its term.
+Rent is due on the first of each month, so a month's rent is the rent on
+its first day.
+
+Each lease is split into segments: its own term, then optionally one
+segment per renewal option, in the order the options were added. A renewal
+runs for the option's term after the previous segment ends, starting at
+the rent at that end plus the option's rent increase, and escalates yearly
+at the lease's rate from its own start.
+"""
+
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime
+import numpy as np
+import uuid
+
+from ..models import Lease, LeaseStatus, RenewalOption
+
+ONE_DAY = np.timedelta64(1, "D")
+ONE_MICROSECOND = np.timedelta64(1, "us")
+DAYS_PER_YEAR = 365.25
+
+
+def as_datetimes(dates) -> np.ndarray:
+    """
+    Convert naive UTC datetimes to a datetime64[us] array.
+    """
+    return np.asarray(dates, dtype="datetime64[us]")
+
+
+def month_numbers(dates: np.ndarray) -> np.ndarray:
+    """
+    Get the number of each date's month since the epoch (year * 12 + month, shifted).
+    """
+    return dates.astype("datetime64[M]").astype(np.int64)
+
+
+def month_starts(start: datetime, months: int) -> np.ndarray:
+    """
+    Get the first day of each month of a horizon, from the month of a start date.
+    """
+    first = np.datetime64(start, "M")
+    return (first + np.arange(months)).astype("datetime64[us]")
+
+
+def add_months(dates: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """
+    Add whole months to dates, clamping the day to the end of shorter months.
+    """
+    month = dates.astype("datetime64[M]")
+    offset = dates - month.astype("datetime64[us]")
+    days = offset // ONE_DAY
+    time_of_day = offset - days * ONE_DAY
+
+    target = month + months.astype(np.int64)
+    days_in_target = ((target + 1).astype("datetime64[D]") - target.astype("datetime64[D]")) // ONE_DAY
+    return target.astype("datetime64[us]") + np.minimum(days, days_in_target - 1) * ONE_DAY + time_of_day
+
+
+class LeaseSchedule:
+    """Lease terms and renewal segments as arrays"""
+
+    def __init__(
+        self,
+        lease_ids: np.ndarray,
+        asset_ids: np.ndarray,
+        start_dates: np.ndarray,
+        end_dates: np.ndarray,
+        base_rents: np.ndarray,
+        escalations: np.ndarray,
+        lease_areas: np.ndarray
+    ):
+        self.lease_ids = lease_ids
+        self.asset_ids = asset_ids
+        self.start_dates = as_datetimes(start_dates)
+        self.end_dates = as_datetimes(end_dates)
+        self.lease_areas = np.asarray(lease_areas, dtype=float)
+
+        # One segment per lease term to start with; renewals are appended
+        self.segment_leases = np.arange(len(lease_ids))
+        self.segment_starts = self.start_dates
+        self.segment_ends = self.end_dates
+        self.segment_rents = np.asarray(base_rents, dtype=float)
+        self.segment_escalations = np.asarray(escalations, dtype=float) / 100
+
+        # End of each lease's last segment
+        self.final_end_dates = self.end_dates
+
+    def __len__(self) -> int:
+        return len(self.lease_ids)
+
+    def add_renewals(self, leases: np.ndarray, terms: np.ndarray, rent_increases: np.ndarray) -> None:
+        """
+        Extend leases by one renewal each (at most one per lease per call).
+        """
+        previous_ends = self.final_end_dates[leases]
+        previous_rents = self._segment_rent_at(self._last_segments(leases), previous_ends)
+
+        starts = previous_ends + ONE_MICROSECOND
+        ends = add_months(previous_ends, terms)
+
+        self.segment_leases = np.concatenate([self.segment_leases, leases])
+        self.segment_starts = np.concatenate([self.segment_starts, starts])
+        self.segment_ends = np.concatenate([self.segment_ends, ends])
+        self.segment_rents = np.concatenate([self.segment_rents, previous_rents * (1 + rent_increases / 100)])
+        self.segment_escalations = np.concatenate([self.segment_escalations, self.segment_escalations[leases]])
+
+        self.final_end_dates = self.final_end_dates.copy()
+        self.final_end_dates[leases] = ends
+
+    def _last_segments(self, leases: np.ndarray) -> np.ndarray:
+        """Index of each lease's latest segment"""
+        last = np.zeros(len(self), dtype=np.int64)
+        np.maximum.at(last, self.segment_leases, np.arange(len(self.segment_leases)))
+        return last[leases]
+
+    def _segment_rent_at(self, segments: np.ndarray, dates: np.ndarray) -> np.ndarray:
+        """Escalated rent of segments on dates, ignoring whether the segment is in force"""
+        years = (month_numbers(dates) - month_numbers(self.segment_starts[segments])) // 12
+        return self.segment_rents[segments] * (1 + self.segment_escalations[segments]) ** years
+
+    def rent_matrix(self, dates: np.ndarray) -> np.ndarray:
+        """
+        Get the rent of every lease on every date, as a (leases x dates) matrix.
+        """
+        dates = as_datetimes(dates)
+        starts = self.segment_starts[:, None]
+        ends = self.segment_ends[:, None]
+
+        # Whole years since each segment's start month, for every segment and date
+        years = (month_numbers(dates)[None, :] - month_numbers(starts)) // 12
+        rents = self.segment_rents[:, None] * (1 + self.segment_escalations[:, None]) ** years
+        rents = np.where((starts <= dates[None, :]) & (dates[None, :] <= ends), rents, 0.0)
+
+        if len(self.segment_leases) == len(self):
+            return rents
+
+        # A lease's segments don't overlap, so its rent is the sum over its segments
+        matrix = np.zeros((len(self), len(dates)))
+        np.add.at(matrix, self.segment_leases, rents)
+        return matrix
+
+    def rents_on(self, date: datetime) -> np.ndarray:
+        """
+        Get the rent of every lease on a date.
+        """
+        return self.rent_matrix(as_datetimes([date]))[:, 0]
+
+    def remaining_years(self, date: datetime) -> np.ndarray:
+        """
+        Get each lease's remaining term in years from a date, through its last renewal.
+        """
+        remaining = (self.final_end_dates - np.datetime64(date, "us")) / np.timedelta64(1, "D")
+        return np.maximum(remaining, 0) / DAYS_PER_YEAR
+
+
+def load_lease_schedule(
+    db: Session,
+    asset_id: Optional[uuid.UUID] = None,
+    include_renewals: bool = False
+) -> LeaseSchedule:
+    """
+    Load the active and upcoming leases into a schedule, optionally with their renewal options.
+    """
+    query = db.query(
+        Lease.id,
+        Lease.asset_id,
+        Lease.start_date,
+        Lease.end_date,
+        Lease.base_rent,
+        Lease.rent_escalation,
+        Lease.lease_area
+    ).filter(Lease.status.in_((LeaseStatus.ACTIVE, LeaseStatus.UPCOMING)))
+
+    if asset_id:
+        query = query.filter(Lease.asset_id == asset_id)
+
+    rows = query.all()
+    columns = list(zip(*rows)) or [[]] * 7
+    schedule = LeaseSchedule(
+        lease_ids=np.array(columns[0], dtype=object),
+        asset_ids=np.array(columns[1], dtype=object),
+        start_dates=columns[2],
+        end_dates=columns[3],
+        base_rents=columns[4],
+        escalations=columns[5],
+        lease_areas=columns[6]
+    )
+
+    if include_renewals and rows:
+        options = db.query(RenewalOption.lease_id, RenewalOption.term, RenewalOption.rent_increase).join(
+            Lease, Lease.id == RenewalOption.lease_id
+        ).filter(Lease.status.in_((LeaseStatus.ACTIVE, LeaseStatus.UPCOMING)))
+
+        if asset_id:
+            options = options.filter(Lease.asset_id == asset_id)
+
+        options = options.order_by(RenewalOption.lease_id, RenewalOption.created_at, RenewalOption.id).all()
+
+        if options:
+            index = {lease_id: i for i, lease_id in enumerate(columns[0])}
+            leases = np.array([index[lease_id] for lease_id, _, _ in options])
+            terms = np.array([term for _, term, _ in options])
+            rent_increases = np.array([rent_increase for _, _, rent_increase in options], dtype=float)
+
+            # Position of each option among its lease's options (options are grouped by lease)
+            group_starts = np.flatnonzero(np.r_[True, leases[1:] != leases[:-1]])
+            order = np.arange(len(leases)) - np.repeat(group_starts, np.diff(np.r_[group_starts, len(leases)]))
+
+            for k in range(order.max() + 1):
+                selected = order == k
+                schedule.add_renewals(leases[selected], terms[selected], rent_increases[selected])
+
+    return schedule
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, case, extract, func
 from typing import List, Optional
 from datetime import datetime
 import uuid
 
 from ..models import Lease, LeaseStatus, RenewalOption
 from ..schemas.lease import LeaseCreate, LeaseUpdate, RenewalOptionCreate
+from .analytics_cache import invalidate_analytics
 
 
 def get_all_leases(
@@ -87,6 +89,7 @@ def create_lease(db: Session, lease: LeaseCreate) -> Lease:
             )
             db.add(db_option)
     
+    invalidate_analytics(db, db_lease.asset_id)
     db.commit()
     db.refresh(db_lease)
     
@@ -143,6 +146,7 @@ def update_lease(db: Session, db_lease: Lease, lease: LeaseUpdate) -> Lease:
             )
             db.add(db_option)
     
+    invalidate_analytics(db, db_lease.asset_id)
     db.commit()
     db.refresh(db_lease)
     
@@ -153,6 +157,7 @@ def delete_lease(db: Session, db_lease: Lease) -> None:
     """
     Delete a lease.
     """
+    invalidate_analytics(db, db_lease.asset_id)
     db.delete(db_lease)
     db.commit()
 
@@ -194,3 +199,26 @@ def calculate_rent_for_date(lease: Lease, date: datetime) -> float:
     rent = lease.base_rent * (1 + lease.rent_escalation / 100) ** int(years_since_start)
     
     return rent
+
+
+def rent_for_date_expression(date: datetime):
+    """
+    SQL expression for the rent of each lease on a specific date.
+
+    The set-based form of calculate_rent_for_date, for aggregating rent in the
+    database: base_rent * power(1 + rent_escalation / 100, floor(years)),
+    and 0 outside the lease term. Whole years come from whole months since
+    the start month, as in calculate_rent_for_date.
+    """
+    months_since_start = (date.year * 12 + date.month) - (
+        extract("year", Lease.start_date) * 12 + extract("month", Lease.start_date)
+    )
+    years_since_start = func.floor(months_since_start / 12.0)
+
+    return case(
+        (
+            and_(Lease.start_date <= date, Lease.end_date >= date),
+            Lease.base_rent * func.power(1 + Lease.rent_escalation / 100.0, years_since_start)
+        ),
+        else_=0.0
+    )
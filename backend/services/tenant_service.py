@@ -10,6 +10,7 @@ from ..schemas.tenant import (
     SatisfactionRecordCreate,
     CommunicationRecordCreate
 )
+from .analytics_cache import invalidate_analytics
 
 
 def get_all_tenants(
@@ -73,6 +74,7 @@ def create_tenant(db: Session, tenant: TenantCreate) -> Tenant:
     )
     
     db.add(db_tenant)
+    invalidate_analytics(db)
     db.commit()
     db.refresh(db_tenant)
     
@@ -87,6 +89,7 @@ def update_tenant(db: Session, db_tenant: Tenant, tenant: TenantUpdate) -> Tenan
     for key, value in tenant.dict(exclude_unset=True).items():
         setattr(db_tenant, key, value)
     
+    invalidate_analytics(db)
     db.commit()
     db.refresh(db_tenant)
     
@@ -97,6 +100,7 @@ def delete_tenant(db: Session, db_tenant: Tenant) -> None:
     """
     Delete a tenant.
     """
+    invalidate_analytics(db)
     db.delete(db_tenant)
     db.commit()
 
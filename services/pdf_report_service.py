@@ -9,6 +9,7 @@ from weasyprint import HTML, CSS
 from models.deal import Deal
 from models.lease_analysis import LeaseAnalysis
 from models.chat import ChatMessage
+from app.underwriting import underwrite_guarded
 
 # Create reports directory if it doesn't exist
 REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
@@ -75,20 +76,20 @@ def generate_report(db: Session, deal_id: str, user_id: str) -> Dict[str, str]:
     if deal.user_id != user_id:
         raise ValueError("Not authorized to access this deal")
     
-    # Calculate financial metrics
-    project_cost = deal.acquisition_price + deal.construction_cost
-    
-    # Calculate NOI
-    gpi = deal.square_footage * deal.projected_rent_per_sf
-    egi = gpi * (1 - deal.vacancy_rate / 100)
-    op_ex = deal.square_footage * deal.operating_expenses_per_sf
-    noi = egi - op_ex
-    
-    # Calculate exit value
-    exit_value = noi / (deal.exit_cap_rate / 100) if deal.exit_cap_rate else 0
-    
-    # Calculate development margin
-    development_margin = ((exit_value - project_cost) / project_cost) * 100 if project_cost > 0 else 0
+    # Calculate financial metrics; exit value and margin are reported as 0 when they can't be computed
+    metrics = underwrite_guarded(
+        deal.acquisition_price,
+        deal.construction_cost,
+        deal.square_footage,
+        deal.projected_rent_per_sf,
+        deal.vacancy_rate,
+        deal.operating_expenses_per_sf,
+        deal.exit_cap_rate
+    )
+    project_cost = metrics.project_cost
+    noi = metrics.net_operating_income
+    exit_value = metrics.estimated_exit_value or 0
+    development_margin = metrics.development_margin or 0
     
     # Get lease analysis
     lease_analysis = db.query(LeaseAnalysis).filter(LeaseAnalysis.deal_id == deal_id).first()
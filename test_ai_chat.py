@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.chat_intents import IntentRouter
+from app.chat_sessions import ChatSessionStore, merge_context
+from app.underwriting import underwrite
+
+client = TestClient(server.app)
+
+CONTEXT = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10000000,
+    "construction_cost": 5000000,
+    "square_footage": 50000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 5,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 6,
+}
+
+
+def chat(message, context=CONTEXT):
+    response = client.post("/api/ai-chat/v2", json={"messages": [{"role": "user", "content": message}], "context": context})
+    assert response.status_code == 200
+    return response.json()["reply"]
+
+
+def test_router_resolves_highest_priority_intent():
+    router = IntentRouter([("irr", ["irr", "return"]), ("risk", ["risk"]), ("exit", ["exit", "sale"])], default="other")
+
+    # Keywords match inside words, like a substring test
+    assert router.classify("Is this RISKY?") == "risk"
+    assert router.classify("What are the returns?") == "irr"
+    assert router.classify("wholesale") == "exit"
+    # Priority follows the rule order, not the position in the message
+    assert router.classify("exit risk and return") == "irr"
+    assert router.classify("hello") == "other"
+
+
+def test_chat_routes_each_topic():
+    assert "I estimate the IRR to be approximately" in chat("What's the yield?")
+    assert chat("Is this deal risky?").startswith("Here's my risk assessment for Harbor Point")
+    assert chat("Give me an overview").startswith("## Harbor Point Summary")
+    assert "Net Operating Income (NOI) for the Harbor Point is $1,400,000.00" in chat("What is the NOI?")
+    assert "exit cap rate for the Harbor Point is 6%" in chat("What about the cap rate?")
+
+
+def test_chat_metrics_are_memoized_per_context():
+    server._calculate_chat_metrics.cache_clear()
+    context = dict(CONTEXT, acquisition_price=12000000)
+
+    first = chat("What is the development margin?", context)
+    assert chat("How about the profit margin?", context)
+    # Each reply looks the metrics up in the route and again in the metric answer
+    info = server._calculate_chat_metrics.cache_info()
+    assert (info.hits, info.misses) == (3, 1)
+
+    # Fields the metrics don't depend on share the cached entry; a changed input does not
+    assert chat("What is the development margin?", dict(context, project_name="Other")) == first.replace("Harbor Point", "Other")
+    chat("What is the margin?", dict(context, exit_cap_rate=7))
+    assert server._calculate_chat_metrics.cache_info().misses == 2
+
+
+def test_chat_metrics_come_from_underwriting_core():
+    values = tuple(float(CONTEXT[field]) for field in server.CHAT_METRIC_FIELDS)
+    metrics = server._calculate_chat_metrics.__wrapped__(*values)
+    assert tuple(metrics[:7]) == tuple(underwrite(*values))
+
+    no_cap = server._calculate_chat_metrics.__wrapped__(*values[:6], 0.0)
+    assert (no_cap.estimated_exit_value, no_cap.development_margin) == (0, 0)
+
+
+@pytest.fixture
+def sessions(tmp_path, monkeypatch):
+    store = ChatSessionStore(max_entries=2, ttl_seconds=60, session_dir=str(tmp_path))
+    monkeypatch.setattr(server, "chat_sessions", store)
+    return store
+
+
+def test_session_turns_send_only_new_messages(sessions):
+    session_id = client.post("/api/ai-chat/sessions", json={"context": dict(CONTEXT, vacancy_rate=None)}).json()["session_id"]
+
+    # Null removed vacancy_rate, so the context is incomplete until a diff adds it back
+    response = client.post(f"/api/ai-chat/sessions/{session_id}/messages", json={"message": "What is the NOI?"})
+    assert "vacancy_rate" in response.json()["reply"]
+
+    response = client.post(f"/api/ai-chat/sessions/{session_id}/messages", json={"message": "What is the NOI?", "context": {"vacancy_rate": 5}})
+    assert response.json()["reply"] == chat("What is the NOI?")
+
+    session = client.get(f"/api/ai-chat/sessions/{session_id}").json()
+    assert session["context"] == CONTEXT
+    assert [message["role"] for message in session["messages"]] == ["user", "assistant", "user", "assistant"]
+
+    assert client.delete(f"/api/ai-chat/sessions/{session_id}").status_code == 200
+    assert client.get(f"/api/ai-chat/sessions/{session_id}").status_code == 404
+
+
+def test_sessions_are_written_through_and_expire(sessions, tmp_path, monkeypatch):
+    ids = [client.post("/api/ai-chat/sessions", json={"context": CONTEXT}).json()["session_id"] for _ in range(3)]
+    assert sessions.stats()["sessions"] == 2
+    assert sessions.stats()["stored"] == 3
+
+    # The evicted first session is read back from disk
+    client.post(f"/api/ai-chat/sessions/{ids[0]}/messages", json={"message": "hello"})
+    assert sessions.loads == 1
+    assert (tmp_path / f"{ids[0]}.json").exists()
+    assert len(client.get(f"/api/ai-chat/sessions/{ids[0]}").json()["messages"]) == 2
+    assert sessions.loads == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert client.get(f"/api/ai-chat/sessions/{ids[0]}").status_code == 404
+    assert sessions.purge_expired() == 2
+    assert sessions.stats()["stored"] == 0
+
+
+def test_sessions_are_shared_between_workers(sessions, tmp_path):
+    other_worker = ChatSessionStore(ttl_seconds=60, session_dir=str(tmp_path))
+    session_id = client.post("/api/ai-chat/sessions", json={"context": CONTEXT}).json()["session_id"]
+
+    # A turn taken by another worker is seen by this one
+    session = other_worker.get(session_id)
+    session.add_message("user", "hello")
+    other_worker.save(session)
+    assert len(client.get(f"/api/ai-chat/sessions/{session_id}").json()["messages"]) == 1
+
+    client.post(f"/api/ai-chat/sessions/{session_id}/messages", json={"message": "What is the NOI?"})
+    assert len(other_worker.get(session_id).messages) == 3
+
+    assert client.delete(f"/api/ai-chat/sessions/{session_id}").status_code == 200
+    assert other_worker.get(session_id) is None
+
+
+def test_session_history_is_capped(tmp_path, monkeypatch):
+    store = ChatSessionStore(session_dir=str(tmp_path), max_messages=4)
+    monkeypatch.setattr(server, "chat_sessions", store)
+    session_id = client.post("/api/ai-chat/sessions", json={"context": CONTEXT}).json()["session_id"]
+
+    for question in ("What is the NOI?", "What is the margin?", "What is the cap rate?"):
+        client.post(f"/api/ai-chat/sessions/{session_id}/messages", json={"message": question})
+
+    messages = client.get(f"/api/ai-chat/sessions/{session_id}").json()["messages"]
+    assert [message["content"] for message in messages if message["role"] == "user"] == ["What is the margin?", "What is the cap rate?"]
+    assert len(messages) == 4
+
+
+def test_concurrent_session_turns_do_not_interleave(sessions, monkeypatch):
+    async def slow_reply(messages, context, draft):
+        await asyncio.sleep(0.05)
+        return f"reply to {messages[-1]['content']}"
+
+    monkeypatch.setattr(server, "write_chat_reply", slow_reply)
+    session_id = client.post("/api/ai-chat/sessions", json={"context": CONTEXT}).json()["session_id"]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test") as async_client:
+            await asyncio.gather(*(
+                async_client.post(f"/api/ai-chat/sessions/{session_id}/messages", json={"message": question})
+                for question in ("first", "second")
+            ))
+
+    asyncio.run(run())
+    messages = client.get(f"/api/ai-chat/sessions/{session_id}").json()["messages"]
+    assert [message["role"] for message in messages] == ["user", "assistant", "user", "assistant"]
+    assert messages[1]["content"] == f"reply to {messages[0]['content']}"
+    assert messages[3]["content"] == f"reply to {messages[2]['content']}"
+
+
+def test_merge_context_follows_merge_patch():
+    context = {"a": 1, "b": {"c": 2, "d": 3}}
+    assert merge_context(context, {"a": None, "b": {"c": None, "e": 4}, "f": 5}) == {"b": {"d": 3, "e": 4}, "f": 5}
+    assert context == {"a": 1, "b": {"c": 2, "d": 3}}
@@ -0,0 +1,380 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.deal_store import InMemoryDealRepository, SQLiteDealRepository
+
+DEAL = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10000000,
+    "construction_cost": 5000000,
+    "square_footage": 50000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 5,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 6,
+}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryDealRepository(server.Deal, server.calculate_portfolio_metrics)
+    return SQLiteDealRepository(server.Deal, server.calculate_portfolio_metrics, str(tmp_path / "deals.db"))
+
+
+@pytest.fixture
+def client(repository, monkeypatch):
+    monkeypatch.setattr(server, "deal_repository", repository)
+    return TestClient(server.app)
+
+
+def make_deal_data(**overrides):
+    now = datetime.now()
+    data = dict(DEAL, status="Draft", underwriting_result=None, ai_memo=None, created_at=now, updated_at=now)
+    data.update(overrides)
+    return data
+
+
+def test_repository_round_trip(repository):
+    deal = repository.add(make_deal_data(ai_memo="# Memo"))
+
+    assert repository.get(deal.id) == deal
+
+    updated = deal.model_copy(update={"status": "Approved"})
+    repository.save(updated)
+    assert repository.get(deal.id).status == "Approved"
+
+    assert repository.delete(deal.id)
+    assert repository.get(deal.id) is None
+    assert not repository.delete(deal.id)
+
+
+def test_repository_filters_and_paginates(repository):
+    for i in range(10):
+        repository.add(make_deal_data(
+            project_name=f"Deal {i}",
+            status="Approved" if i % 2 else "Draft",
+            property_type="Retail" if i < 5 else "Office",
+        ))
+
+    approved = repository.list(status="Approved")
+    assert [deal.project_name for deal in approved] == ["Deal 1", "Deal 3", "Deal 5", "Deal 7", "Deal 9"]
+
+    page = repository.list(skip=1, limit=2, status="Approved", property_type="Office")
+    assert [deal.project_name for deal in page] == ["Deal 7", "Deal 9"]
+
+    assert len(list(repository.iter_all())) == 10
+
+
+def test_sqlite_repository_is_shared_and_persistent(tmp_path):
+    path = str(tmp_path / "deals.db")
+    first = SQLiteDealRepository(server.Deal, server.calculate_portfolio_metrics, path)
+    deal = first.add(make_deal_data())
+
+    second = SQLiteDealRepository(server.Deal, server.calculate_portfolio_metrics, path)
+
+    assert second.get(deal.id) == deal
+    assert second.add(make_deal_data()).id != deal.id
+
+
+def test_deal_routes(client):
+    created = client.post("/api/deals", json=DEAL).json()
+
+    assert client.get(f"/api/deals/{created['id']}").json()["project_name"] == "Harbor Point"
+
+    updated = client.put(f"/api/deals/{created['id']}", json={"status": "Approved"}).json()
+    assert updated["status"] == "Approved"
+    assert updated["acquisition_price"] == DEAL["acquisition_price"]
+
+    listed = client.get("/api/deals", params={"status": "Approved", "property_type": "Office"}).json()
+    assert [deal["id"] for deal in listed["deals"]] == [created["id"]]
+
+    assert client.delete(f"/api/deals/{created['id']}").status_code == 200
+    assert client.get(f"/api/deals/{created['id']}").status_code == 404
+    assert client.delete(f"/api/deals/{created['id']}").status_code == 404
+
+
+def expected_summary(deals):
+    metrics = [server.calculate_portfolio_metrics(server.Deal(id="0", **make_deal_data(**deal))) for deal in deals]
+    return {
+        "total_deals": len(deals),
+        "average_cap_rate": sum(m["cap_rate"] for m in metrics) / len(metrics),
+        "average_development_margin": sum(m["development_margin"] for m in metrics) / len(metrics),
+        "total_gross_exit_value": sum(m["exit_value"] for m in metrics),
+        "average_project_cost": sum(m["project_cost"] for m in metrics) / len(metrics),
+    }
+
+
+def assert_summary(actual, deals):
+    for field, value in expected_summary(deals).items():
+        assert actual[field] == pytest.approx(value)
+
+
+def test_portfolio_summary_tracks_writes(client):
+    empty = client.get("/api/portfolio-summary").json()
+    assert empty["total_deals"] == 0
+    assert empty["average_cap_rate"] == 0.0
+
+    first = dict(DEAL, user_id="alice")
+    second = dict(DEAL, project_name="Mesa Yards", property_type="Industrial", exit_cap_rate=5, user_id="bob")
+    third = dict(DEAL, project_name="Elm Court", acquisition_price=2000000, status="Approved", user_id="alice")
+    ids = [client.post("/api/deals", json=deal).json()["id"] for deal in (first, second, third)]
+
+    assert_summary(client.get("/api/portfolio-summary").json(), [first, second, third])
+
+    client.put(f"/api/deals/{ids[1]}", json={"exit_cap_rate": 8, "user_id": "alice"})
+    second.update(exit_cap_rate=8, user_id="alice")
+    client.delete(f"/api/deals/{ids[0]}")
+
+    assert_summary(client.get("/api/portfolio-summary").json(), [second, third])
+
+    alice = client.get("/api/portfolio-summary", params={"user_id": "alice"}).json()
+    assert alice["user_id"] == "alice"
+    assert_summary(alice, [second, third])
+    assert client.get("/api/portfolio-summary", params={"user_id": "bob"}).json()["total_deals"] == 0
+
+    by_status = client.get("/api/portfolio-summary/breakdown", params={"group_by": "status"}).json()
+    assert set(by_status["groups"]) == {"Draft", "Approved"}
+    assert_summary(by_status["groups"]["Approved"], [third])
+
+    by_type = client.get("/api/portfolio-summary/breakdown", params={"group_by": "property_type"}).json()
+    assert_summary(by_type["groups"]["Industrial"], [second])
+
+    consistency = client.get("/api/portfolio-summary/consistency").json()
+    assert consistency["consistent"]
+    assert consistency["mismatches"] == []
+
+
+def test_portfolio_consistency_detects_and_repairs_drift(client, repository):
+    client.post("/api/deals", json=DEAL)
+    client.post("/api/deals", json=dict(DEAL, status="Approved"))
+
+    # Simulate drift by writing a deal without going through the rollups
+    deal = repository.get("1")
+    if isinstance(repository, InMemoryDealRepository):
+        repository._deals[deal.id] = deal.model_copy(update={"status": "Closed"})
+    else:
+        repository._connect().execute(
+            "UPDATE deals SET data = ? WHERE id = ?",
+            (deal.model_copy(update={"status": "Closed"}).model_dump_json(), deal.id)
+        )
+
+    drifted = client.get("/api/portfolio-summary/consistency").json()
+    assert not drifted["consistent"]
+    assert "status=Closed" in drifted["mismatches"]
+
+    repaired = client.get("/api/portfolio-summary/consistency", params={"repair": True}).json()
+    assert repaired["repaired"]
+    assert client.get("/api/portfolio-summary/consistency").json()["consistent"]
+
+
+def test_repository_keyset_pagination_and_counts(repository):
+    from app.deal_store import cursor_for
+
+    for i in range(7):
+        repository.add(make_deal_data(project_name=f"Deal {i}", status="Approved" if i % 2 else "Draft"))
+
+    first = repository.list(limit=3)
+    second = repository.list(limit=3, after=cursor_for(first[-1]))
+    assert [deal.project_name for deal in first + second] == [f"Deal {i}" for i in range(6)]
+
+    # An updated deal moves to the end of the list instead of shifting later pages
+    version = repository.version()
+    repository.save(first[0].model_copy(update={"updated_at": datetime.now()}))
+    assert repository.version() != version
+    rest = repository.list(limit=10, after=cursor_for(second[-1]))
+    assert [deal.project_name for deal in rest] == ["Deal 6", "Deal 0"]
+
+    assert repository.count() == 7
+    assert repository.count(status="Approved") == 3
+    assert repository.count(status="Approved", location=DEAL["location"]) == 3
+    assert repository.count(status="Approved", property_type="Retail") == 0
+
+
+def test_deal_list_cursor_total_and_etag(client):
+    for i in range(5):
+        client.post("/api/deals", json=dict(DEAL, project_name=f"Deal {i}"))
+
+    page = client.get("/api/deals", params={"limit": 2})
+    body = page.json()
+    assert body["total"] == 5
+    assert [deal["project_name"] for deal in body["deals"]] == ["Deal 0", "Deal 1"]
+
+    names = []
+    cursor = None
+    while True:
+        body = client.get("/api/deals", params={"limit": 2, "cursor": cursor} if cursor else {"limit": 2}).json()
+        names += [deal["project_name"] for deal in body["deals"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"Deal {i}" for i in range(5)]
+
+    etag = page.headers["etag"]
+    assert client.get("/api/deals", params={"limit": 2}, headers={"If-None-Match": etag}).status_code == 304
+
+    client.put("/api/deals/1", json={"status": "Approved"})
+    revalidated = client.get("/api/deals", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 200
+    assert revalidated.headers["etag"] != etag
+    assert [deal["project_name"] for deal in revalidated.json()["deals"]] == ["Deal 1", "Deal 2"]
+
+    assert client.get("/api/deals", params={"cursor": "not-a-cursor"}).status_code == 422
+
+
+def test_deal_responses_are_served_from_stored_documents(client, repository):
+    created = client.post("/api/deals", json=DEAL).json()
+    client.put(f"/api/deals/{created['id']}", json={"ai_memo": "# Memo \"quoted\" é", "underwriting_result": {"noi": 1.5}})
+    client.post("/api/deals", json=dict(DEAL, project_name="Mesa Yards"))
+
+    listed = client.get("/api/deals", params={"limit": 1})
+    expected = server.DealList(deals=repository.list(limit=1), total=2, next_cursor=listed.json()["next_cursor"])
+    assert listed.headers["content-type"] == "application/json"
+    assert listed.json() == expected.model_dump(mode="json")
+
+    single = client.get(f"/api/deals/{created['id']}").json()
+    assert single == repository.get(created["id"]).model_dump(mode="json")
+    assert single["ai_memo"] == "# Memo \"quoted\" é"
+
+    client.delete(f"/api/deals/{created['id']}")
+    assert repository.get_json(created["id"]) is None
+    assert [deal["project_name"] for deal in client.get("/api/deals").json()["deals"]] == ["Mesa Yards"]
+
+
+def test_patch_bumps_version_and_detects_conflicts(client):
+    created = client.post("/api/deals", json=DEAL).json()
+    assert created["version"] == 1
+
+    updated = client.put(f"/api/deals/{created['id']}", json={"status": "Approved", "version": 1}).json()
+    assert updated["version"] == 2
+    assert updated["status"] == "Approved"
+    assert updated["created_at"] == created["created_at"]
+
+    stale = client.put(f"/api/deals/{created['id']}", json={"status": "Closed", "version": 1})
+    assert stale.status_code == 409
+    assert client.get(f"/api/deals/{created['id']}").json()["status"] == "Approved"
+
+    # Without a version the update always applies
+    assert client.put(f"/api/deals/{created['id']}", json={"status": "Closed"}).json()["version"] == 3
+    assert client.put("/api/deals/999", json={"status": "Closed"}).status_code == 404
+
+
+def test_bulk_patch_is_atomic(client):
+    ids = [client.post("/api/deals", json=dict(DEAL, project_name=f"Deal {i}")).json()["id"] for i in range(3)]
+
+    moved = client.patch("/api/deals", json={"updates": [
+        {"id": ids[0], "status": "Approved"},
+        {"id": ids[1], "status": "Approved", "version": 1},
+        {"id": ids[0], "exit_cap_rate": 7},
+    ]})
+    assert moved.status_code == 200
+    deals = moved.json()["deals"]
+    assert [deal["version"] for deal in deals] == [2, 2, 3]
+    assert deals[2]["status"] == "Approved" and deals[2]["exit_cap_rate"] == 7
+
+    by_status = client.get("/api/portfolio-summary/breakdown", params={"group_by": "status"}).json()["groups"]
+    assert by_status["Approved"]["total_deals"] == 2
+
+    failed = client.patch("/api/deals", json={"updates": [
+        {"id": ids[2], "status": "Closed"},
+        {"id": ids[1], "status": "Closed", "version": 1},
+    ]})
+    assert failed.status_code == 409
+    assert client.get(f"/api/deals/{ids[2]}").json()["status"] == "Draft"
+
+    missing = client.patch("/api/deals", json={"updates": [{"id": ids[2], "status": "Closed"}, {"id": "999", "status": "Closed"}]})
+    assert missing.status_code == 404
+    assert client.get(f"/api/deals/{ids[2]}").json()["version"] == 1
+    assert client.get("/api/portfolio-summary/consistency").json()["consistent"]
+
+
+def import_file(client, name, content, **params):
+    return client.post("/api/deals/import", files={"file": (name, content)}, params=params)
+
+
+def test_import_csv_validates_rows_in_batches(client, monkeypatch):
+    import csv
+    import io
+
+    import app.deal_io as deal_io
+
+    monkeypatch.setattr(deal_io, "IMPORT_BATCH_SIZE", 2)
+    content = io.StringIO()
+    writer = csv.writer(content)
+    writer.writerow(list(DEAL) + ["status", "user_id"])
+    writer.writerow(list(DEAL.values()) + ["Approved", "007"])
+    writer.writerow(list(dict(DEAL, acquisition_price="lots").values()) + ["", ""])
+    writer.writerow(list(dict(DEAL, project_name="Mesa Yards").values()) + ["", ""])
+
+    result = import_file(client, "deals.csv", content.getvalue()).json()
+
+    assert result["imported"] == 2
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+    assert "acquisition_price" in result["errors"][0]["message"]
+
+    deals = client.get("/api/deals").json()["deals"]
+    assert [deal["project_name"] for deal in deals] == ["Harbor Point", "Mesa Yards"]
+    assert deals[0]["user_id"] == "007"
+    assert deals[1]["status"] == "Draft"
+    assert client.get("/api/portfolio-summary").json()["total_deals"] == 2
+
+
+def test_export_round_trips_through_import(client, repository):
+    import json
+
+    client.post("/api/deals", json=dict(DEAL, underwriting_result={"noi": 1.5}, ai_memo="Line one,\n\"two\""))
+    client.post("/api/deals", json=dict(DEAL, project_name="Mesa Yards", status="Approved"))
+
+    ndjson = client.get("/api/deals/export").content
+    exported = [json.loads(line) for line in ndjson.splitlines()]
+    assert exported == [deal.model_dump(mode="json") for deal in repository.list()]
+
+    csv_export = client.get("/api/deals/export", params={"format": "csv"})
+    assert csv_export.headers["content-type"].startswith("text/csv")
+    assert import_file(client, "deals.csv", csv_export.content).json()["imported"] == 2
+    assert import_file(client, "backup", ndjson, format="ndjson").json()["imported"] == 2
+
+    approved = client.get("/api/deals/export", params={"status": "Approved"}).content.splitlines()
+    assert len(approved) == 3
+
+    restored = repository.list(skip=2)
+    assert [deal.project_name for deal in restored] == ["Harbor Point", "Mesa Yards"] * 2
+    assert restored[0].underwriting_result == {"noi": 1.5}
+    assert restored[0].ai_memo == "Line one,\n\"two\""
+
+
+def test_import_xlsx_and_rejects_unknown_formats(client):
+    import io
+
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    workbook.active.append(list(DEAL) + ["user_id"])
+    workbook.active.append(list(DEAL.values()) + [42])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    result = import_file(client, "deals.xlsx", content.getvalue()).json()
+    assert result["imported"] == 1
+    assert client.get("/api/deals/1").json()["user_id"] == "42"
+
+    assert import_file(client, "deals.txt", b"").status_code == 422
+    assert import_file(client, "deals.ndjson", b"{not json}\n").status_code == 422
+
+
+def test_import_parquet(client):
+    pa = pytest.importorskip("pyarrow")
+    import io
+
+    import pyarrow.parquet as pq
+
+    content = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist([DEAL, dict(DEAL, project_name="Mesa Yards")]), content)
+
+    assert import_file(client, "deals.parquet", content.getvalue()).json()["imported"] == 2
@@ -0,0 +1,178 @@
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.lease_clauses import LEASE_RED_FLAG_INDICATORS, ClauseExtractor, analyze_lease_text
+
+client = TestClient(server.app)
+
+LEASE_TEXT = """LEASE AGREEMENT
+
+THIS LEASE AGREEMENT (the "Lease") is made and entered into as of January 1, 2023, by and between ABC Properties LLC ("Landlord") and XYZ Corporation ("Tenant").
+
+1. PREMISES. Landlord hereby leases to Tenant those certain premises consisting of approximately 10,000 square feet of office space, accepted AS IS.
+
+2. TERM. The Lease Term shall be for a period of five (5) years, commencing on January 1, 2023.
+
+3. BASE RENT. Tenant shall pay to Landlord as Base Rent the sum of $35.00 per square foot per year, payable in monthly installments of $29,166.67.
+
+4. RENEWAL OPTION. Tenant shall have the option to renew this Lease for one (1) additional term of three (3) years.
+
+5. EARLY TERMINATION. Either party may terminate this Lease upon six (6) months' prior written notice.
+
+6. DEFAULT. Tenant waives notice of default. Landlord may withhold consent to any assignment in its sole discretion.
+
+7. INDEMNIFICATION. Tenant shall indemnify Landlord. Tenant shall not assign this Lease.
+"""
+
+
+def test_extractor_reports_every_offset():
+    extractor = ClauseExtractor(["renew", "option to renew", "as is", "assign"])
+    text = "Option to RENEW; renewal. He has isolated the assignment."
+
+    hits = extractor.find_all(text)
+
+    assert hits["option to renew"] == [0]
+    assert hits["renew"] == [10, 17]
+    assert hits["as is"] == [text.lower().find("as is")]
+    assert hits["assign"] == [text.lower().find("assign")]
+    assert "default" not in hits
+
+
+def test_extractor_matches_substring_semantics():
+    keywords = ["ab", "abc", "bcd", "c"]
+    extractor = ClauseExtractor(keywords)
+    text = "xABCDabcab"
+
+    hits = extractor.find_all(text)
+
+    for keyword in keywords:
+        lower = text.lower()
+        expected = [i for i in range(len(lower)) if lower.startswith(keyword, i)]
+        assert hits.get(keyword, []) == expected
+
+
+def test_analyze_lease_extracts_terms():
+    result = client.post("/api/analyze-lease", json={"lease_text": LEASE_TEXT}).json()
+
+    assert result["base_rent"] == "$35.00 "
+    assert "five (5) years" in result["lease_term"]
+    assert result["renewals"] == ["Tenant has option to renew/extend (details not fully extracted)"]
+    assert result["break_clauses"] == ["Lease may contain termination provisions (details not fully extracted)"]
+
+
+def test_analyze_lease_returns_all_red_flags_with_positions():
+    result = client.post("/api/analyze-lease", json={"lease_text": LEASE_TEXT}).json()
+
+    assert result["red_flags"] == list(LEASE_RED_FLAG_INDICATORS.values())
+
+    matches = result["red_flag_matches"]
+    assert [match["start"] for match in matches] == sorted(match["start"] for match in matches)
+    for match in matches:
+        assert LEASE_TEXT[match["start"]:match["end"]].lower() == match["indicator"]
+    assert sum(match["indicator"] == "assign" for match in matches) == 2
+
+
+def test_extractor_finds_matches_across_windows():
+    extractor = ClauseExtractor(["option to renew", "renew"], window_size=8)
+    text = "xxxxxOption to Renew yyyy renew"
+
+    hits = extractor.find_all(text)
+
+    assert hits["option to renew"] == [5]
+    assert hits["renew"] == [15, 26]
+
+
+def make_docx(paragraphs):
+    import io
+    import zipfile
+    from xml.sax.saxutils import escape
+
+    body = "".join(
+        f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>' for paragraph in paragraphs
+    )
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{body}</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", document)
+    return buffer.getvalue()
+
+
+def test_upload_docx_matches_inline_analysis(tmp_path, monkeypatch):
+    import hashlib
+
+    monkeypatch.setenv("LEASE_UPLOAD_DIR", str(tmp_path))
+    paragraphs = LEASE_TEXT.split("\n")
+    content = make_docx(paragraphs)
+
+    response = client.post(
+        "/api/analyze-lease/upload",
+        files={"file": ("lease.docx", content, "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["sha256"] == hashlib.sha256(content).hexdigest()
+    assert result["size_bytes"] == len(content)
+    assert result["paragraphs"] == len(paragraphs)
+    assert result["characters"] == len(LEASE_TEXT)
+    assert (tmp_path / f"{result['file_id']}.docx").read_bytes() == content
+
+    inline = client.post("/api/analyze-lease", json={"lease_text": LEASE_TEXT}).json()
+    assert result["analysis"] == inline
+
+
+def test_upload_plain_text_lease(tmp_path, monkeypatch):
+    monkeypatch.setenv("LEASE_UPLOAD_DIR", str(tmp_path))
+
+    response = client.post("/api/analyze-lease/upload", files={"file": ("lease.txt", LEASE_TEXT.encode(), "text/plain")})
+
+    assert response.status_code == 200
+    inline = client.post("/api/analyze-lease", json={"lease_text": LEASE_TEXT}).json()
+    assert response.json()["analysis"] == inline
+
+
+def test_batch_job_streams_every_result():
+    import json
+
+    texts = [LEASE_TEXT, "No indicators here.", LEASE_TEXT.upper()]
+    documents = [{"document_id": f"lease-{i}", "lease_text": text} for i, text in enumerate(texts)]
+
+    # The context manager keeps one event loop running for the background job
+    with TestClient(server.app) as batch_client:
+        response = batch_client.post("/api/analyze-lease/batch", json={"documents": documents})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["total"] == 3
+
+        with batch_client.stream("GET", f"/api/analyze-lease/batch/{job['job_id']}/results") as stream:
+            results = [json.loads(line) for line in stream.iter_lines() if line]
+
+        progress = batch_client.get(f"/api/analyze-lease/batch/{job['job_id']}").json()
+
+    assert sorted(result["index"] for result in results) == [0, 1, 2]
+    for result in results:
+        inline = client.post("/api/analyze-lease", json={"lease_text": texts[result["index"]]}).json()
+        assert result["document_id"] == f"lease-{result['index']}"
+        assert result["analysis"] == inline
+
+    assert progress["status"] == "completed"
+    assert progress["completed"] == 3
+    assert progress["failed"] == 0
+    assert progress["finished_at"] is not None
+
+
+def test_batch_job_not_found():
+    assert client.get("/api/analyze-lease/batch/missing").status_code == 404
+    assert client.get("/api/analyze-lease/batch/missing/results").status_code == 404
+    assert client.post("/api/analyze-lease/batch", json={"documents": []}).status_code == 422
+
+
+def test_batch_worker_analysis_matches_inline():
+    # Pool workers run analyze_lease_text, which returns the inline response as plain data
+    assert server.lease_job_manager.worker is analyze_lease_text
+    inline = client.post("/api/analyze-lease", json={"lease_text": LEASE_TEXT}).json()
+    assert analyze_lease_text(LEASE_TEXT) == inline
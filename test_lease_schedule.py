@@ -0,0 +1,129 @@
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+# The backend schemas need pydantic's email extra
+pytest.importorskip("email_validator")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Asset, Lease, LeaseStatus, LeaseType, RenewalOption, Tenant
+from backend.services import get_rent_projection, get_walt
+from backend.services.lease_schedule import add_months, as_datetimes, load_lease_schedule, month_starts
+from backend.services.lease_service import calculate_rent_for_date
+from test_rent_roll_analytics import add_leases
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (Asset, Tenant, Lease, RenewalOption):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def scheduled_leases(db):
+    """The leases a schedule loads, in the same order"""
+    return db.query(Lease).filter(Lease.status.in_((LeaseStatus.ACTIVE, LeaseStatus.UPCOMING))).all()
+
+
+def test_rent_matrix_matches_calculate_rent_for_date(db):
+    add_leases(db, 300)
+    dates = month_starts(datetime(2020, 7, 9), 120)
+    leases = scheduled_leases(db)
+
+    rents = load_lease_schedule(db).rent_matrix(dates)
+
+    expected = [[calculate_rent_for_date(lease, date) for date in dates.tolist()] for lease in leases]
+    assert rents.shape == (len(leases), 120)
+    np.testing.assert_allclose(rents, expected, rtol=1e-12)
+
+
+def test_renewals_extend_leases_in_order(db):
+    lease = Lease(
+        asset_id=uuid.uuid4(), tenant_id=uuid.uuid4(), lease_type=LeaseType.RETAIL,
+        start_date=datetime(2024, 3, 15), end_date=datetime(2026, 3, 14), base_rent=1_000, rent_escalation=10,
+        security_deposit=0, lease_area=1_000, status=LeaseStatus.ACTIVE
+    )
+    db.add(lease)
+    db.flush()
+    db.add(RenewalOption(lease_id=lease.id, term=12, notice_required=6, rent_increase=5, created_at=datetime(2024, 1, 1)))
+    db.add(RenewalOption(lease_id=lease.id, term=24, notice_required=6, rent_increase=0, created_at=datetime(2024, 1, 2)))
+    db.commit()
+    dates = as_datetimes([
+        datetime(2024, 4, 1), datetime(2026, 3, 1), datetime(2026, 4, 1),
+        datetime(2027, 3, 1), datetime(2028, 3, 1), datetime(2029, 3, 1), datetime(2029, 4, 1)
+    ])
+
+    assert load_lease_schedule(db).rent_matrix(dates)[0].tolist() == pytest.approx([1000, 1210, 0, 0, 0, 0, 0])
+
+    schedule = load_lease_schedule(db, include_renewals=True)
+    # Each renewal starts from the rent at the end of the previous term plus its increase, then escalates
+    assert schedule.rent_matrix(dates)[0].tolist() == pytest.approx([1000, 1210, 1270.5, 1397.55, 1537.305, 1691.0355, 0])
+    assert schedule.final_end_dates.tolist() == [datetime(2029, 3, 14)]
+
+
+def test_add_months_clamps_to_month_end():
+    dates = as_datetimes([datetime(2024, 1, 31, 18), datetime(2023, 8, 31), datetime(2024, 2, 29)])
+
+    assert add_months(dates, np.array([1, 18, 12])).tolist() == [
+        datetime(2024, 2, 29, 18), datetime(2025, 2, 28), datetime(2025, 2, 28)
+    ]
+
+
+def test_rent_projection_sums_the_leases(db):
+    asset_ids = add_leases(db, 300)
+
+    for asset_id in [None, asset_ids[0]]:
+        leases = [lease for lease in scheduled_leases(db) if asset_id is None or lease.asset_id == asset_id]
+        projection = get_rent_projection(db, asset_id, months=36)
+
+        dates = month_starts(datetime.utcnow(), 36).tolist()
+        assert [row.period for row in projection] == [f"{date.year}-{date.month:02d}" for date in dates]
+        for row, date in zip(projection, dates):
+            rents = [calculate_rent_for_date(lease, date) for lease in leases]
+            assert row.rent == pytest.approx(sum(rents), rel=1e-12)
+            assert row.lease_count == sum(rent > 0 for rent in rents)
+
+
+def test_walt_weights_remaining_terms(db):
+    asset_ids = add_leases(db, 300)
+    now = datetime.utcnow()
+
+    def python_walt(leases):
+        in_force = [lease for lease in leases if calculate_rent_for_date(lease, now) > 0]
+        years = [(lease.end_date - now).total_seconds() / 86400 / 365.25 for lease in in_force]
+        rents = [calculate_rent_for_date(lease, now) for lease in in_force]
+        areas = [lease.lease_area for lease in in_force]
+        return (
+            sum(y * r for y, r in zip(years, rents)) / sum(rents),
+            sum(y * a for y, a in zip(years, areas)) / sum(areas),
+            len(in_force)
+        )
+
+    leases = scheduled_leases(db)
+    walt = get_walt(db)
+
+    assert (walt.walt_by_rent, walt.walt_by_area, walt.lease_count) == pytest.approx(python_walt(leases), rel=1e-6)
+    assert sorted(row.asset_id for row in walt.assets) == sorted(str(asset_id) for asset_id in asset_ids)
+    for row in walt.assets:
+        asset_leases = [lease for lease in leases if str(lease.asset_id) == row.asset_id]
+        assert (row.walt_by_rent, row.walt_by_area, row.lease_count) == pytest.approx(python_walt(asset_leases), rel=1e-6)
+    # The third asset has no record
+    assert [row.name for row in walt.assets].count("Unknown") == 1
+
+    assert get_walt(db, asset_ids[0]).walt_by_rent == pytest.approx(python_walt(
+        [lease for lease in leases if lease.asset_id == asset_ids[0]]
+    )[0], rel=1e-6)
+
+
+def test_empty_rent_roll(db):
+    assert [row.rent for row in get_rent_projection(db, months=3)] == [0, 0, 0]
+    assert get_walt(db, include_renewals=True).model_dump() == {
+        "walt_by_rent": 0, "walt_by_area": 0, "lease_count": 0, "assets": []
+    }
@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+import app.llm_gateway as llm_gateway
+from app.llm_gateway import LLMGateway, LLMResponseCache
+
+STUB_URL = "http://llm-stub/v1/chat/completions"
+
+MEMO = {
+    "property_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "asking_price": 12000000,
+    "square_footage": 48000,
+    "cap_rate": 6.5,
+    "occupancy_rate": 92,
+}
+
+
+class StubModel:
+    """Local stand-in for the chat completions API that replays scripted responses"""
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.streamed = []
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.complete)
+
+    async def complete(self, request: Request):
+        self.requests.append(await request.json())
+        status, delay = self.script.pop(0) if self.script else (200, 0)
+        await asyncio.sleep(delay)
+        if status != 200:
+            return JSONResponse({"error": "stub"}, status_code=status)
+        prompt = self.requests[-1]["messages"][-1]["content"]
+        text = f"Model text for: {prompt[-20:]}"
+        if self.requests[-1].get("stream"):
+            return StreamingResponse(self.stream(text), media_type="text/event-stream")
+        return {"choices": [{"message": {"role": "assistant", "content": text}}]}
+
+    async def stream(self, text):
+        for index, word in enumerate(text.split(" ")):
+            self.streamed.append(word)
+            chunk = {"choices": [{"delta": {"content": word if index == 0 else f" {word}"}}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    def gateway(self, cache=None, **settings):
+        return LLMGateway(api_key="test-key", api_url=STUB_URL, cache=cache, transport=httpx.ASGITransport(app=self.app), **settings)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "RETRY_BASE_SECONDS", 0)
+    return StubModel()
+
+
+def test_retries_then_caches_persistently(stub, tmp_path):
+    stub.script = [(503, 0), (429, 0)]
+    gateway = stub.gateway(cache=LLMResponseCache(str(tmp_path / "llm.db")))
+    messages = [{"role": "user", "content": "Summarize the deal"}]
+
+    text = asyncio.run(gateway.complete(messages))
+    assert text == "Model text for: Summarize the deal"
+    assert (gateway.requests, gateway.retries) == (3, 2)
+    assert stub.requests[0]["model"] == llm_gateway.DEFAULT_MODEL
+
+    # A new process with the same cache file doesn't call the model again
+    restarted = stub.gateway(cache=LLMResponseCache(str(tmp_path / "llm.db")))
+    assert asyncio.run(restarted.complete(messages)) == text
+    assert (restarted.requests, restarted.cache_hits) == (0, 1)
+
+
+def test_falls_back_on_timeout_and_rejection(stub):
+    stub.script = [(200, 1)]
+    gateway = stub.gateway(deadline_seconds=0.1)
+    assert asyncio.run(gateway.generate([{"role": "user", "content": "hi"}], fallback="template")) == ("template", True)
+
+    # A rejected request is not retried
+    stub.script = [(400, 0)]
+    gateway = stub.gateway()
+    assert asyncio.run(gateway.generate([{"role": "user", "content": "hi"}], fallback="template")) == ("template", True)
+    assert (gateway.requests, gateway.fallbacks) == (1, 1)
+
+    assert asyncio.run(LLMGateway(api_key=None).generate([], fallback="template")) == ("template", False)
+
+
+def test_concurrency_is_limited(stub):
+    in_flight = []
+    peak = []
+
+    async def complete(request: Request):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+    stub.app.router.routes.clear()
+    stub.app.post("/v1/chat/completions")(complete)
+    gateway = stub.gateway(max_concurrency=3)
+
+    async def run():
+        return await asyncio.gather(*(gateway.complete([{"role": "user", "content": str(i)}]) for i in range(12)))
+
+    assert asyncio.run(run()) == ["ok"] * 12
+    assert max(peak) == 3
+
+
+def test_new_event_loop_closes_previous_client(stub):
+    gateway = stub.gateway()
+    messages = [{"role": "user", "content": "hi"}]
+
+    asyncio.run(gateway.complete(messages))
+    first = gateway._client
+    asyncio.run(gateway.complete(messages))
+
+    assert first.is_closed
+    assert gateway._client is not first and not gateway._client.is_closed
+
+
+def test_backoff_releases_concurrency_slot(stub, monkeypatch):
+    monkeypatch.setattr(llm_gateway, "RETRY_BASE_SECONDS", 0.2)
+    monkeypatch.setattr(llm_gateway.random, "uniform", lambda low, high: high)
+    stub.script = [(503, 0)]
+    gateway = stub.gateway(max_concurrency=1)
+    finished = []
+
+    async def complete(name, delay):
+        await asyncio.sleep(delay)
+        await gateway.complete([{"role": "user", "content": name}])
+        finished.append(name)
+
+    async def run():
+        await asyncio.gather(complete("flapping", 0), complete("healthy", 0.05))
+
+    asyncio.run(run())
+    # The healthy call got the only slot while the flapping one was backing off
+    assert finished == ["healthy", "flapping"]
+
+
+def test_memo_uses_model_text_and_template_fallback(stub, monkeypatch):
+    monkeypatch.setattr(server, "llm_gateway", stub.gateway())
+    server.result_cache.clear()
+    client = TestClient(server.app)
+
+    memo = client.post("/api/generate-memo", json=MEMO).json()["memo"]
+    assert memo.startswith("Model text for:")
+    # The model is given the template draft to write up
+    assert "# Investment Memo: Harbor Point" in stub.requests[-1]["messages"][-1]["content"]
+
+    stub.script = [(500, 0)] * 3
+    server.result_cache.clear()
+    fallback = client.post("/api/generate-memo", json=MEMO).json()["memo"]
+    assert fallback == server.generate_investment_memo(server.InvestmentMemoRequest(**MEMO)).memo
+
+    # The fallback was not cached, so the model is asked again once it recovers
+    assert client.post("/api/generate-memo", json=MEMO).json()["memo"] == memo
+    server.result_cache.clear()
+
+
+def test_stream_yields_deltas_then_caches(stub, tmp_path):
+    gateway = stub.gateway(cache=LLMResponseCache(str(tmp_path / "llm.db")))
+    messages = [{"role": "user", "content": "Summarize the deal"}]
+
+    async def collect():
+        return [delta async for delta in gateway.stream(messages)]
+
+    deltas = asyncio.run(collect())
+    assert len(deltas) > 1
+    assert "".join(deltas) == "Model text for: Summarize the deal"
+    assert stub.requests[-1]["stream"] is True
+
+    # The streamed completion was cached and comes back whole
+    assert asyncio.run(collect()) == ["".join(deltas)]
+    assert asyncio.run(gateway.complete(messages)) == "".join(deltas)
+    assert (gateway.requests, gateway.cache_hits) == (1, 2)
+
+
+def test_memo_stream_sends_model_tokens(stub, monkeypatch):
+    monkeypatch.setattr(server, "llm_gateway", stub.gateway())
+    client = TestClient(server.app)
+
+    response = client.post("/api/generate-memo/stream", json=MEMO)
+    sections = [
+        json.loads(block.split("\n")[1].removeprefix("data: "))["text"]
+        for block in response.text.strip().split("\n\n")
+        if block.startswith("event: section")
+    ]
+    assert len(sections) == len(stub.streamed)
+    assert "".join(sections).startswith("Model text for:")
+
+    # Without a model answer the template draft is streamed instead
+    stub.script = [(500, 0)] * 3
+    response = client.post("/api/generate-memo/stream", json=MEMO)
+    assert "# Investment Memo: Harbor Point" in response.text
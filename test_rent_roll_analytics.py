@@ -0,0 +1,189 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+# The backend schemas need pydantic's email extra
+pytest.importorskip("email_validator")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import Asset, AssetType, Lease, LeaseStatus, LeaseType, Tenant
+from backend.services.analytics_service import get_property_type_distribution, get_rent_roll_summary, get_tenant_concentration
+from backend.services.lease_service import calculate_rent_for_date
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Lease.__table__.create(engine)
+    Tenant.__table__.create(engine)
+    Asset.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def add_leases(db, count, seed=3, tenants=40):
+    """Add leases of every type, mostly running today, some ended or not yet started"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    asset_ids = [uuid.uuid4() for _ in range(3)]
+    for i, asset_id in enumerate(asset_ids[:2]):
+        db.add(Asset(
+            id=asset_id, name=f"Asset {i}", asset_type=AssetType.OFFICE, address="", city="", state="", zip_code="",
+            total_area=rng.uniform(2e6, 6e6)
+        ))
+
+    # A few leases point at tenants that no longer exist
+    tenant_ids = [uuid.uuid4() for _ in range(tenants)]
+    for i, tenant_id in enumerate(tenant_ids[:-3]):
+        db.add(Tenant(id=tenant_id, name=f"Tenant {i}", contact_name="", contact_email="", contact_phone=""))
+
+    for _ in range(count):
+        start = now - timedelta(days=rng.randint(-200, 3650), minutes=rng.randint(0, 1440))
+        db.add(Lease(
+            asset_id=rng.choice(asset_ids),
+            tenant_id=rng.choice(tenant_ids),
+            lease_type=rng.choice(list(LeaseType)),
+            start_date=start,
+            end_date=start + timedelta(days=rng.randint(30, 5000)),
+            base_rent=rng.uniform(1_000, 80_000),
+            rent_escalation=rng.choice([0, 2.5, 3, rng.uniform(0, 6)]),
+            security_deposit=0,
+            lease_area=rng.uniform(500, 50_000),
+            status=rng.choice([LeaseStatus.ACTIVE] * 4 + [LeaseStatus.EXPIRED, LeaseStatus.UPCOMING])
+        ))
+    db.commit()
+    return asset_ids
+
+
+def python_distribution(db, asset_id=None):
+    """The distribution as computed in Python before it moved to SQL"""
+    query = db.query(Lease).filter(Lease.status == LeaseStatus.ACTIVE)
+    if asset_id:
+        query = query.filter(Lease.asset_id == asset_id)
+    leases = query.all()
+
+    now = datetime.utcnow()
+    total_rent = sum(calculate_rent_for_date(lease, now) for lease in leases)
+    result = []
+    for lease_type in LeaseType:
+        type_leases = [lease for lease in leases if lease.lease_type == lease_type]
+        type_rent = sum(calculate_rent_for_date(lease, now) for lease in type_leases)
+        if type_rent > 0:
+            result.append((lease_type.value, type_rent, type_rent / total_rent * 100, len(type_leases)))
+    return sorted(result, key=lambda row: row[1], reverse=True)
+
+
+def test_property_type_distribution_matches_python(db):
+    asset_ids = add_leases(db, 600)
+
+    for asset_id in [None] + asset_ids:
+        expected = python_distribution(db, asset_id)
+        result = get_property_type_distribution(db, asset_id)
+
+        assert [(row.name, row.count) for row in result] == [(name, count) for name, _, _, count in expected]
+        for row, (_, value, percentage, _) in zip(result, expected):
+            assert row.value == pytest.approx(value, rel=1e-9)
+            assert row.percentage == pytest.approx(percentage, rel=1e-9)
+
+
+def test_property_type_distribution_without_rent(db):
+    assert get_property_type_distribution(db) == []
+
+    start = datetime.utcnow() + timedelta(days=30)
+    db.add(Lease(
+        asset_id=uuid.uuid4(), tenant_id=uuid.uuid4(), lease_type=LeaseType.RETAIL,
+        start_date=start, end_date=start + timedelta(days=365), base_rent=5_000, rent_escalation=3,
+        security_deposit=0, lease_area=1_000, status=LeaseStatus.ACTIVE
+    ))
+    db.commit()
+
+    # Active but not started yet: no rent today, so no share of the distribution
+    assert get_property_type_distribution(db) == []
+
+
+def python_tenant_concentration(db, asset_id=None, top_n=5):
+    """Tenant concentration as computed in Python before it moved to SQL"""
+    query = db.query(Lease).filter(Lease.status == LeaseStatus.ACTIVE)
+    if asset_id:
+        query = query.filter(Lease.asset_id == asset_id)
+    leases = query.all()
+
+    now = datetime.utcnow()
+    total_rent = sum(calculate_rent_for_date(lease, now) for lease in leases)
+    tenants = {}
+    for lease in leases:
+        tenant = db.get(Tenant, lease.tenant_id)
+        row = tenants.setdefault(str(lease.tenant_id), [str(lease.tenant_id), tenant.name if tenant else "Unknown", 0])
+        row[2] += calculate_rent_for_date(lease, now)
+
+    # Ties (e.g. tenants whose leases haven't started) used to come out in query order; they are now by tenant ID
+    result = sorted(([*row, row[2] / total_rent * 100] for row in tenants.values()), key=lambda row: (-row[2], row[0]))
+    if len(result) > top_n:
+        others = result[top_n:]
+        result = result[:top_n] + [["others", "Others", sum(row[2] for row in others), sum(row[3] for row in others)]]
+    return result
+
+
+@pytest.mark.parametrize("top_n", [5, 0, 100])
+def test_tenant_concentration_matches_python(db, top_n):
+    asset_ids = add_leases(db, 600)
+
+    for asset_id in [None] + asset_ids:
+        expected = python_tenant_concentration(db, asset_id, top_n)
+        result = get_tenant_concentration(db, asset_id, top_n)
+
+        assert [(row.id, row.name) for row in result] == [(row[0], row[1]) for row in expected]
+        for row, (_, _, rent, percentage) in zip(result, expected):
+            assert row.rent == pytest.approx(rent, rel=1e-9)
+            assert row.percentage == pytest.approx(percentage, rel=1e-9)
+
+    assert "Unknown" in [row.name for row in get_tenant_concentration(db, top_n=100)]
+
+
+def python_rent_roll_summary(db, asset_id=None):
+    """The rent roll summary as computed in Python before it moved to SQL"""
+    query = db.query(Lease)
+    if asset_id:
+        query = query.filter(Lease.asset_id == asset_id)
+        asset = db.get(Asset, asset_id)
+        total_area = asset.total_area if asset else 0
+    else:
+        total_area = sum(asset.total_area for asset in db.query(Asset))
+    active_leases = [lease for lease in query if lease.status == LeaseStatus.ACTIVE]
+
+    now = datetime.utcnow()
+    total_monthly_rent = sum(calculate_rent_for_date(lease, now) for lease in active_leases)
+    total_leased_area = sum(lease.lease_area for lease in active_leases)
+    property_types = python_distribution(db, asset_id)
+    return {
+        "total_monthly_rent": total_monthly_rent,
+        "total_leased_area": total_leased_area,
+        "average_rent_per_sqft": (total_monthly_rent * 12 / total_leased_area) if total_leased_area > 0 else 0,
+        "active_leases_count": len(active_leases),
+        "expiring_within_90_days": sum(1 for lease in active_leases if lease.end_date <= now + timedelta(days=90)),
+        "expiring_within_year": sum(1 for lease in active_leases if lease.end_date <= now + timedelta(days=365)),
+        "occupancy_rate": (total_leased_area / total_area * 100) if total_area > 0 else 0,
+        "top_property_type": property_types[0][0] if property_types else "N/A",
+        "top_property_type_percentage": property_types[0][2] if property_types else 0,
+    }
+
+
+def test_rent_roll_summary_matches_python(db):
+    # The third asset has leases but no asset record, so no occupancy
+    asset_ids = add_leases(db, 600)
+
+    for asset_id in [None] + asset_ids + [uuid.uuid4()]:
+        expected = python_rent_roll_summary(db, asset_id)
+        assert get_rent_roll_summary(db, asset_id).model_dump() == pytest.approx(expected, rel=1e-9)
+
+
+def test_rent_roll_summary_without_leases(db):
+    summary = get_rent_roll_summary(db)
+
+    assert (summary.active_leases_count, summary.total_monthly_rent, summary.occupancy_rate) == (0, 0, 0)
+    assert (summary.top_property_type, summary.top_property_type_percentage) == ("N/A", 0)
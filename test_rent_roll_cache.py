@@ -0,0 +1,156 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+# The backend schemas need pydantic's email extra
+pytest.importorskip("email_validator")
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import backend.services.analytics_cache as cache_service
+from backend.models import AnalyticsCacheEntry, AnalyticsCacheGeneration, Asset, Lease, LeaseType, RenewalOption, Tenant
+from backend.schemas.asset import AssetUpdate
+from backend.schemas.lease import LeaseCreate, LeaseUpdate
+from backend.schemas.tenant import TenantUpdate
+from backend.services import create_lease, delete_lease, get_rent_roll_summary, get_tenant_concentration, update_asset, update_lease, update_tenant
+from backend.services.analytics_cache import DatabaseAnalyticsCache, InMemoryAnalyticsCache, get_cached_analytics, next_utc_midnight
+from test_rent_roll_analytics import add_leases
+
+
+@pytest.fixture(params=["database", "memory"])
+def sessions(request, tmp_path, monkeypatch):
+    """A session factory over a fresh rent roll database, with each cache backend"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'rent_roll.db'}")
+    for model in (Asset, Tenant, Lease, RenewalOption, AnalyticsCacheEntry, AnalyticsCacheGeneration):
+        model.__table__.create(engine)
+
+    backend = DatabaseAnalyticsCache() if request.param == "database" else InMemoryAnalyticsCache()
+    monkeypatch.setattr(cache_service, "analytics_cache", backend)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def cached(db, endpoint, asset_id, params, compute):
+    """A cached response as JSON data, whether it was a hit or a miss"""
+    return jsonable_encoder(get_cached_analytics(db, endpoint, asset_id, params, compute))
+
+
+class Summaries:
+    """Cached rent roll summaries that count how often they are computed"""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.computed = []
+
+    def __call__(self, asset_id=None):
+        with self.sessions() as db:
+            def compute():
+                self.computed.append(asset_id)
+                return get_rent_roll_summary(db, asset_id)
+
+            return cached(db, "summary", asset_id, {}, compute)
+
+
+def new_lease(asset_id, tenant_id):
+    start = datetime.utcnow() - timedelta(days=100)
+    lease = LeaseCreate(
+        asset_id=asset_id, tenant_id=tenant_id, lease_type="Office", start_date=start,
+        end_date=start + timedelta(days=1000), base_rent=10_000, rent_escalation=3, security_deposit=0, lease_area=2_000
+    )
+    # create_lease stores the lease type as given, and the column maps the model enum
+    return lease.model_copy(update={"lease_type": LeaseType.OFFICE})
+
+
+def test_summary_is_cached_until_a_lease_changes(sessions):
+    with sessions() as db:
+        asset_ids = add_leases(db, 200)
+        tenant_id = db.query(Tenant.id).first()[0]
+    summaries = Summaries(sessions)
+
+    first = summaries()
+    assert summaries() == first
+    summaries(asset_ids[1])
+    assert summaries.computed == [None, asset_ids[1]]
+
+    with sessions() as db:
+        lease = create_lease(db, new_lease(asset_ids[0], tenant_id))
+    assert summaries()["active_leases_count"] == first["active_leases_count"] + 1
+    # Other assets keep their entries
+    summaries(asset_ids[1])
+    assert summaries.computed == [None, asset_ids[1], None]
+
+    with sessions() as db:
+        update_lease(db, db.get(Lease, lease.id), LeaseUpdate(base_rent=20_000))
+    assert summaries()["total_monthly_rent"] == pytest.approx(first["total_monthly_rent"] + 20_000)
+
+    with sessions() as db:
+        delete_lease(db, db.get(Lease, lease.id))
+    assert summaries() == pytest.approx(first)
+
+    with sessions() as db:
+        update_asset(db, db.get(Asset, asset_ids[1]), AssetUpdate(total_area=1e9))
+    summaries(asset_ids[1])
+    assert summaries.computed == [None, asset_ids[1], None, None, None, asset_ids[1]]
+
+
+def test_tenant_changes_invalidate_every_scope(sessions):
+    with sessions() as db:
+        asset_ids = add_leases(db, 200, tenants=8)
+    concentration = lambda db, asset_id: cached(
+        db, "tenant-concentration", asset_id, {"top_n": 5}, lambda: get_tenant_concentration(db, asset_id)
+    )
+
+    with sessions() as db:
+        tenants = concentration(db, asset_ids[0])
+        assert concentration(db, asset_ids[0]) == tenants
+        position, tenant = next((i, row) for i, row in enumerate(tenants) if row["name"] != "Unknown")
+        update_tenant(db, db.get(Tenant, uuid.UUID(tenant["id"])), TenantUpdate(name="Renamed"))
+
+    with sessions() as db:
+        assert concentration(db, asset_ids[0])[position]["name"] == "Renamed"
+
+
+def test_write_during_computation_is_not_cached(sessions):
+    with sessions() as db:
+        asset_ids = add_leases(db, 50)
+        tenant_id = db.query(Tenant.id).first()[0]
+    summaries = Summaries(sessions)
+
+    def compute_then_write(db):
+        summary = get_rent_roll_summary(db)
+        with sessions() as other:
+            create_lease(other, new_lease(asset_ids[0], tenant_id))
+        return summary
+
+    with sessions() as db:
+        stale = cached(db, "summary", None, {}, lambda: compute_then_write(db))
+
+    assert summaries()["active_leases_count"] == stale["active_leases_count"] + 1
+
+
+def test_caching_leaves_the_request_session_alone(sessions):
+    with sessions() as db:
+        add_leases(db, 20)
+
+    with sessions() as db:
+        db.query(Tenant).count()
+        transaction = db.get_transaction()
+        cached(db, "summary", None, {}, lambda: get_rent_roll_summary(db))
+        assert db.get_transaction() is transaction
+
+    assert Summaries(sessions)() is not None
+
+
+def test_entries_expire_at_utc_midnight(sessions, monkeypatch):
+    assert next_utc_midnight(datetime(2026, 12, 31, 23, 59)) == datetime(2027, 1, 1)
+    assert next_utc_midnight(datetime(2026, 10, 16)) == datetime(2026, 10, 17)
+
+    summaries = Summaries(sessions)
+    monkeypatch.setattr(cache_service, "next_utc_midnight", lambda: datetime.utcnow() - timedelta(seconds=1))
+    summaries()
+    summaries()
+
+    assert summaries.computed == [None, None]
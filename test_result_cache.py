@@ -0,0 +1,79 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.result_cache import ResultCache, cache_key
+
+UNDERWRITING = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10000000,
+    "construction_cost": 5000000,
+    "square_footage": 50000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 5,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 6,
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(server, "result_cache", ResultCache())
+    return TestClient(server.app)
+
+
+def test_key_ignores_key_order_and_number_spelling():
+    first = server.UnderwritingRequest(**UNDERWRITING)
+    second = server.UnderwritingRequest(**dict(reversed(list(dict(UNDERWRITING, exit_cap_rate=6.0).items()))))
+
+    assert cache_key("underwrite", first) == cache_key("underwrite", second)
+    assert cache_key("underwrite", first) != cache_key("risk-score", first)
+    assert cache_key("underwrite", first) != cache_key("underwrite", first.model_copy(update={"vacancy_rate": 6}))
+
+
+def test_routes_share_cache(client):
+    first = client.post("/api/underwrite", json=UNDERWRITING).json()
+    second = client.post("/api/underwrite", json=UNDERWRITING).json()
+    client.post("/api/risk-score", json=UNDERWRITING)
+    client.post("/api/underwrite", json=dict(UNDERWRITING, vacancy_rate=6))
+
+    assert first == second
+    stats = client.get("/api/cache/stats").json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["entries"] == 3
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = ResultCache(max_entries=2)
+    responses = [server.RoiResponse(property_price=i, annual_rental_income=1, roi_percentage=1) for i in range(3)]
+    for i, response in enumerate(responses):
+        cache.set(str(i), response)
+        if i == 1:
+            cache.get("0")
+
+    assert cache.get("1") is None
+    assert cache.get("0") is responses[0]
+    assert cache.evictions == 1
+
+    size = len(responses[0].model_dump_json())
+    small = ResultCache(max_bytes=size * 2)
+    for i, response in enumerate(responses):
+        small.set(str(i), response)
+    assert small.stats()["entries"] == 2
+    assert small.stats()["bytes"] <= size * 2
+
+
+def test_entries_expire(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.result_cache.time.monotonic", lambda: clock[0])
+    cache = ResultCache(ttl_seconds=10)
+    cache.set("key", server.RoiResponse(property_price=1, annual_rental_income=1, roi_percentage=1))
+
+    clock[0] += 11
+
+    assert cache.get("key") is None
+    assert cache.expirations == 1
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,126 @@
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.risk_rules import DEFAULT_RISK_RULES, RiskRuleEngine, RiskRuleSet
+
+client = TestClient(server.app)
+
+DEAL = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10_000_000,
+    "construction_cost": 5_000_000,
+    "square_footage": 50_000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 8,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 7.5,
+}
+
+METRICS = server.risk_rules.metrics
+
+
+def make_batch(deals):
+    batch = {field: [deal[field] for deal in deals] for field in server.UNDERWRITING_INPUT_FIELDS}
+    batch["project_name"] = [deal["project_name"] for deal in deals]
+    batch["property_type"] = [deal["property_type"] for deal in deals]
+    return batch
+
+
+def test_default_rules_flag_like_the_old_checks():
+    response = client.post("/api/risk-score", json=DEAL).json()
+
+    assert response["risk_score"] == "Low"
+    assert response["flags"] == [
+        "High vacancy rate of 8.0% increases risk",
+        "High exit cap rate of 7.5% increases risk",
+        "Office properties face challenges from remote work trends",
+    ]
+
+    quiet = client.post("/api/risk-score", json=dict(DEAL, vacancy_rate=5, exit_cap_rate=5, property_type="Land")).json()
+    assert quiet["flags"] == ["General market volatility and economic uncertainty"]
+
+
+def test_batch_matches_single_deals():
+    deals = [
+        DEAL,
+        dict(DEAL, project_name="Thin margin", projected_rent_per_sf=30, property_type="Retail"),
+        dict(DEAL, project_name="Middling", exit_cap_rate=6.5, vacancy_rate=5, property_type="Industrial"),
+        dict(DEAL, project_name="No exit cap", exit_cap_rate=0),
+    ]
+    response = client.post("/api/risk-score/batch", json=make_batch(deals))
+
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["project_name"] for row in rows] == [deal["project_name"] for deal in deals]
+
+    for deal, row in zip(deals[:3], rows):
+        single = client.post("/api/risk-score", json=deal).json()
+        assert row["risk_score"] == single["risk_score"]
+        assert [flag["message"] for flag in row["flags"]] == single["flags"]
+        assert row["development_margin"] == single["development_margin"]
+
+    # Only the first matching margin rule of the group fires
+    assert [flag["rule"] for flag in rows[1]["flags"]] == ["low_margin", "high_vacancy", "high_exit_cap"]
+    assert rows[1]["flags"][0]["severity"] == "high"
+    # A deal that can't be valued has no score instead of failing the batch
+    assert (rows[3]["development_margin"], rows[3]["risk_score"]) == (None, None)
+
+
+def test_batch_columns_must_match():
+    batch = make_batch([DEAL, DEAL])
+    batch["property_type"] = ["Office"]
+
+    assert client.post("/api/risk-score/batch", json=batch).status_code == 422
+
+
+def test_invalid_rule_sets_are_rejected():
+    def rule_set(**changes):
+        rule = dict(DEFAULT_RISK_RULES["rules"][2], **changes)
+        return dict(DEFAULT_RISK_RULES, rules=[rule])
+
+    RiskRuleSet(rule_set(), METRICS)
+    for changes in ({"metric": "cap_rate"}, {"op": "~"}, {"severity": "severe"}, {"threshold": "high"}, {"message": "{unknown}"}):
+        with pytest.raises(ValueError):
+            RiskRuleSet(rule_set(**changes), METRICS)
+    with pytest.raises(ValueError):
+        RiskRuleSet({"rules": []}, METRICS)
+
+
+def test_rules_file_is_hot_reloaded(tmp_path):
+    path = tmp_path / "risk_rules.json"
+    rules = dict(DEFAULT_RISK_RULES, max_flags=None)
+    path.write_text(json.dumps(rules))
+    engine = RiskRuleEngine(str(path), METRICS, check_interval=0)
+    values = dict(DEAL, **server.perform_underwriting_calculations(server.UnderwritingRequest(**DEAL)))
+    version = engine.version
+
+    rules["rules"] = rules["rules"] + [{
+        "id": "large", "metric": "square_footage", "op": ">=", "threshold": 50_000,
+        "severity": "low", "message": "Large asset of {square_footage:,.0f} SF"
+    }]
+    path.write_text(json.dumps(rules))
+    os.utime(path, ns=(1, 1))
+
+    score, flags = engine.evaluate_one(values)
+    assert engine.version != version and engine.reloads == 1
+    assert flags[-1].message == "Large asset of 50,000 SF"
+
+    # A broken file keeps the rules in force
+    path.write_text("{not json")
+    os.utime(path, ns=(2, 2))
+    assert engine.evaluate_one(values) == (score, flags)
+    assert engine.status()["last_error"].startswith("JSONDecodeError")
+
+
+def test_risk_rules_route():
+    status = client.get("/api/risk-rules").json()
+
+    assert status["source"] == "default"
+    assert status["version"] == server.risk_rules.version
+    assert [rule["id"] for rule in status["rules"]["rules"]][:2] == ["low_margin", "moderate_margin"]
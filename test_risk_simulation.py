@@ -0,0 +1,101 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.underwriting import underwrite_columns
+from app.monte_carlo import DEFAULT_CORRELATION, DEFAULT_VOLATILITY, simulate_margins, spawn_seeds, run_simulation, summarize_margins
+
+client = TestClient(server.app)
+
+DEAL = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10000000,
+    "construction_cost": 5000000,
+    "square_footage": 50000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 5,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 6,
+}
+
+
+def test_risk_score_simulation_is_reproducible():
+    request = dict(DEAL, simulation={"paths": 200000, "seed": 7})
+    first = client.post("/api/risk-score", json=request).json()
+    server.result_cache.clear()
+    second = client.post("/api/risk-score", json=request).json()
+
+    simulation = first["simulation"]
+    assert simulation == second["simulation"]
+    assert simulation["p5_margin"] < simulation["p50_margin"] < simulation["p95_margin"]
+    # The median path stays close to the deterministic base case
+    assert abs(simulation["p50_margin"] - first["development_margin"]) < 5
+    assert 0 <= simulation["probability_margin_below_10"] <= simulation["probability_margin_below_15"] <= 1
+
+    assert client.post("/api/risk-score", json=DEAL).json()["simulation"] is None
+
+
+def test_draws_follow_correlation():
+    drawn = {}
+
+    def calculate(columns):
+        drawn.update(columns)
+        return underwrite_columns(columns)
+
+    inputs = {field: DEAL[field] for field in server.UNDERWRITING_INPUT_FIELDS}
+    simulate_margins(inputs, calculate, 100000, 1, DEFAULT_VOLATILITY)
+
+    observed = np.corrcoef([
+        np.log(drawn["projected_rent_per_sf"]),
+        drawn["vacancy_rate"],
+        np.log(drawn["operating_expenses_per_sf"]),
+        np.log(drawn["exit_cap_rate"]),
+    ])
+    # Vacancy is clipped at zero, which weakens its correlations a little
+    assert np.allclose(observed, DEFAULT_CORRELATION, atol=0.08)
+    assert abs(np.log(drawn["exit_cap_rate"]).std() - DEFAULT_VOLATILITY["exit_cap_rate"]) < 0.005
+
+
+def test_batch_simulation_matches_single_deals():
+    deals = [DEAL, dict(DEAL, projected_rent_per_sf=30), dict(DEAL, exit_cap_rate=8)]
+    response = client.post("/api/risk-score/simulate", json={"deals": deals, "simulation": {"paths": 20000, "seed": 3}})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[1]["p50_margin"] < results[0]["p50_margin"]
+
+    seeds = spawn_seeds(3, len(deals))
+    for deal, seed, result in zip(deals, seeds, results):
+        assert result["seed"] == 3
+        assert result["spawn_key"] == list(seed.spawn_key)
+        # The reported seed and spawn key reproduce the deal's own random stream
+        reported = np.random.SeedSequence(result["seed"], spawn_key=result["spawn_key"])
+        arguments = server.build_simulation_arguments(server.UnderwritingRequest(**deal), server.SimulationSettings(paths=20000, seed=3))
+        assert run_simulation(seed=reported, **arguments)["p50_margin"] == result["p50_margin"]
+
+
+def test_simulation_rejects_invalid_correlation():
+    correlation = [[1, 0.9, 0.9, 0], [0.9, 1, -0.9, 0], [0.9, -0.9, 1, 0], [0, 0, 0, 1]]
+    response = client.post("/api/risk-score/simulate", json={"deals": [DEAL], "simulation": {"paths": 1000, "correlation": correlation}})
+
+    assert response.status_code == 422
+
+
+def test_simulation_rejects_zero_project_cost():
+    deal = dict(DEAL, acquisition_price=0, construction_cost=0)
+    response = client.post("/api/risk-score/simulate", json={"deals": [deal], "simulation": {"paths": 1000}})
+
+    assert response.status_code == 422
+    assert "project cost" in response.json()["detail"]
+
+
+def test_non_finite_paths_are_dropped():
+    margins = np.array([np.nan, np.inf, 5.0, 12.0, 20.0])
+    summary = summarize_margins(margins)
+
+    assert summary["dropped_paths"] == 2
+    assert summary["p50_margin"] == 12.0
+    assert summary["probability_margin_below_10"] == 1 / 3
@@ -0,0 +1,104 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.sse import iter_sse_events, split_sections
+
+client = TestClient(server.app)
+
+MEMO = {
+    "property_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "asking_price": 12000000,
+    "square_footage": 48000,
+    "cap_rate": 6.5,
+    "occupancy_rate": 92,
+}
+
+UNDERWRITING = {
+    "project_name": "Harbor Point",
+    "location": "San Diego, CA",
+    "property_type": "Office",
+    "acquisition_price": 10000000,
+    "construction_cost": 5000000,
+    "square_footage": 50000,
+    "projected_rent_per_sf": 40,
+    "vacancy_rate": 5,
+    "operating_expenses_per_sf": 10,
+    "exit_cap_rate": 6,
+}
+
+
+def read_events(response):
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_memo_stream_matches_memo():
+    events = read_events(client.post("/api/generate-memo/stream", json=MEMO))
+    memo = client.post("/api/generate-memo", json=MEMO).json()
+
+    assert events[0] == ("result", {key: value for key, value in memo.items() if key != "memo"})
+    sections = [data["text"] for event, data in events if event == "section"]
+    assert len(sections) > 1
+    assert "".join(sections) == memo["memo"]
+    assert events[-1] == ("done", {})
+
+
+def test_underwrite_stream_matches_underwrite():
+    events = read_events(client.post("/api/underwrite/stream", json=UNDERWRITING))
+    underwriting = client.post("/api/underwrite", json=UNDERWRITING).json()
+
+    assert events[0][1] == {key: value for key, value in underwriting.items() if key != "underwriting_summary"}
+    assert "".join(data["text"] for event, data in events if event == "section") == underwriting["underwriting_summary"]
+
+
+def test_chat_stream_matches_reply():
+    request = {"messages": [{"role": "user", "content": "Give me a summary"}], "context": {**UNDERWRITING, "project_name": "Harbor Point"}}
+    events = read_events(client.post("/api/ai-chat/v2/stream", json=request))
+    reply = client.post("/api/ai-chat/v2", json=request).json()["reply"]
+
+    assert "".join(data["text"] for event, data in events if event == "section") == reply
+    assert split_sections("a\n\nb\n\n") == ["a\n\n", "b\n\n"]
+
+
+def test_stream_stops_producer_when_cancelled():
+    produced = []
+
+    def sections():
+        try:
+            for i in range(100):
+                produced.append(i)
+                yield f"section {i}"
+        finally:
+            produced.append("closed")
+
+    async def consume_two():
+        events = iter_sse_events(sections())
+        await events.__anext__()
+        await events.__anext__()
+        # A client disconnect closes the response iterator
+        await events.aclose()
+
+    asyncio.run(consume_two())
+    assert produced == [0, 1, "closed"]
+
+
+def test_stream_reports_errors():
+    def sections():
+        yield "first"
+        raise RuntimeError("model unavailable")
+
+    async def collect():
+        return [chunk async for chunk in iter_sse_events(sections())]
+
+    chunks = asyncio.run(collect())
+    assert chunks[-1] == b'event: error\ndata: {"detail": "model unavailable"}\n\n'
@@ -0,0 +1,68 @@
+import json
+
+from fastapi.testclient import TestClient
+
+import app.enhanced_server as server
+from app.text_lexicon import LexiconEngine, create_lexicon_engine
+
+client = TestClient(server.app)
+
+REPORT = (
+    "Office vacancy rose again this quarter. Tenants signed fewer leases, and the cap rate on "
+    "trophy assets widened as interest rates climbed. Still, strong growth in life-science demand "
+    "is a clear opportunity; downside risk-free? No. Net operating income held steady."
+)
+
+
+def test_engine_counts_sentiment_and_keywords():
+    score = LexiconEngine().score(REPORT)
+
+    assert score.word_count == len(REPORT.split())
+    # "growth" and "opportunity" count despite punctuation; "risk-free" is not "risk"
+    assert (score.positive_count, score.negative_count, score.sentiment) == (2, 0, "Positive")
+    assert score.keywords == {
+        "valuation": 2,  # cap rate, net operating income
+        "leasing": 2,  # tenants, leases
+        "occupancy": 1,
+        "financing": 1,  # interest rates, not also interest rate
+        "development": 0,
+        "supply": 1,
+    }
+
+
+def test_phrases_match_whole_words_only():
+    engine = LexiconEngine(keywords={"valuation": ["cap rate"]})
+
+    assert engine.score("escap rate and cap rates").keywords == {"valuation": 0}
+    assert engine.score("Cap\nRate, then cap  rate.").keywords == {"valuation": 2}
+
+
+def test_lexicon_is_configurable(tmp_path, monkeypatch):
+    path = tmp_path / "lexicon.json"
+    path.write_text(json.dumps({"negative": ["widened", "climbed"], "keywords": {"assets": ["trophy assets"]}}))
+    monkeypatch.setenv("TEXT_LEXICON_PATH", str(path))
+
+    score = create_lexicon_engine().score(REPORT)
+    assert (score.negative_count, score.sentiment) == (2, "Neutral")
+    assert score.keywords == {"assets": 1}
+
+
+def test_analyze_text_batch():
+    texts = [REPORT, "Great location, poor access, bad parking.", ""]
+    response = client.post("/api/analyze-text/batch", json={"texts": texts})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["sentiment"] for result in results] == ["Positive", "Negative", "Neutral"]
+    assert results[2]["word_count"] == 0
+
+    single = client.post("/api/analyze-text", json={"text": REPORT}).json()
+    assert single["sentiment"] == results[0]["sentiment"]
+    assert single["keywords"] == results[0]["keywords"]
+
+
+def test_analyze_text_batch_limit(monkeypatch):
+    monkeypatch.setattr(server, "TEXT_ANALYSIS_MAX_BATCH", 2)
+
+    assert client.post("/api/analyze-text/batch", json={"texts": ["a", "b", "c"]}).status_code == 422
+    assert client.post("/api/analyze-text/batch", json={"texts": []}).status_code == 422
@@ -0,0 +1,173 @@
+import base64
+import json
+import random
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.enhanced_server import (
+    app,
+    UnderwritingRequest,
+    UNDERWRITING_INPUT_FIELDS,
+    perform_underwriting_calculations,
+)
+
+client = TestClient(app)
+
+
+def make_deals(count, seed=42):
+    """Create random but plausible underwriting requests"""
+    rng = random.Random(seed)
+    deals = []
+    for i in range(count):
+        deals.append({
+            "project_name": f"Project {i}",
+            "location": "Austin, TX",
+            "property_type": "Office",
+            "acquisition_price": rng.uniform(1e6, 5e7),
+            "construction_cost": rng.uniform(1e5, 2e7),
+            "square_footage": rng.uniform(5e3, 5e5),
+            "projected_rent_per_sf": rng.uniform(10, 80),
+            "vacancy_rate": rng.uniform(0, 20),
+            "operating_expenses_per_sf": rng.uniform(2, 25),
+            "exit_cap_rate": rng.uniform(3, 10),
+        })
+    return deals
+
+
+def parse_ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def assert_matches_scalar(deals, rows):
+    assert len(rows) == len(deals)
+    for deal, row in zip(deals, rows):
+        expected = perform_underwriting_calculations(UnderwritingRequest(**deal))
+        for name, value in expected.items():
+            assert row[name] == value
+
+
+def test_columnar_batch_matches_scalar():
+    deals = make_deals(2500)
+    payload = {field: [deal[field] for deal in deals] for field in UNDERWRITING_INPUT_FIELDS}
+    payload["project_name"] = [deal["project_name"] for deal in deals]
+
+    response = client.post("/api/underwrite/batch", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = parse_ndjson(response)
+    assert [row["index"] for row in rows] == list(range(len(deals)))
+    assert rows[7]["project_name"] == "Project 7"
+    assert_matches_scalar(deals, rows)
+
+
+def test_ndjson_batch_matches_scalar():
+    deals = make_deals(50, seed=7)
+    body = "\n".join(json.dumps(deal) for deal in deals)
+
+    response = client.post(
+        "/api/underwrite/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 200
+    assert_matches_scalar(deals, parse_ndjson(response))
+
+
+def test_ndjson_batch_keeps_null_project_name():
+    deals = make_deals(2)
+    deals[0]["project_name"] = None
+    del deals[1]["project_name"]
+    body = "\n".join(json.dumps(deal) for deal in deals)
+
+    rows = parse_ndjson(client.post(
+        "/api/underwrite/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    ))
+
+    assert [row["project_name"] for row in rows] == [None, None]
+
+
+def test_batch_zero_exit_cap_rate_returns_null():
+    deal = make_deals(1)[0]
+    deal["exit_cap_rate"] = 0
+    payload = {field: [deal[field]] for field in UNDERWRITING_INPUT_FIELDS}
+
+    rows = parse_ndjson(client.post("/api/underwrite/batch", json=payload))
+
+    assert rows[0]["estimated_exit_value"] is None
+    assert rows[0]["development_margin"] is None
+
+
+def test_batch_rejects_ragged_columns():
+    deal = make_deals(1)[0]
+    payload = {field: [deal[field]] for field in UNDERWRITING_INPUT_FIELDS}
+    payload["vacancy_rate"] = [5.0, 6.0]
+
+    response = client.post("/api/underwrite/batch", json=payload)
+
+    assert response.status_code == 422
+
+
+def test_ndjson_batch_reports_bad_line():
+    body = json.dumps(make_deals(1)[0]) + "\n{\"square_footage\": 1}\n"
+
+    response = client.post(
+        "/api/underwrite/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.status_code == 422
+    assert "Line 2" in response.json()["detail"]
+
+
+BASE_DEAL = make_deals(1)[0]
+
+
+def test_sensitivity_grid_matches_scalar_underwriting():
+    ranges = {
+        "exit_cap_rate": {"values": [5, 6, 0]},
+        "projected_rent_per_sf": {"start": 30, "stop": 50, "steps": 5},
+    }
+    result = client.post("/api/underwrite/sensitivity", json={"base": BASE_DEAL, "ranges": ranges}).json()
+
+    assert result["shape"] == [3, 5]
+    assert result["cells"] == 15
+    assert [axis["field"] for axis in result["axes"]] == ["exit_cap_rate", "projected_rent_per_sf"]
+
+    cell = 0
+    for exit_cap_rate in result["axes"][0]["values"]:
+        for rent in result["axes"][1]["values"]:
+            if exit_cap_rate == 0:
+                assert result["development_margin"][cell] is None
+            else:
+                request = UnderwritingRequest(**dict(BASE_DEAL, exit_cap_rate=exit_cap_rate, projected_rent_per_sf=rent))
+                expected = perform_underwriting_calculations(request)
+                for name in ("net_operating_income", "estimated_exit_value", "development_margin"):
+                    assert result[name][cell] == expected[name]
+            cell += 1
+
+
+def test_sensitivity_grid_base64_encoding():
+    ranges = {name: {"start": 1, "stop": 10, "steps": 10} for name in ("vacancy_rate", "exit_cap_rate", "construction_cost")}
+    json_result = client.post("/api/underwrite/sensitivity", json={"base": BASE_DEAL, "ranges": ranges}).json()
+    binary_result = client.post("/api/underwrite/sensitivity", json={"base": BASE_DEAL, "ranges": ranges, "encoding": "base64"}).json()
+
+    margins = np.frombuffer(base64.b64decode(binary_result["development_margin"]), dtype="<f8")
+    assert margins.tolist() == json_result["development_margin"]
+    assert binary_result["shape"] == [10, 10, 10]
+
+
+def test_sensitivity_grid_rejects_bad_ranges():
+    def post(ranges):
+        return client.post("/api/underwrite/sensitivity", json={"base": BASE_DEAL, "ranges": ranges})
+
+    assert post({"project_name": {"values": [1]}}).status_code == 422
+    assert post({"vacancy_rate": {"start": 1}}).status_code == 422
+    assert post({"vacancy_rate": {"values": []}}).status_code == 422
+    too_big = {name: {"start": 1, "stop": 2, "steps": 1000} for name in ("vacancy_rate", "exit_cap_rate", "construction_cost")}
+    assert post(too_big).status_code == 422
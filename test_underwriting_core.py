@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.underwriting import (
+    UNDERWRITING_INPUT_FIELDS,
+    UnderwritingResult,
+    underwrite,
+    underwrite_columns,
+    underwrite_guarded,
+)
+
+DEAL = (10_000_000.0, 5_000_000.0, 50_000.0, 40.0, 5.0, 10.0, 6.0)
+
+
+def make_columns(count, seed=7):
+    rng = random.Random(seed)
+    ranges = [(1e6, 5e7), (1e5, 2e7), (5e3, 5e5), (10, 80), (0, 20), (2, 25), (3, 10)]
+    return {field: np.array([rng.uniform(low, high) for _ in range(count)]) for field, (low, high) in zip(UNDERWRITING_INPUT_FIELDS, ranges)}
+
+
+def test_scalar_result():
+    result = underwrite(*DEAL)
+
+    assert isinstance(result, UnderwritingResult)
+    assert result.gross_potential_income == 2_000_000
+    assert result.net_operating_income == 1_400_000
+    assert result.project_cost == 15_000_000
+    assert result.development_margin == pytest.approx(55.56, abs=0.01)
+    assert all(type(value) is float for value in result)
+
+
+def test_array_rows_match_scalar_exactly():
+    columns = make_columns(1000)
+    batch = underwrite_columns(columns)
+
+    for i in range(1000):
+        scalar = underwrite(*(float(columns[field][i]) for field in UNDERWRITING_INPUT_FIELDS))
+        assert tuple(float(values[i]) for values in batch) == scalar
+
+
+def test_bad_rows_do_not_fail_a_batch():
+    columns = make_columns(3)
+    columns["exit_cap_rate"][1] = 0
+    batch = underwrite_columns(columns)
+
+    assert np.isinf(batch.estimated_exit_value[1])
+    assert np.isfinite(batch.development_margin[[0, 2]]).all()
+    with pytest.raises(ZeroDivisionError):
+        underwrite(*DEAL[:6], 0.0)
+
+
+def test_guarded_leaves_missing_fields_empty():
+    assert tuple(underwrite_guarded(*DEAL)) == tuple(underwrite(*DEAL))
+
+    no_cap = underwrite_guarded(*DEAL[:6], 0.0)
+    assert (no_cap.estimated_exit_value, no_cap.development_margin) == (None, None)
+    assert no_cap.net_operating_income == 1_400_000
+
+    negative_cap = underwrite_guarded(*DEAL[:6], -6.0)
+    assert (negative_cap.estimated_exit_value, negative_cap.development_margin) == (None, None)
+
+    no_cost = underwrite_guarded(0.0, 0.0, *DEAL[2:])
+    assert no_cost.estimated_exit_value is not None and no_cost.development_margin is None
+
+    negative_cost = underwrite_guarded(-1_000_000.0, 0.0, *DEAL[2:])
+    assert negative_cost.development_margin is None
+